@@ -1,2 +1,56 @@
 BATCH_SIZE=300
-VECTOR_SIZE=1536
\ No newline at end of file
+VECTOR_SIZE=1536
+CHUNK_OVERLAP=50
+CHUNK_READ_SIZE=65536
+UPSERT_BATCH_SIZE=256
+EMBEDDING_MAX_INPUTS=2048
+EMBEDDING_MAX_TOKENS=300000
+EMBEDDING_CONCURRENCY=8
+EMBEDDING_MAX_RETRIES=6
+EMBEDDING_BACKOFF_SECONDS=1.0
+EMBEDDING_MAX_BACKOFF_SECONDS=60.0
+EMBEDDING_CACHE_PATH=".cache/embeddings.sqlite3"
+EMBEDDING_CACHE_MAX_BYTES=2*1024**3
+EMBEDDING_CACHE_HOT_SIZE=10000
+INGEST_QUEUE_SIZE=8192
+INGEST_UPSERT_CONCURRENCY=4
+INGEST_REPORT_SECONDS=10.0
+MANIFEST_PATH=".cache/manifest.sqlite3"
+QDRANT_TIMEOUT=30
+QDRANT_POOL_SIZE=32
+QDRANT_GRPC_PORT=6334
+NUMPY_DATA_DIR=".cache/vectors"
+NUMPY_INITIAL_CAPACITY=1024
+NUMPY_SEARCH_BLOCK_SIZE=65536
+IVF_NLIST=1024
+IVF_NPROBE=16
+IVF_KMEANS_ITERATIONS=20
+IVF_MIN_POINTS_PER_LIST=39
+IVF_TRAIN_POINTS_PER_LIST=256
+QUANTIZATION_QUANTILE=0.99
+QUANTIZATION_OVERSAMPLING=3.0
+BM25_K1=1.2
+BM25_B=0.75
+BM25_AVG_LENGTH=50
+RRF_K=60
+HYBRID_OVERSAMPLING=4.0
+LOCAL_EMBEDDING_MODEL="sentence-transformers/all-MiniLM-L6-v2"
+LOCAL_EMBEDDING_BATCH_SIZE=64
+SNAPSHOT_BATCH_SIZE=4096
+QDRANT_INDEXING_THRESHOLD=20000
+MMR_OVERSAMPLING=4.0
+INGEST_EXTENSIONS=".txt,.md,.markdown,.rst,.html,.htm"
+EMBEDDING_COALESCE_SECONDS=0.005
+FEDERATED_SEARCH_TIMEOUT=2.0
+SEARCH_LATENCY_HEADROOM=0.5
+SEARCH_LATENCY_SAMPLES=10
+PAYLOAD_STORE_PATH=".cache/payloads.sqlite3"
+PAYLOAD_COMPRESSION_LEVEL=6
+REEMBED_BATCH_SIZE=512
+REEMBED_MAX_TEXTS_PER_SECOND=100.0
+REEMBED_CHECKPOINT_DIR=".cache/reembed"
+QUANTIZATION_SCORE_ROWS=256
+QUANTIZATION_SCORE_PAIRS=16384
+EMBEDDING_TOKENIZER="cl100k_base"
+IVF_RETRAIN_GROWTH=4.0
+DIMENSION_RERANK_OVERSAMPLING=4.0
\ No newline at end of file
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from semantic_kernel import Kernel
+
+# The modules import each other from the `agents` directory, as when the agents are run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector.embedding_providers import HashingEmbeddingProvider  # noqa: E402
+from vector.manifest import SourceManifest  # noqa: E402
+from vector.numpy_store import NumpyVectorDatabase  # noqa: E402
+from vector.qdrant import QdrantVectorDatabase  # noqa: E402
+from vector.qdrant_async import AsyncQdrantVectorDatabase  # noqa: E402
+
+DIMENSIONS = 64
+
+
+@pytest.fixture
+def manifest():
+    manifest = SourceManifest(":memory:")
+    yield manifest
+    manifest.close()
+
+
+@pytest.fixture
+def database(tmp_path, manifest):
+    database = NumpyVectorDatabase(Kernel(), str(tmp_path / "collections"), manifest=manifest, embedding_service=HashingEmbeddingProvider(DIMENSIONS))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def qdrant_database(manifest):
+    # Qdrant's local mode runs the client API in process, without a server
+    database = QdrantVectorDatabase(Kernel(), "http://localhost:6333", None, manifest=manifest, embedding_service=HashingEmbeddingProvider(DIMENSIONS))
+    database.client = QdrantClient(":memory:")
+    yield database
+    database.client.close()
+
+
+@pytest.fixture
+def async_qdrant_database(manifest):
+    database = AsyncQdrantVectorDatabase(Kernel(), "http://localhost:6333", None, manifest=manifest, embedding_service=HashingEmbeddingProvider(DIMENSIONS))
+    asyncio.run(database.close())
+    database.client = AsyncQdrantClient(":memory:")
+    yield database
+    asyncio.run(database.close())
@@ -0,0 +1,8 @@
+import asyncio
+from vector.benchmark import _pipeline
+
+
+def test_pipeline_ingests_one_chunk_per_requested_paragraph(database):
+    result = asyncio.run(_pipeline(database, "pipeline", 64, 200, None))
+    assert result["chunks"] == 200 and database.count("pipeline") == 200
+    assert result["chunks_per_second"] == result["chunks"] / result["seconds"]
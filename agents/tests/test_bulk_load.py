@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from semantic_kernel import Kernel
+from config import QDRANT_INDEXING_THRESHOLD
+from vector.embedding_providers import HashingEmbeddingProvider
+from vector.numpy_store import NumpyVectorDatabase
+
+DOCUMENT = "\n\n".join(f"Paragraph {i} mentions the keyword k{i}." for i in range(40))
+
+
+class ThresholdRecorder:
+    """Forwards to a Qdrant client, reporting `threshold` as the collection's indexing threshold and recording the updates."""
+
+    def __init__(self, client, threshold):
+        self.client = client
+        self.threshold = threshold
+        self.updates = []
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _with_threshold(self, info):
+        info.config.optimizer_config.indexing_threshold = self.threshold
+        return info
+
+    def _record(self, optimizers_config):
+        self.updates.append(optimizers_config.indexing_threshold)
+        self.threshold = optimizers_config.indexing_threshold
+
+
+class SyncThresholdRecorder(ThresholdRecorder):
+    def get_collection(self, collection_name):
+        return self._with_threshold(self.client.get_collection(collection_name))
+
+    def update_collection(self, collection_name, optimizers_config):
+        self._record(optimizers_config)
+        return True
+
+
+class AsyncThresholdRecorder(ThresholdRecorder):
+    async def get_collection(self, collection_name):
+        return self._with_threshold(await self.client.get_collection(collection_name))
+
+    async def update_collection(self, collection_name, optimizers_config):
+        self._record(optimizers_config)
+        return True
+
+
+def _search(database, query, **options):
+    return asyncio.run(database.search("docs", query, limit=1, score_threshold=None, **options))
+
+
+def test_numpy_bulk_load_rebuilds_the_deferred_indexes(database):
+    database.create_collection("docs", 64, sparse=True, quantization="scalar", payload_indexes={"source": "keyword"})
+    collection = database._collection("docs")
+    asyncio.run(database.ingest("docs", DOCUMENT, batch_size=40, overlap=0, source_id="a.txt", bulk_load=True))
+    assert not collection.bulk_loading and collection.codes is not None
+    result = _search(database, "k17", hybrid=True, filters={"source": "a.txt"})
+    assert result[0]["text"] == "Paragraph 17 mentions the keyword k17."
+
+
+def test_interrupted_numpy_bulk_load_is_finished_on_reopening(tmp_path, manifest):
+    path = str(tmp_path / "collections")
+    database = NumpyVectorDatabase(Kernel(), path, manifest=manifest, embedding_service=HashingEmbeddingProvider(64))
+    database.create_collection("docs", 64, sparse=True)
+    asyncio.run(database._begin_bulk_load("docs"))
+    asyncio.run(database.upsert("docs", DOCUMENT, batch_size=40, overlap=0, source_id="a.txt"))
+    database.close()
+    reopened = NumpyVectorDatabase(Kernel(), path, manifest=manifest, embedding_service=HashingEmbeddingProvider(64))
+    assert not reopened._collection("docs").bulk_loading
+    assert _search(reopened, "k23", hybrid=True)[0]["text"] == "Paragraph 23 mentions the keyword k23."
+    reopened.close()
+
+
+@pytest.mark.parametrize("threshold", [0, 5000, None])
+def test_qdrant_bulk_load_restores_the_indexing_threshold(qdrant_database, threshold):
+    qdrant_database.create_collection("docs", 64)
+    qdrant_database.client = SyncThresholdRecorder(qdrant_database.client, threshold)
+    asyncio.run(qdrant_database.ingest("docs", DOCUMENT, batch_size=40, overlap=0, bulk_load=True))
+    # A saved 0 stays 0; only an unset threshold falls back to the default
+    assert qdrant_database.client.updates == [0, QDRANT_INDEXING_THRESHOLD if threshold is None else threshold]
+    assert qdrant_database.client.count("docs").count == 40
+
+
+@pytest.mark.parametrize("threshold", [0, 5000])
+def test_async_qdrant_bulk_load_restores_the_indexing_threshold(async_qdrant_database, threshold):
+    async def run():
+        await async_qdrant_database.create_collection("docs", 64)
+        async_qdrant_database.client = AsyncThresholdRecorder(async_qdrant_database.client, threshold)
+        async with async_qdrant_database.bulk_load("docs"):
+            await async_qdrant_database.upsert("docs", DOCUMENT, batch_size=40, overlap=0)
+        return async_qdrant_database.client.updates
+
+    assert asyncio.run(run()) == [0, threshold]
+
+
+def test_qdrant_create_collection_answers_known_collections_from_its_cache(qdrant_database):
+    qdrant_database.create_collection("docs", 64)
+    qdrant_database.client = SyncThresholdRecorder(qdrant_database.client, None)
+    qdrant_database.client.collection_exists = lambda collection_name: pytest.fail("existence checked again")
+    qdrant_database.create_collection("docs", 64)
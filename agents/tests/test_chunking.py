@@ -0,0 +1,63 @@
+import io
+import pytest
+from vector.chunking import iter_chunks, TextChunker
+
+TEXT = (
+    "The first paragraph talks about vectors. It has two sentences.\n\n"
+    "The second paragraph is about chunking, which splits long documents into pieces. "
+    "Each piece is embedded on its own, so it has to stay short enough for the model.\n\n"
+    "The last paragraph is short."
+)
+
+
+def test_chunks_respect_size():
+    chunks = list(iter_chunks(TEXT, chunk_size=80, overlap=0))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 80 for chunk in chunks)
+
+
+def test_chunks_cut_on_paragraphs_then_sentences():
+    chunks = list(iter_chunks(TEXT, chunk_size=100, overlap=0))
+    assert chunks[0] == "The first paragraph talks about vectors. It has two sentences."
+    assert chunks[-1].endswith("The last paragraph is short.")
+    # No chunk starts or ends in the middle of a word
+    words = set(TEXT.split())
+    assert all(chunk.split()[0] in words and chunk.split()[-1] in words for chunk in chunks)
+
+
+def test_chunks_without_overlap_cover_the_text_once():
+    chunks = list(iter_chunks(TEXT, chunk_size=60, overlap=0))
+    assert " ".join(chunks).split() == TEXT.split()
+
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    chunks = list(iter_chunks(TEXT, chunk_size=60, overlap=20))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_word = chunk.split()[0]
+        # The overlap starts on a token boundary within the last `overlap` characters
+        assert first_word in previous[-20:].split()
+        assert len(chunk) <= 60
+
+
+def test_long_token_is_cut_at_chunk_size():
+    chunks = list(iter_chunks("x" * 25, chunk_size=10, overlap=0))
+    assert chunks == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_sources_are_read_lazily_in_pieces():
+    expected = list(iter_chunks(TEXT, chunk_size=70, overlap=10))
+    assert list(iter_chunks(io.StringIO(TEXT), chunk_size=70, overlap=10, read_size=7)) == expected
+    assert list(iter_chunks(io.BytesIO(TEXT.encode("utf-8")), chunk_size=70, overlap=10, read_size=7)) == expected
+    assert list(iter_chunks([TEXT[:33], TEXT[33:]], chunk_size=70, overlap=10)) == expected
+    # Pieces of iterables larger than the read size are split
+    assert list(iter_chunks([TEXT], chunk_size=70, overlap=10, read_size=7)) == expected
+
+
+def test_blank_text_has_no_chunks():
+    assert list(iter_chunks("  \n\n  ", chunk_size=10, overlap=0)) == []
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(0, 0), (10, 10), (10, -1)])
+def test_invalid_sizes(chunk_size, overlap):
+    with pytest.raises(ValueError):
+        TextChunker(chunk_size, overlap)
@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+import numpy as np
+import pytest
+from vector.diversity import maximal_marginal_relevance, diversify, check_diversity, candidate_count
+from vector.vector_base import PointBatch
+
+
+def _near_duplicates():
+    # Three near-copies of the best match, and a less relevant point in another direction
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([[1.0, 0.05, 0.0], [1.0, 0.0, 0.05], [1.0, 0.05, 0.05], [0.6, 0.0, 0.8]])
+    return query, candidates
+
+
+def test_without_diversity_candidates_are_picked_by_relevance():
+    query, candidates = _near_duplicates()
+    assert maximal_marginal_relevance(query, candidates, 4, 0.0) == [0, 1, 2, 3]
+
+
+def test_diversity_picks_the_distinct_candidate_before_the_duplicates():
+    query, candidates = _near_duplicates()
+    assert maximal_marginal_relevance(query, candidates, 2, 0.7) == [0, 3]
+    assert maximal_marginal_relevance(query, candidates, 10, 0.7)[:2] == [0, 3]
+    assert maximal_marginal_relevance(query, candidates[:0], 2, 0.7) == []
+
+
+def test_diversify_keeps_the_original_results_and_scores():
+    query, candidates = _near_duplicates()
+    results = [{"id": str(i), "score": float(candidates[i] @ query)} for i in range(4)]
+    assert diversify(results, candidates, query, 2, 0.7) == [results[0], results[3]]
+
+
+def test_diversity_bounds_and_candidate_count():
+    check_diversity(0.0)
+    check_diversity(1.0)
+    with pytest.raises(ValueError):
+        check_diversity(1.5)
+    assert candidate_count(10, 0.0) == 10
+    assert candidate_count(10, 0.3) > 10
+
+
+@pytest.mark.parametrize("backend", ["database", "qdrant_database"])
+def test_diversified_search_drops_near_duplicate_chunks(request, backend):
+    database = request.getfixturevalue(backend)
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal(64)
+    # Five near-duplicates of the query's best match and five distinct, slightly less relevant points
+    vectors = np.concatenate([base + 0.01 * rng.standard_normal((5, 64)), base + 1.5 * rng.standard_normal((5, 64))]).astype(np.float32)
+    ids = [str(uuid.UUID(int=i)) for i in range(10)]
+    database.create_collection("docs", 64)
+    asyncio.run(database._write_points("docs", PointBatch(ids=ids, vectors=vectors, payloads={"text": ids})))
+    plain = asyncio.run(database.search_by_vector("docs", base, limit=3, score_threshold=None))
+    diverse = asyncio.run(database.search_by_vector("docs", base, limit=3, score_threshold=None, diversity=0.7))
+    assert {result["id"] for result in plain} <= set(ids[:5])
+    assert diverse[0]["id"] == plain[0]["id"]
+    assert len({result["id"] for result in diverse} & set(ids[:5])) == 1
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import numpy as np
+import pytest
+import vector.embedder as embedder_module
+from vector.embedder import BatchEmbedder, CoalescingEmbedder, estimate_tokens
+
+
+class RecordingProvider:
+    """Embeds a text as [its number, its length], recording the requests and how many run at once."""
+
+    def __init__(self, delay=0.0, failures=None):
+        self.delay = delay
+        # Errors raised by the next requests, in order
+        self.failures = list(failures or [])
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_embeddings(self, texts, **kwargs):
+        self.requests.append((list(texts), kwargs))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay * random.random())
+            if self.failures:
+                raise self.failures.pop(0)
+            return np.array([[float(text.split()[-1]), len(text)] for text in texts], dtype=np.float32)
+        finally:
+            self.in_flight -= 1
+
+
+class RateLimitError(Exception):
+    class response:
+        headers = {"retry-after-ms": "1"}
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+def _texts(count):
+    return [f"text {i}" for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def byte_estimate(monkeypatch):
+    # Token estimates don't depend on whether tiktoken is installed
+    monkeypatch.setattr(embedder_module, "_tokenizer", False)
+
+
+def test_token_estimate_is_an_upper_bound():
+    assert estimate_tokens("abcd") == 3
+    # Two bytes per token also holds for text taking a token per character
+    assert estimate_tokens("日本語") == 5
+
+
+def test_pack_respects_input_and_token_limits():
+    embedder = BatchEmbedder(RecordingProvider(), max_inputs=3, max_tokens=10)
+    requests = embedder.pack(["a" * 8, "b" * 8, "c" * 8, "d", "e", "f", "g", "h" * 30])
+    assert requests == [["a" * 8, "b" * 8], ["c" * 8, "d", "e"], ["f", "g"], ["h" * 30]]
+
+
+def test_embed_keeps_the_order_and_bounds_concurrency():
+    provider = RecordingProvider(delay=0.01)
+    embedder = BatchEmbedder(provider, max_inputs=4, concurrency=3)
+    embeddings = asyncio.run(embedder.embed(_texts(50)))
+    assert embeddings[:, 0].tolist() == list(range(50))
+    assert len(provider.requests) == 13
+    assert provider.max_in_flight == 3
+
+
+def test_embed_batches_streams_fixed_size_batches_in_order():
+    embedder = BatchEmbedder(RecordingProvider(delay=0.01), max_inputs=3, concurrency=2)
+
+    async def run():
+        return [(texts, embeddings) async for texts, embeddings in embedder.embed_batches(iter(_texts(20)), 8)]
+
+    batches = asyncio.run(run())
+    assert [len(texts) for texts, _ in batches] == [8, 8, 4]
+    for texts, embeddings in batches:
+        assert [f"text {int(row[0])}" for row in embeddings] == texts
+
+
+def test_retryable_errors_are_retried():
+    provider = RecordingProvider(failures=[RateLimitError(), RateLimitError()])
+    embeddings = asyncio.run(BatchEmbedder(provider, max_retries=2).embed(_texts(3)))
+    assert embeddings[:, 0].tolist() == [0, 1, 2]
+    assert len(provider.requests) == 3
+
+
+def test_other_errors_and_exhausted_retries_are_raised():
+    with pytest.raises(ValueError):
+        asyncio.run(BatchEmbedder(RecordingProvider(failures=[ValueError()])).embed(_texts(3)))
+    with pytest.raises(RateLimitError):
+        asyncio.run(BatchEmbedder(RecordingProvider(failures=[RateLimitError()] * 2), max_retries=1).embed(_texts(3)))
+
+
+def test_requests_rejected_as_too_long_are_split():
+    provider = RecordingProvider(failures=[BadRequestError("This model's maximum context length is 8192 tokens")])
+    embeddings = asyncio.run(BatchEmbedder(provider).embed(_texts(4)))
+    assert embeddings[:, 0].tolist() == [0, 1, 2, 3]
+    assert sorted(len(texts) for texts, _ in provider.requests) == [2, 2, 4]
+
+
+def test_concurrent_calls_are_coalesced_in_order():
+    provider = RecordingProvider()
+    coalescing = CoalescingEmbedder(BatchEmbedder(provider), window=0.05)
+
+    async def run():
+        calls = [["text 3"], ["text 1", "text 2"], ["text 3", "text 0"]]
+        return await asyncio.gather(*(coalescing.generate_embeddings(texts) for texts in calls))
+
+    results = asyncio.run(run())
+    assert [result[:, 0].tolist() for result in results] == [[3], [1, 2], [3, 0]]
+    # One request, with the text asked for twice embedded once
+    assert provider.requests == [(["text 3", "text 1", "text 2", "text 0"], {})]
+    assert (coalescing.calls, coalescing.requests) == (3, 1)
+
+
+def test_coalesced_calls_with_options_go_through_the_batch_embedder():
+    provider = RecordingProvider(failures=[RateLimitError()])
+    coalescing = CoalescingEmbedder(BatchEmbedder(provider, max_inputs=2), window=0.05)
+    embeddings = asyncio.run(coalescing.generate_embeddings(_texts(5), dimensions=2))
+    assert embeddings[:, 0].tolist() == [0, 1, 2, 3, 4]
+    # Packed in requests of two and retried, every request with the option
+    assert len(provider.requests) == 4
+    assert all(kwargs == {"dimensions": 2} for _, kwargs in provider.requests)
+
+
+def test_coalesced_failures_reach_every_caller():
+    coalescing = CoalescingEmbedder(BatchEmbedder(RecordingProvider(failures=[ValueError()])), window=0.05)
+
+    async def run():
+        return await asyncio.gather(*(coalescing.generate_embeddings([text]) for text in _texts(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
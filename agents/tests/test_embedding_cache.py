@@ -0,0 +1,76 @@
+import asyncio
+import numpy as np
+from semantic_kernel import Kernel
+from vector.embedding_cache import EmbeddingCache, CachedEmbeddingService
+from vector.embedding_providers import HashingEmbeddingProvider
+from vector.numpy_store import NumpyVectorDatabase
+
+
+class CountingProvider(HashingEmbeddingProvider):
+    """Hashing embeddings of one model deployment, whatever their dimensions, counting the texts embedded."""
+
+    def __init__(self, dimensions):
+        super().__init__(dimensions)
+        self.model_id = "deployment"
+        self.embedded = 0
+
+    async def generate_embeddings(self, texts, **kwargs):
+        self.embedded += len(texts)
+        return await super().generate_embeddings(texts, **kwargs)
+
+
+def test_key_includes_model_and_dimensions():
+    key = EmbeddingCache.key("deployment", 64, "text")
+    assert key == EmbeddingCache.key("deployment", 64, "text")
+    assert key != EmbeddingCache.key("deployment", 32, "text")
+    assert key != EmbeddingCache.key("deployment", None, "text")
+    assert key != EmbeddingCache.key("other", 64, "text")
+
+
+def test_cached_service_defaults_to_the_provider_dimensions():
+    cache = EmbeddingCache(":memory:")
+    full, short = CountingProvider(64), CountingProvider(16)
+
+    async def run():
+        return (
+            await CachedEmbeddingService(full, cache).generate_embeddings(["text", "other"]),
+            await CachedEmbeddingService(short, cache).generate_embeddings(["text"]),
+            await CachedEmbeddingService(full, cache).generate_embeddings(["other", "text"]),
+        )
+
+    first, shortened, again = asyncio.run(run())
+    # Shortened embeddings of the same deployment never read the full-size ones
+    assert shortened.shape == (1, 16)
+    assert (full.embedded, short.embedded) == (2, 1)
+    np.testing.assert_array_equal(again, first[::-1])
+    assert cache.stats().hot_hits == 2
+
+
+def test_database_keys_its_cache_by_the_provider_dimensions(tmp_path, manifest):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    databases = [
+        NumpyVectorDatabase(Kernel(), str(tmp_path / str(dimensions)), cache, manifest, CountingProvider(dimensions))
+        for dimensions in (64, 16)
+    ]
+    for database in databases:
+        assert database.embedding_service.dimensions == database.embedding_service.embedding_service.dimensions
+        embeddings = asyncio.run(database.embedder.embed(["shared text"]))
+        assert embeddings.shape == (1, database.embedding_service.dimensions)
+    assert [database.embedding_service.embedding_service.embedded for database in databases] == [1, 1]
+
+
+def test_entries_persist_and_the_least_recently_used_are_evicted(tmp_path):
+    path = str(tmp_path / "cache.db")
+    # A fourth 16-float vector exceeds the budget, eviction frees one
+    cache = EmbeddingCache(path, max_bytes=4 * 64 - 1, hot_size=1)
+    for i in range(3):
+        cache.put_many({f"key{i}": np.full(16, i, dtype=np.float32)})
+    cache.get_many(["key0"])
+    cache.put_many({"key3": np.full(16, 3, dtype=np.float32)})
+    cache.close()
+    reopened = EmbeddingCache(path)
+    found = reopened.get_many(["key0", "key1", "key2", "key3"])
+    assert sorted(found) == ["key0", "key2", "key3"]
+    np.testing.assert_array_equal(found["key2"], np.full(16, 2, dtype=np.float32))
+    assert reopened.stats().disk_hits == 3
+    reopened.close()
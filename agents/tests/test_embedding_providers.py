@@ -0,0 +1,69 @@
+import asyncio
+import numpy as np
+import pytest
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.embedding_generator_base import EmbeddingGeneratorBase
+from vector.embedding_providers import HashingEmbeddingProvider, KernelEmbeddingProvider, LocalEmbeddingProvider, resolve_provider
+
+
+class FakeService(EmbeddingGeneratorBase):
+    """A Semantic Kernel embedding service recording the settings it is called with."""
+
+    async def generate_embeddings(self, texts, settings=None, **kwargs):
+        self.__dict__.setdefault("settings", []).append(settings)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    provider = HashingEmbeddingProvider(64)
+    first, second, related, unrelated = asyncio.run(provider.generate_embeddings(
+        ["refunds take five days", "refunds take five days", "refunds take a week", "the office is closed"]
+    ))
+    np.testing.assert_array_equal(first, second)
+    assert np.linalg.norm(first) == pytest.approx(1.0)
+    # Shared words make texts closer
+    assert first @ related > first @ unrelated
+    assert provider.model_id == "hashing-64"
+
+
+def test_hashing_embeddings_of_texts_without_tokens_are_not_zero():
+    provider = HashingEmbeddingProvider(16)
+    vector = provider.embed("?!")
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    np.testing.assert_array_equal(vector, provider.embed("?!"))
+    assert asyncio.run(provider.generate_embeddings(["text"], dimensions=8)).shape == (1, 8)
+
+
+def test_providers_are_used_as_they_are():
+    provider = HashingEmbeddingProvider(8)
+    assert resolve_provider(None, provider) is provider
+
+
+def test_kernel_services_are_wrapped():
+    service = FakeService(ai_model_id="fake-model", service_id="azure_embeddings")
+    kernel = Kernel()
+    kernel.add_service(service)
+    provider = resolve_provider(kernel)
+    assert isinstance(provider, KernelEmbeddingProvider)
+    assert provider.service is service and provider.model_id == "fake-model"
+    asyncio.run(provider.generate_embeddings(["a"]))
+    asyncio.run(KernelEmbeddingProvider(service, dimensions=2).generate_embeddings(["a"]))
+    # Shortened embeddings are asked for through the execution settings
+    assert service.settings[0] is None and service.settings[1] is not None
+
+
+def test_invalid_services_are_rejected():
+    with pytest.raises(ValueError):
+        resolve_provider(None)
+    with pytest.raises(ValueError):
+        resolve_provider(None, object())
+
+
+def test_local_provider_names_its_missing_dependency():
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError, match="sentence-transformers"):
+            LocalEmbeddingProvider()
+    else:
+        pytest.skip("sentence-transformers is installed")
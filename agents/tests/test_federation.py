@@ -0,0 +1,83 @@
+import asyncio
+import numpy as np
+import pytest
+from vector.federation import normalize_scores, merge_top_k
+
+HANDBOOK = "\n\n".join([
+    "Invoices are due within thirty days.",
+    "Invoices are due within thirty days of receipt.",
+    "Invoices are due within thirty days, by bank transfer.",
+    "Late invoices are charged a fee.",
+    "The office is closed on public holidays.",
+])
+WIKI = "\n\n".join([
+    "Invoice numbers start with the year.",
+    "Passwords must be rotated every ninety days.",
+    "Refunds are processed within five business days.",
+])
+
+
+def _results(*scores):
+    return [{"id": str(score), "score": score} for score in scores]
+
+
+def test_merge_top_k_takes_the_best_of_unsorted_lists():
+    merged = merge_top_k([_results(1.0, 0.2, 0.9), _results(0.8, 0.7)], 3)
+    assert [result["score"] for result in merged] == [1.0, 0.9, 0.8]
+    assert merge_top_k([], 3) == []
+
+
+def test_normalize_scores():
+    results = _results(3.0, 2.0, 1.0)
+    assert [result["score"] for result in normalize_scores(results)] == [1.0, 0.5, 0.0]
+    assert [result["raw_score"] for result in normalize_scores(results)] == [3.0, 2.0, 1.0]
+    zscores = [result["score"] for result in normalize_scores(results, "zscore")]
+    assert zscores == pytest.approx([np.sqrt(1.5), 0.0, -np.sqrt(1.5)])
+    assert normalize_scores(_results(0.5), "minmax")[0]["score"] == 1.0
+    assert normalize_scores(results, "none")[0]["score"] == 3.0
+    with pytest.raises(ValueError):
+        normalize_scores(results, "rank")
+
+
+def _ingest(database):
+    for name, document in (("handbook", HANDBOOK), ("wiki", WIKI)):
+        database.create_collection(name, 64)
+        asyncio.run(database.upsert(name, document, batch_size=60, overlap=0, source_id=f"{name}.txt"))
+
+
+def test_federated_search_merges_the_collections(database):
+    _ingest(database)
+    results = asyncio.run(database.federated_search(["handbook", "wiki"], "invoices due", limit=4, score_threshold=None))
+    assert len(results) == 4
+    assert {result["collection"] for result in results} == {"handbook", "wiki"}
+    # Every collection's best result is normalized to 1
+    assert [result["score"] for result in results][:2] == [1.0, 1.0]
+    assert all(a["score"] >= b["score"] for a, b in zip(results, results[1:]))
+    assert all("raw_score" in result for result in results)
+
+
+def test_federated_search_with_diversity_keeps_the_best_scores(database):
+    _ingest(database)
+    options = dict(limit=3, score_threshold=None, normalization="none")
+    results = asyncio.run(database.federated_search(["handbook", "wiki"], "invoices are due within thirty days", diversity=0.9, **options))
+    per_collection = [
+        asyncio.run(database.search(name, "invoices are due within thirty days", limit=3, score_threshold=None, diversity=0.9))
+        for name in ("handbook", "wiki")
+    ]
+    # Diversified results come in pick order; the merge still returns the best scores, best first
+    expected = sorted((result["score"] for results in per_collection for result in results), reverse=True)[:3]
+    assert [result["score"] for result in results] == pytest.approx(expected)
+
+
+def test_slow_collections_are_left_out(database, monkeypatch):
+    _ingest(database)
+    search_by_vector = database.search_by_vector
+
+    async def slow_wiki(collection_name, *args, **kwargs):
+        if collection_name == "wiki":
+            await asyncio.sleep(1)
+        return await search_by_vector(collection_name, *args, **kwargs)
+
+    monkeypatch.setattr(database, "search_by_vector", slow_wiki)
+    results = asyncio.run(database.federated_search(["handbook", "wiki"], "invoices", limit=3, score_threshold=None, collection_timeout=0.05))
+    assert results and {result["collection"] for result in results} == {"handbook"}
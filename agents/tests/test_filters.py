@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+import pytest
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchAny, Range, DatetimeRange
+from vector.filters import to_qdrant_filter, to_sql_filter, payload_schema
+
+
+def test_sql_filter_translation():
+    clause, params = to_sql_filter({
+        "source": "a.pdf",
+        "tags": ["finance", "q3"],
+        "page": {"gte": 2, "lt": 5},
+        "timestamp": {"gt": datetime(2024, 1, 1)},
+        "draft": False,
+    }, list_fields=["tags"])
+    assert clause == (
+        "json_extract(payload, '$.source') IN (?) AND "
+        "EXISTS (SELECT 1 FROM json_each(payload, '$.tags') WHERE value IN (?,?)) AND "
+        "json_extract(payload, '$.page') >= ? AND json_extract(payload, '$.page') < ? AND "
+        "json_extract(payload, '$.timestamp') > ? AND "
+        "json_extract(payload, '$.draft') IN (?)"
+    )
+    assert params == ["a.pdf", "finance", "q3", 2, 5, "2024-01-01T00:00:00", 0]
+
+
+def test_sql_filter_edge_cases():
+    assert to_sql_filter({}) == ("1", [])
+    assert to_sql_filter({"source": []}) == ("0", [])
+    with pytest.raises(ValueError):
+        to_sql_filter(Filter(must=[]))
+
+
+def test_qdrant_filter_translation():
+    native = Filter(must=[])
+    assert to_qdrant_filter(None) is None
+    assert to_qdrant_filter(native) is native
+    since = datetime(2024, 1, 1)
+    assert to_qdrant_filter({"source": "a.pdf", "tags": ["x", "y"], "page": {"gte": 2}, "timestamp": {"gte": since}}) == Filter(must=[
+        FieldCondition(key="source", match=MatchValue(value="a.pdf")),
+        FieldCondition(key="tags", match=MatchAny(any=["x", "y"])),
+        FieldCondition(key="page", range=Range(gte=2)),
+        FieldCondition(key="timestamp", range=DatetimeRange(gte=since)),
+    ])
+
+
+@pytest.mark.parametrize("filters", [{"source'); DROP TABLE points; --": "x"}, {"page": {"between": 1}}])
+def test_invalid_filters(filters):
+    with pytest.raises(ValueError):
+        to_sql_filter(filters)
+    with pytest.raises(ValueError):
+        to_qdrant_filter(filters)
+
+
+def test_invalid_payload_schema():
+    with pytest.raises(ValueError, match="Valid options are"):
+        payload_schema("vector")
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_filtered_search(database, indexed):
+    database.create_collection("docs", 64, payload_indexes={"source": "keyword"} if indexed else None)
+
+    async def run():
+        await database.upsert("docs", "Quarterly revenue grew.", source_id="a.pdf", tags=["finance"])
+        await database.upsert("docs", "Quarterly revenue shrank.", source_id="b.pdf", tags=["finance", "q3"])
+        await database.upsert("docs", "The team went hiking.", source_id="c.pdf", tags=["social"])
+        by_source = await database.search("docs", "quarterly revenue", score_threshold=None, filters={"source": "b.pdf"})
+        by_tags = await database.search("docs", "quarterly revenue", score_threshold=None, filters={"tags": ["q3", "social"]})
+        return by_source, by_tags
+
+    by_source, by_tags = asyncio.run(run())
+    assert [result["text"] for result in by_source] == ["Quarterly revenue shrank."]
+    assert sorted(result["metadata"]["source"] for result in by_tags) == ["b.pdf", "c.pdf"]
@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+import numpy as np
+import pytest
+from vector.sparse import tokenize, bm25_document, bm25_query, reciprocal_rank_fusion
+from vector.vector_base import PointBatch
+
+DIMENSIONS = 64
+TEXTS = [f"Meeting notes number {i} about the quarterly budget review." for i in range(50)]
+# The only chunk naming the error code, far from the dense query
+TEXTS[37] = "Restart the exporter when it fails with ERR4711."
+
+
+def _load(database, **options):
+    vectors = np.random.default_rng(0).standard_normal((len(TEXTS), DIMENSIONS)).astype(np.float32)
+    database.create_collection("docs", DIMENSIONS, **options)
+    ids = [str(uuid.UUID(int=i)) for i in range(len(TEXTS))]
+    asyncio.run(database._write_points("docs", PointBatch(ids=ids, vectors=vectors, payloads={"text": TEXTS})))
+    return ids, vectors
+
+
+def _texts(results):
+    return [result["text"] for result in results]
+
+
+@pytest.mark.parametrize("backend", ["database", "qdrant_database"])
+def test_hybrid_search_adds_keyword_matches_to_the_dense_results(request, backend):
+    database = request.getfixturevalue(backend)
+    ids, vectors = _load(database, sparse=True)
+    dense = asyncio.run(database.search_by_vector("docs", vectors[3], limit=2, score_threshold=None))
+    assert dense[0]["id"] == ids[3] and TEXTS[37] not in _texts(dense)
+    hybrid = asyncio.run(database.search_by_vector("docs", vectors[3], limit=2, score_threshold=None, query_text="err4711"))
+    assert {result["id"] for result in hybrid} == {ids[3], ids[37]}
+
+
+@pytest.mark.parametrize("backend", ["database", "qdrant_database"])
+def test_hybrid_search_needs_a_sparse_index(request, backend):
+    database = request.getfixturevalue(backend)
+    _, vectors = _load(database)
+    with pytest.raises(ValueError):
+        asyncio.run(database.search_by_vector("docs", vectors[0], score_threshold=None, query_text="budget"))
+
+
+def test_tokens_split_on_punctuation():
+    assert tokenize("Survey-2024 of user_id.Values") == ["survey", "2024", "of", "user_id", "values"]
+
+
+def test_bm25_weights_saturate_with_term_frequency():
+    indices, weights = bm25_document("budget budget budget review")
+    weight = dict(zip(indices, weights))
+    budget, review = (bm25_query(token)[0][0] for token in ("budget", "review"))
+    assert review in weight and weight[review] < weight[budget] < 3 * weight[review]
+    assert bm25_query("budget Budget review") == (sorted([budget, review]), [1.0, 1.0])
+
+
+def test_reciprocal_rank_fusion_favours_results_ranked_by_both_lists():
+    dense = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.8}, {"id": "c", "score": 0.7}]
+    keyword = [{"id": "c", "score": 5.0}, {"id": "d", "score": 4.0}]
+    fused = reciprocal_rank_fusion([dense, keyword], limit=3, k=60)
+    assert [result["id"] for result in fused] == ["c", "a", "b"]
+    assert fused[0]["score"] == pytest.approx(1 / 63 + 1 / 61)
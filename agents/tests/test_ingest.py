@@ -0,0 +1,79 @@
+import asyncio
+import os
+import pytest
+from vector.ingest import DirectoryIngest, html_text, iter_files
+
+
+def _paragraphs(name, count):
+    return "\n\n".join(f"Paragraph {i} of {name}, with a few words about it." for i in range(count))
+
+
+@pytest.fixture
+def documents(tmp_path):
+    directory = tmp_path / "documents"
+    (directory / "nested").mkdir(parents=True)
+    (directory / ".hidden").mkdir()
+    for name, count in (("a", 5), ("b", 3)):
+        (directory / f"{name}.txt").write_text(_paragraphs(name, count))
+    (directory / "nested" / "c.md").write_text(_paragraphs("c", 4))
+    (directory / "nested" / "image.png").write_bytes(b"\x89PNG")
+    (directory / ".hidden" / "d.txt").write_text("hidden")
+    return directory
+
+
+def _ingest(database, paths, **options):
+    database.create_collection("docs", 64)
+    ingest = DirectoryIngest(database, "docs", batch_size=60, overlap=0, workers=1, upsert_batch_size=2, upsert_concurrency=1, report_interval=0, **options)
+    return asyncio.run(ingest.run(paths))
+
+
+def test_iter_files_walks_in_a_stable_order(documents):
+    files = list(iter_files([str(documents), str(documents / "a.txt"), str(documents / "nested" / "image.png")], [".txt", ".md"]))
+    assert [os.path.relpath(path, documents) for path in files] == ["a.txt", "b.txt", os.path.join("nested", "c.md"), os.path.join("nested", "image.png")]
+    with pytest.raises(FileNotFoundError):
+        list(iter_files([str(documents / "missing")], [".txt"]))
+
+
+def test_html_text_drops_markup_scripts_and_styles():
+    page = b"<html><head><style>p {}</style><script>run()</script></head><body><p>Hello <b>world</b></p></body></html>"
+    assert html_text(page) == "Hello world"
+
+
+def test_directories_are_ingested_once(database, documents):
+    progress = _ingest(database, [str(documents)])
+    assert (progress.files, progress.completed, progress.skipped, progress.failed) == (3, 3, 0, 0)
+    assert progress.upserted == database.count("docs") == 12
+    result = asyncio.run(database.search("docs", "Paragraph 2 of c", limit=1, score_threshold=None))
+    assert result[0]["metadata"]["source"] == str(documents / "nested" / "c.md")
+    progress = _ingest(database, [str(documents)])
+    assert (progress.skipped, progress.completed, progress.embedded) == (3, 0, 0)
+
+
+def test_changed_files_are_reingested_incrementally(database, documents):
+    _ingest(database, [str(documents)])
+    path = documents / "a.txt"
+    path.write_text(_paragraphs("a", 3) + "\n\nA new closing paragraph.")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    progress = _ingest(database, [str(documents)])
+    assert (progress.skipped, progress.completed, progress.embedded) == (2, 1, 1)
+    # Paragraphs 3 and 4 of a.txt are gone, one paragraph was added
+    assert database.count("docs") == 11
+
+
+def test_interrupted_runs_resume_from_unfinished_files(database, documents, monkeypatch):
+    write_points = database._write_points
+    failing = str(documents / "nested" / "c.md")
+
+    async def fail_on_c(collection_name, batch):
+        if failing in batch.payloads["source"]:
+            raise ConnectionError("backend went away")
+        await write_points(collection_name, batch)
+
+    monkeypatch.setattr(database, "_write_points", fail_on_c)
+    with pytest.raises(ConnectionError):
+        _ingest(database, [str(documents)])
+    monkeypatch.setattr(database, "_write_points", write_points)
+    progress = _ingest(database, [str(documents)])
+    assert (progress.skipped, progress.completed, progress.embedded) == (2, 1, 4)
+    assert database.count("docs") == 12
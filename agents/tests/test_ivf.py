@@ -0,0 +1,35 @@
+import asyncio
+import numpy as np
+from semantic_kernel import Kernel
+from vector.embedding_providers import HashingEmbeddingProvider
+from vector.ivf import IVFVectorDatabase
+from vector.vector_base import PointBatch
+
+DIMENSIONS = 32
+
+
+def _write(database, start, count):
+    vectors = np.random.default_rng(start).standard_normal((count, DIMENSIONS)).astype(np.float32)
+    ids = [f"{i:05d}" for i in range(start, start + count)]
+    asyncio.run(database._write_points("docs", PointBatch(ids=ids, vectors=vectors, payloads={"text": ids})))
+    return vectors
+
+
+def test_index_is_retrained_as_the_collection_grows(tmp_path, manifest):
+    database = IVFVectorDatabase(Kernel(), str(tmp_path), manifest=manifest, embedding_service=HashingEmbeddingProvider(DIMENSIONS), nlist=4, nprobe=4, retrain_growth=2.0)
+    database.create_collection("docs", DIMENSIONS)
+    collection = database._collection("docs")
+    _write(database, 0, 100)
+    # Untrained until every list can get enough points
+    assert collection.centroids is None
+    while collection.centroids is None:
+        _write(database, collection.count, 100)
+    trained = collection.index["trained_count"]
+    _write(database, collection.count, trained)
+    assert collection.index["trained_count"] == 2 * trained
+    assert (collection.assignments[:collection.count] >= 0).all()
+    vectors = _write(database, collection.count, 10)
+    # Every point is in the list of its nearest centroid, so probing all lists finds it
+    results = asyncio.run(database.search_many_by_vector("docs", vectors, limit=1, score_threshold=None))
+    assert [result[0]["id"] for result in results] == [f"{i:05d}" for i in range(collection.count - 10, collection.count)]
+    database.close()
@@ -0,0 +1,62 @@
+import asyncio
+from vector.manifest import point_id
+
+
+def test_changes_diff_against_the_previous_version(manifest):
+    manifest.replace("docs", "a.txt", [point_id("a.txt", text) for text in ("one", "two", "three")])
+    changes = manifest.changes("docs", "a.txt")
+    assert list(changes.filter(["one", "three", "four", "four"])) == ["four"]
+    assert (changes.added, changes.unchanged) == (1, 2)
+    assert changes.removed == [point_id("a.txt", "two")]
+
+
+def test_point_ids_depend_on_source_and_text():
+    assert point_id("a.txt", "one") == point_id("a.txt", "one")
+    assert point_id("a.txt", "one") != point_id("b.txt", "one")
+    assert point_id("a.txt", "one") != point_id("a.txt", "two")
+    # Without a source, identical chunks of different documents are distinct points
+    assert point_id(None, "one") != point_id(None, "one")
+
+
+def test_chunks_without_source_never_overwrite_each_other(database):
+    database.create_collection("docs", 64)
+    asyncio.run(database.upsert("docs", "Terms and conditions apply."))
+    asyncio.run(database.upsert("docs", "Terms and conditions apply."))
+    assert database.count("docs") == 2
+
+
+def test_replace_clears_the_file_fingerprint(manifest):
+    manifest.replace("docs", "a.txt", ["1"])
+    manifest.record_file("docs", "a.txt", 10, 20)
+    assert manifest.file_fingerprint("docs", "a.txt") == (10, 20)
+    manifest.replace("docs", "a.txt", ["2"])
+    assert manifest.file_fingerprint("docs", "a.txt") is None
+    assert manifest.point_ids("docs", "a.txt") == {"2"}
+
+
+def test_reingesting_a_source_adds_changes_and_deletes(database):
+    database.create_collection("docs", 64)
+
+    async def ingest(paragraphs):
+        await database.upsert("docs", "\n\n".join(paragraphs), batch_size=40, overlap=0, source_id="a.txt")
+
+    asyncio.run(ingest(["First paragraph here.", "Second paragraph here.", "Third paragraph here."]))
+    assert database.count("docs") == 3
+    embedded = []
+    original = database.embedding_service.generate_embeddings
+
+    async def spy(texts, **kwargs):
+        embedded.extend(texts)
+        return await original(texts, **kwargs)
+
+    database.embedding_service.generate_embeddings = spy
+    asyncio.run(ingest(["First paragraph here.", "Second paragraph changed.", "Fourth paragraph here."]))
+    # Only the new and changed chunks are embedded again, the removed ones are deleted
+    assert sorted(embedded) == ["Fourth paragraph here.", "Second paragraph changed."]
+    assert database.count("docs") == 3
+    expected = {point_id("a.txt", text) for text in ("First paragraph here.", "Second paragraph changed.", "Fourth paragraph here.")}
+    assert database.manifest.point_ids("docs", "a.txt") == expected
+
+    asyncio.run(database.delete_source("docs", "a.txt"))
+    assert database.count("docs") == 0
+    assert database.manifest.point_ids("docs", "a.txt") == set()
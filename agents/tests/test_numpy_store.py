@@ -0,0 +1,89 @@
+import asyncio
+import numpy as np
+import pytest
+from semantic_kernel import Kernel
+from vector.embedding_providers import HashingEmbeddingProvider
+from vector.numpy_store import NumpyVectorDatabase
+from vector.vector_base import PointBatch
+
+
+def _write(database, name, ids, vectors, texts=None):
+    texts = texts or [f"text of {id}" for id in ids]
+    asyncio.run(database._write_points(name, PointBatch(ids=ids, vectors=vectors, payloads={"text": texts})))
+
+
+def _search(database, name, vector, **options):
+    return asyncio.run(database.search_by_vector(name, vector, **{"limit": 10, "score_threshold": None, **options}))
+
+
+def _random(count, dimensions=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+
+
+@pytest.mark.parametrize("distance", ["Cosine", "Dot", "Euclid"])
+def test_search_matches_a_brute_force_scan(database, distance):
+    vectors = _random(300)
+    query = _random(1, seed=1)[0]
+    database.create_collection("points", 8, distance)
+    # Written in several batches, which grows the memory-mapped arrays past their initial capacity
+    for start in range(0, 300, 64):
+        _write(database, "points", [str(i) for i in range(start, min(start + 64, 300))], vectors[start:start + 64])
+    if distance == "Cosine":
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = normalized @ (query / np.linalg.norm(query))
+    elif distance == "Dot":
+        expected = vectors @ query
+    else:
+        # Reported as distances, smallest first, like Qdrant does
+        expected = -np.linalg.norm(vectors - query, axis=1)
+    order = np.argsort(-expected)[:10]
+    results = _search(database, "points", query)
+    assert [result["id"] for result in results] == [str(i) for i in order]
+    scores = [abs(result["score"]) for result in results]
+    np.testing.assert_allclose(scores, np.abs(expected[order]), rtol=1e-5)
+
+
+def test_score_threshold(database):
+    database.create_collection("points", 8)
+    vectors = _random(50)
+    _write(database, "points", [str(i) for i in range(50)], vectors)
+    results = _search(database, "points", vectors[0], score_threshold=0.5)
+    assert results and all(result["score"] >= 0.5 for result in results)
+    assert results[0]["id"] == "0"
+
+
+def test_upserts_overwrite_and_deletes_move_rows(database):
+    database.create_collection("points", 8)
+    vectors = _random(20)
+    _write(database, "points", [str(i) for i in range(20)], vectors)
+    overwrite = _random(1, seed=1)[0]
+    _write(database, "points", ["3"], overwrite, ["rewritten"])
+    assert database.count("points") == 20
+    database._delete_points("points", ["0", "5", "missing"])
+    assert database.count("points") == 18
+    stored = {str(i): vectors[i] for i in range(20) if i not in (0, 5)}
+    stored["3"] = overwrite
+    # The last rows filled the holes: every remaining point is still found by its own vector
+    for id, vector in stored.items():
+        assert _search(database, "points", vector, limit=1)[0]["id"] == id
+    assert _search(database, "points", overwrite, limit=1)[0]["text"] == "rewritten"
+
+
+def test_collections_persist_across_reopening(tmp_path, manifest):
+    path = str(tmp_path / "collections")
+    database = NumpyVectorDatabase(Kernel(), path, manifest=manifest, embedding_service=HashingEmbeddingProvider(8))
+    database.create_collection("points", 8)
+    vectors = _random(40)
+    _write(database, "points", [str(i) for i in range(40)], vectors)
+    database.close()
+    reopened = NumpyVectorDatabase(Kernel(), path, manifest=manifest, embedding_service=HashingEmbeddingProvider(8))
+    assert reopened.count("points") == 40
+    assert _search(reopened, "points", vectors[12])[0]["id"] == "12"
+    reopened.close()
+
+
+def test_vectors_of_the_wrong_size_are_rejected(database):
+    database.create_collection("points", 8)
+    with pytest.raises(ValueError):
+        _write(database, "points", ["a"], _random(1, dimensions=4))
+
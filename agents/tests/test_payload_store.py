@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import pytest
+from vector.payload_store import PayloadStore
+
+DOCUMENT = "\n\n".join([
+    "Invoices are due within thirty days.",
+    "The office is closed on public holidays.",
+    "Refunds are processed within five business days.",
+])
+
+
+class ThreadRecorder:
+    """Forwards to a payload store, recording the threads its reads run on."""
+
+    def __init__(self, store):
+        self.store = store
+        self.threads = []
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def get_many(self, collection_name, ids):
+        self.threads.append(threading.current_thread())
+        return self.store.get_many(collection_name, ids)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PayloadStore(str(tmp_path / "payloads.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_texts_round_trip_per_collection(store):
+    ids = [str(i) for i in range(1200)]
+    store.put_many("docs", ids, [f"text {i} " * 20 for i in range(1200)])
+    store.put_many("wiki", ["0"], ["other"])
+    # Looked up in several statements, unknown ids left out
+    texts = store.get_many("docs", ids + ["missing"])
+    assert len(texts) == 1200 and texts["7"] == "text 7 " * 20
+    assert store.get_many("wiki", ["0", "1"]) == {"0": "other"}
+    store.delete_many("docs", ["7"])
+    assert "7" not in store.get_many("docs", ["7", "8"])
+    store.drop_collection("docs")
+    assert store.get_many("docs", ids) == {} and store.get_many("wiki", ["0"]) == {"0": "other"}
+
+
+def test_texts_are_stored_compressed(store):
+    store.put_many("docs", ["a"], ["repeated words " * 100])
+    (size,) = store._conn.execute("SELECT length(text) FROM texts").fetchone()
+    assert size < len("repeated words " * 100) / 10
+
+
+def test_qdrant_keeps_texts_in_the_store(qdrant_database, store, tmp_path):
+    qdrant_database.payload_store = ThreadRecorder(store)
+    qdrant_database.create_collection("docs", 64)
+    asyncio.run(qdrant_database.upsert("docs", DOCUMENT, batch_size=50, overlap=0, source_id="handbook.txt"))
+    records, _ = qdrant_database.client.scroll("docs", with_payload=True)
+    assert len(records) == 3 and all("text" not in record.payload for record in records)
+    result = asyncio.run(qdrant_database.search("docs", "refunds processed", limit=1, score_threshold=None))
+    assert result[0]["text"] == "Refunds are processed within five business days."
+    # Exports read the texts back from the store
+    assert asyncio.run(qdrant_database.export_collection("docs", str(tmp_path / "snapshot"))) == 3
+    assert asyncio.run(qdrant_database.import_collection(str(tmp_path / "snapshot"), "restored")) == 3
+    records, _ = qdrant_database.client.scroll("restored", with_payload=True)
+    assert sorted(store.get_many("restored", [record.id for record in records]).values()) == sorted(DOCUMENT.split("\n\n"))
+    assert threading.main_thread() not in qdrant_database.payload_store.threads
+
+
+def test_async_qdrant_reads_the_store_off_the_event_loop(async_qdrant_database, store, tmp_path):
+    async_qdrant_database.payload_store = ThreadRecorder(store)
+
+    async def run():
+        await async_qdrant_database.create_collection("docs", 64)
+        await async_qdrant_database.upsert("docs", DOCUMENT, batch_size=50, overlap=0, source_id="handbook.txt")
+        result = await async_qdrant_database.search("docs", "office closed", limit=1, score_threshold=None)
+        exported = await async_qdrant_database.export_collection("docs", str(tmp_path / "snapshot"))
+        return result, exported
+
+    result, exported = asyncio.run(run())
+    assert result[0]["text"] == "The office is closed on public holidays."
+    assert exported == 3
+    threads = async_qdrant_database.payload_store.threads
+    assert len(threads) == 2 and threading.main_thread() not in threads
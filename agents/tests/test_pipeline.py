@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from vector.pipeline import run_stages
+
+TEXT = "\n\n".join(f"Paragraph number {i} of the document." for i in range(300))
+
+
+def test_stages_hand_every_item_to_the_consumers():
+    queue = asyncio.Queue(2)
+    consumed = []
+
+    async def produce(start):
+        for i in range(start, start + 50):
+            await queue.put(i)
+
+    async def consume():
+        while (item := await queue.get()) is not None:
+            consumed.append(item)
+
+    asyncio.run(run_stages([produce(0), produce(50)], [consume() for _ in range(3)], queue))
+    assert sorted(consumed) == list(range(100))
+
+
+def test_first_failure_cancels_the_other_stages():
+    queue = asyncio.Queue(2)
+    produced = []
+
+    async def produce():
+        for i in range(10 ** 6):
+            await queue.put(i)
+            produced.append(i)
+
+    async def consume():
+        await queue.get()
+        raise RuntimeError("write failed")
+
+    async def run():
+        await run_stages([produce()], [consume()], queue)
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        asyncio.run(run())
+    # The producer stopped once the queue was full instead of running to the end
+    assert len(produced) <= 3
+
+
+def test_ingest_pipeline(database):
+    database.create_collection("docs", 64)
+    reports = []
+    progress = asyncio.run(database.ingest(
+        "docs", TEXT, batch_size=40, overlap=0, upsert_batch_size=16,
+        source_id="doc.txt", upsert_concurrency=3, on_progress=reports.append,
+    ))
+    assert progress.chunks == progress.embedded == progress.upserted == database.count("docs") == 300
+    assert progress.batches == 19
+    assert reports[-1] is progress
+    assert len(database.manifest.point_ids("docs", "doc.txt")) == 300
+
+
+def test_failing_upserts_stop_the_ingest(database):
+    database.create_collection("docs", 64)
+    embedded = []
+    generate = database.embedding_service.generate_embeddings
+
+    async def counting(texts, **kwargs):
+        embedded.extend(texts)
+        return await generate(texts, **kwargs)
+
+    def failing(collection_name, batch):
+        raise OSError("disk full")
+
+    database.embedding_service.generate_embeddings = counting
+    # Small requests, so the embedding doesn't go through the whole input in a couple of them
+    database.embedder.max_inputs = 4
+    database._upsert_points = failing
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(database.ingest("docs", TEXT, batch_size=40, overlap=0, upsert_batch_size=4, upsert_concurrency=1, source_id="doc.txt"))
+    assert len(embedded) < 300
+    # Nothing is recorded for a source whose ingest failed
+    assert database.manifest.point_ids("docs", "doc.txt") == set()
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+import numpy as np
+from vector.vector_base import PointBatch, PointData, PointPayload
+
+
+def test_vectors_are_one_float32_row_per_point():
+    batch = PointBatch(ids=["a", "b"], vectors=[[1, 2], [3, 4]], payloads={})
+    assert batch.vectors.dtype == np.float32 and batch.vectors.shape == (2, 2)
+    assert len(batch) == 2 and batch.texts == ["", ""]
+
+
+def test_payload_dicts_skip_missing_and_excluded_fields():
+    batch = PointBatch(ids=["a", "b"], vectors=np.zeros((2, 2)), payloads={"text": ["x", "y"], "source": ["s", None]})
+    assert batch.payload_dicts() == [{"text": "x", "source": "s"}, {"text": "y"}]
+    assert batch.payload_dicts(exclude=("text",)) == [{"source": "s"}, {}]
+
+
+def test_concatenate_fills_fields_missing_from_some_batches():
+    first = PointBatch(ids=["a"], vectors=np.ones((1, 2)), payloads={"text": ["x"]})
+    second = PointBatch(ids=["b", "c"], vectors=np.zeros((2, 2)), payloads={"text": ["y", "z"], "tags": [["t"], None]})
+    batch = PointBatch.concatenate([first, second])
+    assert batch.ids == ["a", "b", "c"]
+    np.testing.assert_array_equal(batch.vectors, [[1, 1], [0, 0], [0, 0]])
+    assert batch.payloads == {"text": ["x", "y", "z"], "tags": [None, ["t"], None]}
+
+
+def test_from_points_builds_the_columns():
+    timestamp = datetime(2024, 1, 2, 3, 4, 5)
+    points = [
+        PointData("a", np.array([1.0, 2.0]), PointPayload(timestamp, "x", source="s")),
+        PointData("b", np.array([[3.0, 4.0]]), PointPayload(timestamp, "y", extra={"page": 2})),
+    ]
+    batch = PointBatch.from_points(points)
+    np.testing.assert_array_equal(batch.vectors, [[1, 2], [3, 4]])
+    assert batch.payload_dicts() == [point.payload.to_dict() for point in points]
+    assert len(PointBatch.from_points([])) == 0
+
+
+def test_ingested_points_keep_their_payload_columns(database):
+    database.create_collection("docs", 64)
+    asyncio.run(database.upsert("docs", "First paragraph.\n\nSecond paragraph.", batch_size=20, overlap=0, source_id="a.txt", tags=["notes"]))
+    results = asyncio.run(database.search("docs", "second paragraph", limit=1, score_threshold=None))
+    assert results[0]["text"] == "Second paragraph."
+    assert results[0]["metadata"]["source"] == "a.txt" and results[0]["metadata"]["tags"] == ["notes"]
@@ -0,0 +1,75 @@
+import asyncio
+import numpy as np
+import pytest
+from vector.precision import AdaptivePrecision, SearchPrecision, PRECISION_LEVELS, resolve_precision
+from vector.qdrant import _search_params
+from vector.vector_base import PointBatch
+
+
+def test_resolve_precision():
+    assert resolve_precision() is None
+    assert resolve_precision("fast") is PRECISION_LEVELS["fast"]
+    assert resolve_precision("fast", exact=True).exact
+    custom = SearchPrecision(hnsw_ef=64)
+    assert resolve_precision(custom) is custom
+    with pytest.raises(ValueError):
+        resolve_precision("fastest")
+
+
+def test_adaptive_precision_follows_the_latency():
+    adaptive = AdaptivePrecision(headroom=0.5, samples=3)
+    assert adaptive.level("docs", 0.1) == "balanced"
+    adaptive.record("docs", 0.1, "balanced", 0.2)
+    assert adaptive.level("docs", 0.1) == "fast"
+    # A search started at the previous level doesn't count
+    adaptive.record("docs", 0.1, "balanced", 0.01)
+    for _ in range(2):
+        adaptive.record("docs", 0.1, "fast", 0.01)
+        assert adaptive.level("docs", 0.1) == "fast"
+    adaptive.record("docs", 0.1, "fast", 0.01)
+    assert adaptive.level("docs", 0.1) == "balanced"
+    # Targets and collections have their own levels
+    assert adaptive.level("docs", 1.0) == "balanced" and adaptive.level("wiki", 0.1) == "balanced"
+    with pytest.raises(ValueError):
+        adaptive.level("docs", 0)
+
+
+def test_choose_takes_a_precision_or_a_latency_target():
+    adaptive = AdaptivePrecision()
+    with adaptive.choose("docs", "accurate") as precision:
+        assert precision is PRECISION_LEVELS["accurate"]
+    with adaptive.choose("docs", latency_target=10.0) as precision:
+        assert precision is PRECISION_LEVELS["balanced"]
+    assert adaptive._states[("docs", 10.0)].samples == 1
+    with pytest.raises(ValueError):
+        with adaptive.choose("docs", "fast", latency_target=1.0):
+            pass
+
+
+def test_qdrant_search_params_of_a_precision():
+    assert _search_params(PRECISION_LEVELS["exact"]).exact
+    params = _search_params(PRECISION_LEVELS["fast"])
+    assert params.hnsw_ef == 32 and params.quantization.oversampling == 1.0
+
+
+def test_numpy_searches_run_at_the_asked_precision(database):
+    vectors = np.random.default_rng(0).standard_normal((500, 64)).astype(np.float32)
+    database.create_collection("docs", 64, quantization="binary")
+    ids = [str(i) for i in range(500)]
+    asyncio.run(database._write_points("docs", PointBatch(ids=ids, vectors=vectors, payloads={"text": ids})))
+    queries = vectors[:10] + 0.5 * np.random.default_rng(1).standard_normal((10, 64)).astype(np.float32)
+
+    def search(**options):
+        results = asyncio.run(database.search_many_by_vector("docs", queries, limit=10, score_threshold=None, **options))
+        return [[result["id"] for result in found] for found in results]
+
+    exact = search(exact=True)
+    assert search(precision="exact") == exact
+    # Less oversampling of the binary codes finds fewer of the exact results
+    recall = {
+        level: sum(len(set(found) & set(truth)) for found, truth in zip(search(precision=level), exact))
+        for level in ("fast", "accurate")
+    }
+    assert recall["fast"] < recall["accurate"]
+    search(latency_target=10.0)
+    assert database.adaptive_precision._states[("docs", 10.0)].samples == 1
@@ -0,0 +1,51 @@
+import asyncio
+
+DOCUMENT = "\n\n".join([
+    "Invoices are due within thirty days.",
+    "The office is closed on public holidays.",
+    "Refunds are processed within five business days.",
+    "Passwords must be rotated every ninety days.",
+])
+
+
+class CallCounter:
+    """Forwards to a client, counting the calls of each method."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return attribute(*args, **kwargs)
+        return call
+
+
+def _ingest(database, **options):
+    database.create_collection("docs", 64, **options)
+    asyncio.run(database.upsert("docs", DOCUMENT, batch_size=60, overlap=0, source_id="handbook.txt"))
+
+
+def test_search_many_runs_one_batch_call_in_query_order(qdrant_database):
+    _ingest(qdrant_database)
+    queries = ["passwords rotated", "invoices due", "refunds processed"]
+    singles = [asyncio.run(qdrant_database.search("docs", query, limit=2, score_threshold=None)) for query in queries]
+    qdrant_database.client = CallCounter(qdrant_database.client)
+    results = asyncio.run(qdrant_database.search_many("docs", queries, limit=2, score_threshold=None))
+    assert qdrant_database.client.calls.get("query_batch_points") == 1
+    assert [[result["id"] for result in query_results] for query_results in results] == [[result["id"] for result in single] for single in singles]
+    assert [query_results[0]["text"].split()[0] for query_results in results] == ["Passwords", "Invoices", "Refunds"]
+    assert asyncio.run(qdrant_database.search_many("docs", [])) == []
+
+
+def test_results_carry_text_and_metadata(qdrant_database):
+    _ingest(qdrant_database)
+    result = asyncio.run(qdrant_database.search("docs", "office holidays", limit=1, score_threshold=None))[0]
+    assert result["text"] == "The office is closed on public holidays."
+    assert result["metadata"]["source"] == "handbook.txt"
+    assert 0 < result["score"] <= 1
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+import vector.qdrant_async as qdrant_async
+from vector.qdrant_async import AsyncQdrantVectorDatabase
+from vector.embedding_providers import HashingEmbeddingProvider
+
+DOCUMENT = "\n\n".join([
+    "Invoices are due within thirty days.",
+    "The office is closed on public holidays.",
+    "Refunds are processed within five business days.",
+    "Passwords must be rotated every ninety days.",
+])
+
+
+def test_concurrent_searches_match_sequential_ones(async_qdrant_database):
+    database = async_qdrant_database
+    queries = ["passwords rotated", "invoices due", "refunds processed", "office holidays"]
+
+    async def run():
+        await database.create_collection("docs", 64)
+        await database.upsert("docs", DOCUMENT, batch_size=60, overlap=0, source_id="handbook.txt")
+        sequential = [await database.search("docs", query, limit=2, score_threshold=None) for query in queries]
+        concurrent = await asyncio.gather(*(database.search("docs", query, limit=2, score_threshold=None) for query in queries))
+        return sequential, concurrent
+
+    sequential, concurrent = asyncio.run(run())
+    assert [[result["id"] for result in results] for results in concurrent] == [[result["id"] for result in results] for results in sequential]
+    assert [results[0]["text"].split()[0] for results in concurrent] == ["Passwords", "Invoices", "Refunds", "The"]
+
+
+def test_calls_are_cancelled_after_their_timeout(async_qdrant_database):
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(async_qdrant_database._call(slow(), 0.01))
+
+
+def test_sub_second_timeouts_are_not_truncated(monkeypatch):
+    options = {}
+
+    class Client:
+        def __init__(self, **kwargs):
+            options.update(kwargs)
+
+    monkeypatch.setattr(qdrant_async, "AsyncQdrantClient", Client)
+    database = AsyncQdrantVectorDatabase(None, "http://localhost:6333", None, timeout=0.5, embedding_service=HashingEmbeddingProvider(8))
+    assert options["timeout"] == 1
+    assert database.timeout == 0.5
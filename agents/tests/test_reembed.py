@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import pytest
+from semantic_kernel import Kernel
+from vector.embedding_providers import HashingEmbeddingProvider
+from vector.numpy_store import NumpyVectorDatabase
+
+DOCUMENT = "\n\n".join(f"Paragraph {i} is about topic number {i}." for i in range(20))
+
+
+class CustomProvider(HashingEmbeddingProvider):
+    """A provider that can't be recreated from its model id."""
+
+    def __init__(self, dimensions):
+        super().__init__(dimensions)
+        self.model_id = "custom-model"
+
+
+def _database(tmp_path, manifest, dimensions=64):
+    return NumpyVectorDatabase(Kernel(), str(tmp_path / "collections"), manifest=manifest, embedding_service=HashingEmbeddingProvider(dimensions))
+
+
+def _reembed(database, tmp_path, provider, **options):
+    return asyncio.run(database.reembed(
+        "docs", "docs_v2", provider, source_collection="docs_v1", batch_size=4, max_texts_per_second=None,
+        checkpoint_path=str(tmp_path / "checkpoint.json"), report_interval=0, **options
+    ))
+
+
+@pytest.fixture
+def source(tmp_path, manifest):
+    database = _database(tmp_path, manifest)
+    database.create_collection("docs_v1", 64)
+    asyncio.run(database.upsert("docs_v1", DOCUMENT, batch_size=45, overlap=0, source_id="doc.txt"))
+    assert database.count("docs_v1") == 20
+    yield database
+    database.close()
+
+
+def _top_text(database, query):
+    return asyncio.run(database.search("docs", query, limit=1, score_threshold=None))[0]["text"]
+
+
+def test_reembedding_swaps_the_alias_to_the_new_collection(source, tmp_path, manifest):
+    progress = _reembed(source, tmp_path, HashingEmbeddingProvider(32))
+    assert (progress.embedded, progress.upserted, progress.resumed) == (20, 20, 0)
+    assert asyncio.run(source.resolve_collection("docs")) == "docs_v2"
+    assert source._collection("docs_v2").vector_size == 32 and source.count("docs_v2") == 20
+    assert _top_text(source, "topic number 7") == "Paragraph 7 is about topic number 7."
+    assert not os.path.exists(tmp_path / "checkpoint.json")
+    # The model is kept with the collection: a database opened later embeds the queries with it
+    with open(tmp_path / "collections" / "docs_v2" / "config.json") as f:
+        assert json.load(f)["embedding_model"] == {"model_id": "hashing-32", "dimensions": 32}
+    source.close()
+    reopened = _database(tmp_path, manifest)
+    assert reopened.query_embedder_for("docs_v2").embedder.embedding_service.dimensions == 32
+    assert _top_text(reopened, "topic number 11") == "Paragraph 11 is about topic number 11."
+    reopened.close()
+
+
+def test_models_without_a_registered_provider_are_refused(source, tmp_path, manifest):
+    _reembed(source, tmp_path, CustomProvider(32))
+    source.close()
+    reopened = _database(tmp_path, manifest)
+    with pytest.raises(ValueError, match="custom-model"):
+        _top_text(reopened, "topic number 3")
+    reopened.register_embedding_service(CustomProvider(32))
+    assert _top_text(reopened, "topic number 3") == "Paragraph 3 is about topic number 3."
+    reopened.close()
+
+
+def test_interrupted_jobs_resume_from_their_checkpoint(source, tmp_path, monkeypatch):
+    write_points = source._write_points
+    writes = []
+
+    async def fail_third_write(collection_name, batch):
+        writes.append(len(batch))
+        if len(writes) == 3:
+            raise ConnectionError("backend went away")
+        await write_points(collection_name, batch)
+
+    monkeypatch.setattr(source, "_write_points", fail_third_write)
+    with pytest.raises(ConnectionError):
+        _reembed(source, tmp_path, HashingEmbeddingProvider(32))
+    with open(tmp_path / "checkpoint.json") as f:
+        assert json.load(f)["done"] == 8
+    assert asyncio.run(source.resolve_collection("docs")) == "docs"
+    monkeypatch.setattr(source, "_write_points", write_points)
+    progress = _reembed(source, tmp_path, HashingEmbeddingProvider(32))
+    assert (progress.resumed, progress.embedded) == (8, 12)
+    assert source.count("docs_v2") == 20
+    # A checkpoint of another job isn't resumed
+    with open(tmp_path / "checkpoint.json", "w") as f:
+        json.dump({"alias": "docs", "source": "docs_v2", "target": "docs_v3", "model": "other", "dimensions": 8, "done": 12}, f)
+    progress = asyncio.run(source.reembed("docs", "docs_v3", HashingEmbeddingProvider(16), max_texts_per_second=None, checkpoint_path=str(tmp_path / "checkpoint.json"), report_interval=0))
+    assert (progress.resumed, progress.embedded) == (0, 20)
+
+
+def test_providers_that_dont_fit_the_new_collection_are_refused(tmp_path, manifest):
+    database = _database(tmp_path, manifest)
+    database.create_collection("docs_v1", 64)
+    # Created with another size by an earlier run
+    database.create_collection("docs_v2", 16)
+    with pytest.raises(ValueError, match="size 32"):
+        _reembed(database, tmp_path, HashingEmbeddingProvider(32))
+    assert asyncio.run(database.resolve_collection("docs")) == "docs"
+    database.close()
+
+
+def test_qdrant_records_the_model_in_the_manifest(qdrant_database, manifest):
+    qdrant_database.create_collection("docs_v2", 32)
+    qdrant_database.set_embedding_service("docs_v2", HashingEmbeddingProvider(32))
+    assert manifest.embedding_model("docs_v2") == {"model_id": "hashing-32", "dimensions": 32}
+    qdrant_database._collection_embedders.clear()
+    assert qdrant_database.query_embedder_for("docs_v2").embedder.embedding_service.dimensions == 32
+    assert qdrant_database.query_embedder_for("other") is qdrant_database.query_embedder
+    manifest.drop_collection("docs_v2")
+    assert manifest.embedding_model("docs_v2") is None
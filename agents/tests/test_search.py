@@ -0,0 +1,103 @@
+import asyncio
+import numpy as np
+import pytest
+import uuid
+from config import DIMENSION_RERANK_OVERSAMPLING
+from vector.qdrant import _dense_query
+from vector.quantization import ScalarQuantizer, BinaryQuantizer
+from vector.vector_base import PointBatch
+
+DIMENSIONS = 64
+POINTS = 2000
+
+
+def _vectors(count, seed=0):
+    # Energy decays along the dimensions, as in embeddings that can be truncated
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSIONS)) / np.sqrt(1 + np.arange(DIMENSIONS) / 4)
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _load(database, name, vectors, **options):
+    database.create_collection(name, DIMENSIONS, **options)
+    # UUIDs of the row numbers, valid point ids for Qdrant too
+    ids = [str(uuid.UUID(int=i)) for i in range(len(vectors))]
+    asyncio.run(database._write_points(name, PointBatch(ids=ids, vectors=vectors, payloads={"text": ids})))
+
+
+def _search(database, name, queries, **search_params):
+    return asyncio.run(database.search_many_by_vector(name, queries, limit=10, score_threshold=None, **search_params))
+
+
+@pytest.mark.parametrize("options, min_recall", [
+    ({"quantization": "scalar"}, 0.9),
+    # One bit per dimension of 64-dimension vectors only ranks coarsely
+    ({"quantization": "binary", "oversampling": 20.0}, 0.6),
+    ({"index_dimensions": 32}, 0.9),
+    ({"quantization": "scalar", "index_dimensions": 32}, 0.85),
+])
+def test_two_stage_search_is_rescored_with_full_vectors(database, options, min_recall):
+    vectors = _vectors(POINTS)
+    # Queries near stored points, each point being the true nearest neighbour of its query
+    queries = vectors[:20] + 0.05 * _vectors(20, seed=1)
+    _load(database, "exact", vectors)
+    _load(database, "two_stage", vectors, **options)
+    expected = _search(database, "exact", queries)
+    results = _search(database, "two_stage", queries)
+    overlap = 0
+    for query, found, truth in zip(queries, results, expected):
+        assert found[0]["id"] == truth[0]["id"]
+        # Returned scores are the full-precision cosine similarities, not first-pass estimates
+        for result in found:
+            assert result["score"] == pytest.approx(float(vectors[uuid.UUID(result["id"]).int] @ query / np.linalg.norm(query)), abs=1e-5)
+        overlap += len({result["id"] for result in found} & {result["id"] for result in truth})
+    assert overlap / (10 * len(queries)) >= min_recall
+    # An exact search of the two-stage collection skips the first pass entirely
+    assert [[r["id"] for r in found] for found in _search(database, "two_stage", queries, exact=True)] == [[r["id"] for r in truth] for truth in expected]
+
+
+def test_scalar_quantizer_scores_approximate_float_scores():
+    vectors = _vectors(500)
+    queries = _vectors(4, seed=1)
+    quantizer = ScalarQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.dtype == np.int8
+    for distance in ("COSINE", "DOT", "EUCLID"):
+        scores = quantizer.scores(queries, codes, distance)
+        decoded = quantizer.decode(codes)
+        if distance == "EUCLID":
+            expected = -np.sqrt(((queries[:, None, :] - decoded[None]) ** 2).sum(axis=2))
+        else:
+            expected = queries @ decoded.T
+        assert scores.shape == (4, 500)
+        np.testing.assert_allclose(scores, expected, rtol=1e-4, atol=1e-4)
+
+
+def test_binary_quantizer_scores_are_negative_hamming_distances():
+    vectors = _vectors(300)
+    queries = _vectors(3, seed=1)
+    quantizer = BinaryQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+    query_bits = np.unpackbits(quantizer.encode(queries), axis=1)
+    bits = np.unpackbits(codes, axis=1)
+    expected = -(query_bits[:, None, :] != bits[None]).sum(axis=2)
+    np.testing.assert_array_equal(quantizer.scores(queries, codes, "COSINE"), expected)
+
+
+def test_qdrant_reduced_dimension_search_reranks_with_full_vectors(qdrant_database):
+    vectors = _vectors(500)
+    queries = vectors[:10] + 0.05 * _vectors(10, seed=1)
+    _load(qdrant_database, "exact", vectors)
+    _load(qdrant_database, "two_stage", vectors, index_dimensions=32)
+    expected = _search(qdrant_database, "exact", queries)
+    results = _search(qdrant_database, "two_stage", queries)
+    for found, truth in zip(results, expected):
+        assert found[0]["id"] == truth[0]["id"]
+        assert found[0]["score"] == pytest.approx(truth[0]["score"], abs=1e-5)
+
+
+def test_qdrant_reduced_dimension_prefetch_oversamples_candidates():
+    query = _dense_query(_vectors(1)[0], 10, None, 32, None)
+    assert query["prefetch"].limit == int(np.ceil(10 * DIMENSION_RERANK_OVERSAMPLING))
+    assert len(query["prefetch"].query) == 32 and len(query["query"]) == DIMENSIONS
+    assert _dense_query(_vectors(1)[0], 10, None, None, None)["limit"] == 10
@@ -0,0 +1,52 @@
+import asyncio
+import numpy as np
+import pytest
+from vector.snapshot import read_snapshot
+
+
+async def _all_points(database, collection_name):
+    points = {}
+    async for ids, vectors, payloads in database._scroll_points(collection_name, 7):
+        for id, vector, payload in zip(ids, vectors, payloads):
+            points[id] = (vector, payload)
+    return points
+
+
+def test_export_import_round_trip(database, tmp_path):
+    database.create_collection("docs", 64, quantization="scalar", index_dimensions=32, payload_indexes={"source": "keyword"})
+    path = str(tmp_path / "snapshot")
+
+    async def run():
+        await database.upsert("docs", "Alpha beta. Gamma delta.\n\nEpsilon zeta eta.", batch_size=12, overlap=0, source_id="a.txt")
+        await database.upsert("docs", "Theta iota kappa lambda mu.", batch_size=12, overlap=0, source_id="b.txt", tags=["greek"])
+        exported = await database.export_collection("docs", path, batch_size=3)
+        imported = await database.import_collection(path, "restored", batch_size=4)
+        return exported, imported, await _all_points(database, "docs"), await _all_points(database, "restored")
+
+    exported, imported, original, restored = asyncio.run(run())
+    assert exported == imported == database.count("docs") == database.count("restored")
+    assert read_snapshot(path)["fields"] == ["source", "tags", "text", "timestamp"]
+    assert set(restored) == set(original)
+    for id, (vector, payload) in original.items():
+        np.testing.assert_array_equal(restored[id][0], vector)
+        assert restored[id][1] == payload
+    assert asyncio.run(database._collection_config("restored")) == asyncio.run(database._collection_config("docs"))
+    # The manifest is rebuilt from the sources in the payloads
+    assert database.manifest.point_ids("restored", "b.txt") == database.manifest.point_ids("docs", "b.txt")
+    # Hashing embeddings don't survive truncation, the restored points are searched on their full vectors
+    results = asyncio.run(database.search("restored", "theta iota", limit=1, score_threshold=None, exact=True))
+    assert results[0]["metadata"]["tags"] == ["greek"]
+
+
+def test_export_refuses_to_overwrite_a_snapshot(database, tmp_path):
+    database.create_collection("docs", 64)
+    path = str(tmp_path / "snapshot")
+    asyncio.run(database.upsert("docs", "Some text."))
+    asyncio.run(database.export_collection("docs", path))
+    with pytest.raises(FileExistsError):
+        asyncio.run(database.export_collection("docs", path))
+
+
+def test_import_of_an_interrupted_export_fails(database, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(database.import_collection(str(tmp_path), "restored"))
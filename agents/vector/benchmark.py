@@ -0,0 +1,374 @@
+"""
+Benchmarks the vector backends on synthetic data and prints the results as JSON.
+
+Run from the `agents` directory, e.g.:
+
+    python -m vector.benchmark --backends numpy,ivf --points 100000 --output results.json
+    python -m vector.benchmark --backends qdrant_async --qdrant-url http://localhost:6333 --points 1000000
+
+Points are clustered unit vectors generated block by block from a seed, so any scale can be
+replayed exactly, and the ground truth of recall@k is an exact scan of the same data. Embedding
+requests go to a `HashingEmbeddingProvider`, which returns deterministic vectors without any network call.
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import inspect
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from numpy import ndarray
+from semantic_kernel import Kernel
+from vector.vector_base import VectorDatabaseBase, PointBatch
+from vector.dimensions import recall_at_k
+from vector.embedding_providers import HashingEmbeddingProvider
+from config import VECTOR_SIZE, BATCH_SIZE, UPSERT_BATCH_SIZE, INGEST_UPSERT_CONCURRENCY, IVF_NLIST, IVF_NPROBE, IVF_MIN_POINTS_PER_LIST
+
+BACKENDS = ("numpy", "ivf", "qdrant", "qdrant_async")
+# Spread of the points around their cluster centre, relative to the unit-norm centres
+CLUSTER_SPREAD = 0.6
+
+
+class SyntheticDataset:
+    """
+    `points` unit vectors drawn around `clusters` random centres. Blocks are generated from the seed
+    and their position, so the data never has to fit in memory and is identical on every run.
+    """
+
+    def __init__(self, points: int, dimensions: int = VECTOR_SIZE, clusters: int = 1000, seed: int = 0, block_size: int = 65536):
+        self.points = points
+        self.dimensions = dimensions
+        self.seed = seed
+        self.block_size = block_size
+        self.centers = self._normalize(np.random.default_rng(seed).standard_normal((clusters, dimensions)).astype(np.float32))
+
+    def blocks(self) -> Iterator[Tuple[int, ndarray]]:
+        """
+        Yields (first point index, vectors) blocks covering the whole dataset.
+        """
+        for start in range(0, self.points, self.block_size):
+            size = min(self.block_size, self.points - start)
+            yield start, self._sample(np.random.default_rng([self.seed, start]), size)
+
+    def queries(self, count: int) -> ndarray:
+        """
+        Query vectors from the same distribution as the points, but not in the dataset.
+        """
+        return self._sample(np.random.default_rng([self.seed, self.points, count]), count)
+
+    def ground_truth(self, queries: ndarray, k: int) -> List[List[int]]:
+        """
+        Exact top-k point indices of each query by cosine similarity, scanning the dataset block by block.
+        """
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start, vectors in self.blocks():
+            scores = np.concatenate([best_scores, queries @ vectors.T], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(vectors)), (len(queries), len(vectors)))], axis=1)
+            top = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1).tolist()
+
+    def _sample(self, rng: np.random.Generator, size: int) -> ndarray:
+        centers = self.centers[rng.integers(len(self.centers), size=size)]
+        noise = rng.standard_normal((size, self.dimensions), dtype=np.float32) * (CLUSTER_SPREAD / math.sqrt(self.dimensions))
+        return self._normalize(centers + noise)
+
+    @staticmethod
+    def _normalize(vectors: ndarray) -> ndarray:
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def point_id(index: int) -> str:
+    # UUIDs are valid ids on every backend and map back to the point index
+    return str(uuid.UUID(int=index))
+
+
+async def benchmark_backend(
+    backend: str,
+    database: VectorDatabaseBase,
+    dataset: SyntheticDataset,
+    queries: ndarray,
+    ground_truth: List[List[int]],
+    limit: int = 10,
+    concurrency: int = 16,
+    upsert_batch_size: int = UPSERT_BATCH_SIZE,
+    upsert_concurrency: int = INGEST_UPSERT_CONCURRENCY,
+    pipeline_chunks: int = 0,
+    collection_options: Optional[Dict[str, Any]] = None,
+    data_dir: Optional[str] = None,
+    bulk_load: bool = False,
+    baseline_rss_mb: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Measures one backend: ingest throughput, sequential search latency percentiles, QPS with
+    `concurrency` searches in flight, recall@limit against the exact ground truth and memory use.
+    With `bulk_load` the ingest runs in a bulk load, whose final index rebuild is included in its time.
+
+    The backends share the process, so its peak RSS covers every backend run so far and the
+    dataset: the memory of this backend is the growth of the current RSS from `baseline_rss_mb`,
+    measured before its database was created.
+    """
+    collection_name = f"benchmark_{backend}"
+    result: Dict[str, Any] = {"backend": backend, "points": dataset.points, "dimensions": dataset.dimensions}
+
+    # The backends print a line per upserted batch, which would dominate the measurement and mix
+    # with the JSON report on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        await _maybe_await(database.create_collection(collection_name, dataset.dimensions, **(collection_options or {})))
+        if bulk_load:
+            started = time.perf_counter()
+            async with database.bulk_load(collection_name):
+                result["ingest"] = await _ingest(database, collection_name, dataset, upsert_batch_size, upsert_concurrency)
+            seconds = time.perf_counter() - started
+            result["ingest"].update(seconds=seconds, points_per_second=dataset.points / seconds)
+        else:
+            result["ingest"] = await _ingest(database, collection_name, dataset, upsert_batch_size, upsert_concurrency)
+        if pipeline_chunks:
+            result["pipeline"] = await _pipeline(database, f"{collection_name}_pipeline", dataset.dimensions, pipeline_chunks, collection_options)
+
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(await database.search_by_vector(collection_name, query, limit, None))
+        latencies.append((time.perf_counter() - started) * 1000)
+    result["search"] = {
+        "queries": len(queries),
+        "limit": limit,
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+    result["concurrent_search"] = await _concurrent_search(database, collection_name, queries, limit, concurrency)
+    result["recall_at_k"] = recall_at_k(results, [[{"id": point_id(index)} for index in expected] for expected in ground_truth])
+    gc.collect()
+    rss = _rss_mb()
+    result["memory"] = {
+        "rss_mb": rss,
+        "rss_delta_mb": rss - baseline_rss_mb if rss is not None and baseline_rss_mb is not None else None,
+        "process_peak_rss_mb": _peak_rss_mb(),
+        "storage_mb": _storage_mb(data_dir),
+    }
+    return result
+
+
+async def _ingest(database: VectorDatabaseBase, collection_name: str, dataset: SyntheticDataset, upsert_batch_size: int, upsert_concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(upsert_concurrency)
+    pending: set = set()
+    timestamp = datetime.now().isoformat()
+
+    async def write(batch: PointBatch) -> None:
+        async with semaphore:
+            await database._write_points(collection_name, batch)
+
+    started = time.perf_counter()
+    for start, vectors in dataset.blocks():
+        for offset in range(0, len(vectors), upsert_batch_size):
+            block = vectors[offset:offset + upsert_batch_size]
+            indices = range(start + offset, start + offset + len(block))
+            batch = PointBatch(
+                ids=[point_id(i) for i in indices],
+                vectors=block,
+                payloads={"timestamp": [timestamp] * len(block), "text": [f"synthetic point {i}" for i in indices]},
+            )
+            # Bounded like the ingest pipeline: wait for a slot before generating more batches
+            while len(pending) >= upsert_concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(asyncio.create_task(write(batch)))
+    if pending:
+        await asyncio.gather(*pending)
+    seconds = time.perf_counter() - started
+    return {"seconds": seconds, "points_per_second": dataset.points / seconds}
+
+
+async def _pipeline(database: VectorDatabaseBase, collection_name: str, dimensions: int, chunks: int, collection_options: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Ingests `chunks` synthetic paragraphs through chunking, the (fake) embedding service and upserts.
+    Each paragraph nearly fills a chunk and is separated from the next by a blank line, so the chunker
+    cuts one chunk per paragraph.
+    """
+    await _maybe_await(database.create_collection(collection_name, dimensions, **(collection_options or {})))
+    paragraphs = (_paragraph(i) + "\n\n" for i in range(chunks))
+    started = time.perf_counter()
+    progress = await database.ingest(collection_name, paragraphs, BATCH_SIZE, overlap=0, report_interval=0)
+    seconds = time.perf_counter() - started
+    return {"chunks": progress.upserted, "seconds": seconds, "chunks_per_second": progress.upserted / seconds}
+
+
+def _paragraph(index: int) -> str:
+    sentence = f"Synthetic paragraph {index} of the benchmark corpus."
+    return " ".join([sentence] * max(1, BATCH_SIZE // (len(sentence) + 1)))
+
+
+async def _concurrent_search(database: VectorDatabaseBase, collection_name: str, queries: ndarray, limit: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def search(query: ndarray) -> None:
+        async with semaphore:
+            await database.search_by_vector(collection_name, query, limit, None)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(search(query) for query in queries))
+    return {"concurrency": concurrency, "qps": len(queries) / (time.perf_counter() - started)}
+
+
+async def _maybe_await(value: Any) -> Any:
+    return await value if inspect.isawaitable(value) else value
+
+
+def _rss_mb() -> Optional[float]:
+    # Current resident set size, only available on Linux
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    # Peak resident set size of the whole process since it started, not of one backend
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def _storage_mb(path: Optional[str]) -> Optional[float]:
+    if path is None or not os.path.exists(path):
+        return None
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return size / 1024 ** 2
+
+
+def _make_database(backend: str, args: argparse.Namespace, data_dir: str, embedding_service: HashingEmbeddingProvider) -> VectorDatabaseBase:
+    kernel = Kernel()
+    if backend == "numpy":
+        from vector.numpy_store import NumpyVectorDatabase
+        return NumpyVectorDatabase(kernel, data_dir, embedding_service=embedding_service)
+    if backend == "ivf":
+        from vector.ivf import IVFVectorDatabase
+        # Enough lists for the index to train at this scale, up to about 4 * sqrt(points)
+        nlist = args.nlist or max(1, min(IVF_NLIST, args.points // IVF_MIN_POINTS_PER_LIST, int(4 * math.sqrt(args.points))))
+        return IVFVectorDatabase(kernel, data_dir, nlist=nlist, nprobe=args.nprobe, embedding_service=embedding_service)
+    if args.qdrant_url is None:
+        raise ValueError(f"The {backend} backend needs --qdrant-url.")
+    if backend == "qdrant":
+        from vector.qdrant import QdrantVectorDatabase
+        return QdrantVectorDatabase(kernel, args.qdrant_url, args.qdrant_api_key, embedding_service=embedding_service)
+    if backend == "qdrant_async":
+        from vector.qdrant_async import AsyncQdrantVectorDatabase
+        return AsyncQdrantVectorDatabase(kernel, args.qdrant_url, args.qdrant_api_key, embedding_service=embedding_service)
+    raise ValueError(f"Invalid backend: {backend}. Valid options are: {', '.join(BACKENDS)}")
+
+
+async def _drop_collections(database: VectorDatabaseBase, backend: str) -> None:
+    # Collections on a Qdrant server outlive the run, numpy ones live in the temporary directory
+    if backend in ("qdrant", "qdrant_async"):
+        for name in (f"benchmark_{backend}", f"benchmark_{backend}_pipeline"):
+            await _maybe_await(database.client.delete_collection(name))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    dataset = SyntheticDataset(args.points, args.dimensions, args.clusters, args.seed)
+    queries = dataset.queries(args.queries)
+    started = time.perf_counter()
+    ground_truth = dataset.ground_truth(queries, args.limit)
+    print(f"Computed the exact ground truth of {args.queries} queries in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+    collection_options = {}
+    if args.quantization:
+        collection_options["quantization"] = args.quantization
+    if args.index_dimensions:
+        collection_options["index_dimensions"] = args.index_dimensions
+    report: Dict[str, Any] = {
+        "started": datetime.now().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("qdrant_api_key", "output")},
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform()},
+        "results": [],
+    }
+    for backend in args.backends.split(","):
+        data_dir = tempfile.mkdtemp(prefix=f"benchmark_{backend}_", dir=args.data_dir)
+        # Whatever the previous backend left behind is collected before the baseline is taken
+        gc.collect()
+        baseline_rss_mb = _rss_mb()
+        database = _make_database(backend, args, data_dir, HashingEmbeddingProvider(args.dimensions))
+        try:
+            await _drop_collections(database, backend)
+            result = await benchmark_backend(
+                backend, database, dataset, queries, ground_truth,
+                limit=args.limit,
+                concurrency=args.concurrency,
+                upsert_batch_size=args.upsert_batch_size,
+                upsert_concurrency=args.upsert_concurrency,
+                pipeline_chunks=args.pipeline_chunks,
+                bulk_load=args.bulk_load,
+                collection_options=collection_options,
+                data_dir=data_dir if backend in ("numpy", "ivf") else None,
+                baseline_rss_mb=baseline_rss_mb,
+            )
+            report["results"].append(result)
+            print(f"{backend}: {json.dumps(result)}", file=sys.stderr)
+        finally:
+            if not args.keep_data:
+                await _drop_collections(database, backend)
+            close = getattr(database, "close", None)
+            if close is not None:
+                await _maybe_await(close())
+            if not args.keep_data:
+                shutil.rmtree(data_dir, ignore_errors=True)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the vector backends on synthetic embeddings.")
+    parser.add_argument("--backends", default="numpy,ivf", help=f"Comma-separated backends among: {', '.join(BACKENDS)}")
+    parser.add_argument("--points", type=int, default=10000, help="Number of points ingested")
+    parser.add_argument("--dimensions", type=int, default=VECTOR_SIZE, help="Embedding dimensions")
+    parser.add_argument("--clusters", type=int, default=1000, help="Number of clusters of the synthetic data")
+    parser.add_argument("--queries", type=int, default=200, help="Number of search queries")
+    parser.add_argument("--limit", type=int, default=10, help="k of the searches and of recall@k")
+    parser.add_argument("--concurrency", type=int, default=16, help="Searches in flight when measuring QPS")
+    parser.add_argument("--upsert-batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--upsert-concurrency", type=int, default=INGEST_UPSERT_CONCURRENCY)
+    parser.add_argument("--pipeline-chunks", type=int, default=0, help="Also ingest this many text chunks through the embedding pipeline")
+    parser.add_argument("--bulk-load", action="store_true", help="Ingest in bulk-load mode, indexing once at the end")
+    parser.add_argument("--quantization", choices=("scalar", "binary"), help="Quantization of the benchmarked collections")
+    parser.add_argument("--index-dimensions", type=int, help="Reduced dimensions of the first search pass")
+    parser.add_argument("--nlist", type=int, help="IVF lists, sized to the dataset by default")
+    parser.add_argument("--nprobe", type=int, default=IVF_NPROBE, help="IVF lists scanned per query")
+    parser.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--qdrant-api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--data-dir", help="Parent directory of the numpy and IVF data, the system temp directory by default")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import codecs
+import re
+from typing import IO, Iterable, Iterator, Union
+from config import BATCH_SIZE, CHUNK_OVERLAP, CHUNK_READ_SIZE
+
+TextSource = Union[str, bytes, IO, Iterable[str]]
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+SENTENCE_END = re.compile(r"[.!?][\"'\)\]]*\s+")
+TOKEN_BREAK = re.compile(r"\s+")
+
+
+def iter_source(source: TextSource, read_size: int = CHUNK_READ_SIZE) -> Iterator[str]:
+    """
+    Yields the text of a source in pieces of at most `read_size` characters.
+
+    :param source: A string, bytes, a (text or binary) file-like object or an iterable of strings
+    :param read_size: Number of characters to read from file-like objects at a time, larger pieces
+                      of iterables are split
+    """
+    if isinstance(source, bytes):
+        source = source.decode("utf-8", errors="replace")
+    if isinstance(source, str):
+        for i in range(0, len(source), read_size):
+            yield source[i:i + read_size]
+        return
+    if hasattr(source, "read"):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            piece = source.read(read_size)
+            if not piece:
+                break
+            if isinstance(piece, bytes):
+                piece = decoder.decode(piece)
+            yield piece
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+        return
+    for piece in source:
+        if isinstance(piece, bytes):
+            piece = piece.decode("utf-8", errors="replace")
+        for i in range(0, len(piece), read_size):
+            yield piece[i:i + read_size]
+
+
+class TextChunker:
+    """
+    Splits text into chunks of at most `chunk_size` characters, preferring to cut on
+    paragraph, then sentence, then token boundaries. Consecutive chunks share up to
+    `overlap` characters, starting on a token boundary.
+
+    The source is consumed lazily, so the text buffered stays bounded by `chunk_size + read_size`
+    regardless of the size of the input (an iterable yielding larger pieces still holds each of
+    them in memory while it is split).
+    """
+
+    def __init__(self, chunk_size: int = BATCH_SIZE, overlap: int = CHUNK_OVERLAP, read_size: int = CHUNK_READ_SIZE):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+        if overlap < 0 or overlap >= chunk_size:
+            raise ValueError(f"overlap must be in [0, {chunk_size}), got {overlap}.")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.read_size = read_size
+
+    def chunks(self, source: TextSource) -> Iterator[str]:
+        """
+        Yields the chunks of a source one at a time.
+
+        :param source: A string, bytes, a file-like object or an iterable of strings
+        """
+        buffer = ""
+        # Index in the buffer where the next chunk begins
+        position = 0
+        # Index in the buffer where text not yet emitted in any chunk begins
+        fresh = 0
+        for piece in iter_source(source, self.read_size):
+            # Emitted text is dropped once per piece rather than once per chunk, which would copy
+            # the rest of the buffer for every chunk
+            buffer = buffer[position:] + piece
+            fresh -= position
+            position = 0
+            while len(buffer) - position > self.chunk_size:
+                cut = self._find_cut(buffer, position)
+                chunk = buffer[position:cut].strip()
+                if chunk:
+                    yield chunk
+                position = self._overlap_start(buffer, position, cut)
+                fresh = cut
+        if buffer[fresh:].strip():
+            yield buffer[position:].strip()
+
+    def _find_cut(self, buffer: str, position: int) -> int:
+        """
+        Returns the end index of the chunk starting at `position` in the buffer.
+        """
+        window = buffer[position:position + self.chunk_size + 1]
+        min_length = max(self.chunk_size // 2, self.overlap + 1)
+        for pattern, start in (
+            (PARAGRAPH_BREAK, min_length),
+            (SENTENCE_END, min_length),
+            (TOKEN_BREAK, self.overlap + 1),
+        ):
+            cut = None
+            for match in pattern.finditer(window, start):
+                cut = match.end()
+            if cut is not None:
+                return position + cut
+        return position + self.chunk_size
+
+    def _overlap_start(self, buffer: str, position: int, cut: int) -> int:
+        """
+        Returns the index where the chunk following the one from `position` to `cut` begins, so
+        that it repeats the last `overlap` characters of the previous chunk without splitting a token.
+        """
+        if self.overlap == 0:
+            return cut
+        start = cut - self.overlap
+        if start > position and not buffer[start - 1].isspace():
+            match = TOKEN_BREAK.search(buffer, start, cut)
+            if match is None:
+                return cut
+            start = match.end()
+        return start
+
+
+def iter_chunks(
+    source: TextSource,
+    chunk_size: int = BATCH_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+    read_size: int = CHUNK_READ_SIZE,
+) -> Iterator[str]:
+    """
+    Lazily splits a source into boundary-aware, overlapping chunks.
+
+    :param source: A string, bytes, a file-like object or an iterable of strings
+    :param chunk_size: Maximum number of characters per chunk
+    :param overlap: Number of characters shared between consecutive chunks
+    :param read_size: Number of characters to read from the source at a time
+    """
+    return TextChunker(chunk_size, overlap, read_size).chunks(source)
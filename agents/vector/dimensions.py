@@ -0,0 +1,68 @@
+import time
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from numpy import ndarray
+
+
+def truncate_vectors(vectors: ndarray, dimensions: int) -> ndarray:
+    """
+    Shortens embeddings to their first `dimensions` components and re-normalizes them.
+
+    This is what text-embedding-3 models return when asked for fewer dimensions, so a full-size
+    embedding can serve both the reduced first-pass index and the full-dimension re-ranking.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    truncated = vectors[..., :dimensions]
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / np.where(norms == 0, 1, norms)
+
+
+async def compare_recall(
+    database: Any,
+    collection_name: str,
+    queries: Sequence[Any],
+    limit: int = 10,
+    **search_params: Any,
+) -> Dict[str, float]:
+    """
+    Measures the recall@limit of a collection's default search (reduced dimensions, quantization,
+    approximate index...) against an exact full-dimension, full-precision search of the same queries.
+
+    :param database: A vector database exposing `search_many_by_vector(..., exact=...)`
+    :param collection_name: The collection to evaluate
+    :param queries: Query strings, embedded with the collection's embedder, or pre-computed full-dimension query vectors
+    :param limit: Number of results compared per query
+    :param search_params: Extra parameters of the evaluated search (e.g. `oversampling`, `nprobe`)
+    :return: Mean recall and the mean latency per query of both searches, in milliseconds
+    """
+    if len(queries) == 0:
+        raise ValueError("compare_recall needs at least one query.")
+    if isinstance(queries[0], str):
+        # Collections re-embedded with another model have their own embedder
+        embedder = database.embedder_for(await database.resolve_collection(collection_name))
+        vectors = await embedder.embed(list(queries))
+    else:
+        vectors = np.asarray(queries, dtype=np.float32)
+    started = time.perf_counter()
+    approximate = await database.search_many_by_vector(collection_name, vectors, limit, None, **search_params)
+    approximate_ms = (time.perf_counter() - started) * 1000 / len(vectors)
+    started = time.perf_counter()
+    exact = await database.search_many_by_vector(collection_name, vectors, limit, None, exact=True)
+    exact_ms = (time.perf_counter() - started) * 1000 / len(vectors)
+    return {
+        "recall": recall_at_k(approximate, exact),
+        "search_ms": approximate_ms,
+        "exact_search_ms": exact_ms,
+    }
+
+
+def recall_at_k(results: List[List[Dict[str, Any]]], ground_truth: List[List[Dict[str, Any]]]) -> float:
+    """
+    Mean fraction of the ground-truth ids found in the results, over all queries.
+    """
+    recalls = []
+    for found, expected in zip(results, ground_truth):
+        expected_ids = {result["id"] for result in expected}
+        if expected_ids:
+            recalls.append(len(expected_ids & {result["id"] for result in found}) / len(expected_ids))
+    return float(np.mean(recalls)) if recalls else 1.0
@@ -0,0 +1,59 @@
+import math
+from typing import Any, Dict, List
+import numpy as np
+from numpy import ndarray
+from config import MMR_OVERSAMPLING
+
+
+def maximal_marginal_relevance(query_vector: Any, candidate_vectors: Any, limit: int, diversity: float) -> List[int]:
+    """
+    Picks `limit` candidates by maximal marginal relevance: each pick maximizes
+    `(1 - diversity) * sim(query, c) - diversity * max(sim(c, picked))`, with cosine similarities.
+
+    The candidate similarity matrix is computed in one product and the redundancy of every
+    candidate is updated with a vectorized maximum per pick, so no pair is compared in Python.
+
+    :return: Indices of the picked candidates, in pick order
+    """
+    candidates = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    if len(candidates) == 0 or limit <= 0:
+        return []
+    query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+    relevance = (1 - diversity) * (candidates @ query)
+    similarity = candidates @ candidates.T
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    picked: List[int] = []
+    for _ in range(min(limit, len(candidates))):
+        scores = np.where(available, relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return picked
+
+
+def diversify(results: List[Dict[str, Any]], candidate_vectors: Any, query_vector: Any, limit: int, diversity: float) -> List[Dict[str, Any]]:
+    """
+    Re-ranks search results, given with their vectors in the same order, into a diverse top `limit`.
+    The results keep their original scores.
+    """
+    return [results[i] for i in maximal_marginal_relevance(query_vector, candidate_vectors, limit, diversity)]
+
+
+def check_diversity(diversity: float) -> None:
+    if not 0 <= diversity <= 1:
+        raise ValueError(f"Invalid diversity: {diversity}. Expected a value between 0 (relevance only) and 1 (diversity only).")
+
+
+def candidate_count(limit: int, diversity: float) -> int:
+    """
+    Number of candidates to fetch for a search of `limit` results: `limit * MMR_OVERSAMPLING` when
+    the results are diversified, so there are alternatives to the near-duplicates.
+    """
+    return max(limit, math.ceil(limit * MMR_OVERSAMPLING)) if diversity else limit
+
+
+def _normalize(vectors: ndarray) -> ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
@@ -0,0 +1,346 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Deque, Iterable, List, Optional, Set, Tuple, Union
+from numpy import ndarray, asarray, concatenate, empty
+from config import (
+    EMBEDDING_MAX_INPUTS,
+    EMBEDDING_MAX_TOKENS,
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_BACKOFF_SECONDS,
+    EMBEDDING_MAX_BACKOFF_SECONDS,
+    EMBEDDING_COALESCE_SECONDS,
+    EMBEDDING_TOKENIZER,
+)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Phrases of the errors rejecting a request for exceeding the model's token limit
+TOO_LONG_MESSAGES = ("maximum context length", "context_length_exceeded", "too many tokens", "maximum input length")
+
+_tokenizer: Any = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Number of tokens in a text: counted with tiktoken's EMBEDDING_TOKENIZER encoding when tiktoken
+    is installed, otherwise estimated as one token per two UTF-8 bytes. That estimate errs high
+    for English (~4 bytes per token) so it also holds for CJK text and code, which can take a
+    token per character.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = _load_tokenizer()
+    if _tokenizer:
+        return len(_tokenizer.encode(text, disallowed_special=())) + 1
+    return len(text.encode("utf-8")) // 2 + 1
+
+
+def _load_tokenizer() -> Any:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(EMBEDDING_TOKENIZER)
+    except Exception:
+        # Not installed, or the encoding can't be downloaded: fall back to the byte estimate
+        return False
+
+
+def _error_chain(error: BaseException) -> Iterable[BaseException]:
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Returns True for rate limits, timeouts and transient server errors, looking through
+    the exception chain since Semantic Kernel wraps the underlying OpenAI errors.
+    """
+    for e in _error_chain(error):
+        if type(e).__name__ in ("RateLimitError", "APITimeoutError", "APIConnectionError"):
+            return True
+        if getattr(e, "status_code", None) in RETRYABLE_STATUS_CODES:
+            return True
+    return False
+
+
+def is_too_long(error: BaseException) -> bool:
+    """
+    Returns True for errors rejecting a request because its texts exceed the model's token limit.
+    """
+    for e in _error_chain(error):
+        if getattr(e, "code", None) == "context_length_exceeded":
+            return True
+        if getattr(e, "status_code", None) in (400, 413, None) and any(message in str(e).lower() for message in TOO_LONG_MESSAGES):
+            return True
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Returns the delay in seconds requested by the server through the retry-after headers, if any.
+    """
+    for e in _error_chain(error):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if not headers:
+            continue
+        for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            value = headers.get(header)
+            if value is None:
+                continue
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+class BatchEmbedder:
+    """
+    Packs texts into as few embedding requests as the model limits allow, runs a bounded
+    number of requests concurrently and returns the embeddings in the original order.
+
+    Requests that hit a rate limit or a transient error are retried with exponential backoff.
+    A rate limit pauses every request sharing this embedder until the server's retry-after expires.
+    """
+
+    def __init__(
+        self,
+        embedding_service: Any,
+        max_inputs: int = EMBEDDING_MAX_INPUTS,
+        max_tokens: int = EMBEDDING_MAX_TOKENS,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+    ):
+        """
+        :param embedding_service: Service exposing `async generate_embeddings(texts) -> ndarray`
+        :param max_inputs: Maximum number of texts per request
+        :param max_tokens: Maximum estimated number of tokens per request
+        :param concurrency: Maximum number of requests in flight
+        :param max_retries: Number of retries for rate-limited or failed requests
+        """
+        self.embedding_service = embedding_service
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._paused_until = 0.0
+
+    def pack(self, texts: List[str]) -> List[List[str]]:
+        """
+        Groups consecutive texts into requests that respect the input and token limits.
+        """
+        requests: List[List[str]] = []
+        current: List[str] = []
+        tokens = 0
+        for text in texts:
+            text_tokens = estimate_tokens(text)
+            if current and (len(current) >= self.max_inputs or tokens + text_tokens > self.max_tokens):
+                requests.append(current)
+                current, tokens = [], 0
+            current.append(text)
+            tokens += text_tokens
+        if current:
+            requests.append(current)
+        return requests
+
+    async def embed(self, texts: List[str], **kwargs: Any) -> ndarray:
+        """
+        Embeds a list of texts, returning a matrix with one row per text in the same order.
+
+        :param kwargs: Provider options sent with every request, e.g. `dimensions`
+        """
+        if not texts:
+            return empty((0, 0))
+        results = await asyncio.gather(*(self._request(request, **kwargs) for request in self.pack(texts)))
+        return concatenate(results, axis=0)
+
+    async def embed_stream(
+        self, texts: Union[Iterable[str], AsyncIterable[str]]
+    ) -> AsyncIterator[Tuple[str, ndarray]]:
+        """
+        Lazily embeds a stream of texts, yielding `(text, embedding)` pairs in the original order.
+        At most `concurrency` packed requests are buffered ahead of the consumer.
+        """
+        async for batch, embeddings in self._embed_requests(texts):
+            for item in zip(batch, embeddings):
+                yield item
+
+    async def embed_batches(
+        self, texts: Union[Iterable[str], AsyncIterable[str]], batch_size: int
+    ) -> AsyncIterator[Tuple[List[str], ndarray]]:
+        """
+        Lazily embeds a stream of texts, yielding them in the original order as `(texts, embeddings)`
+        batches of `batch_size` texts (the last one may be smaller) with one embedding matrix each,
+        so consumers never handle embeddings one row at a time.
+        """
+        texts_buffer: List[str] = []
+        matrices: List[ndarray] = []
+        async for batch, embeddings in self._embed_requests(texts):
+            texts_buffer.extend(batch)
+            matrices.append(embeddings)
+            if len(texts_buffer) < batch_size:
+                continue
+            matrix = concatenate(matrices, axis=0)
+            full = len(texts_buffer) - len(texts_buffer) % batch_size
+            for start in range(0, full, batch_size):
+                yield texts_buffer[start:start + batch_size], matrix[start:start + batch_size]
+            texts_buffer, matrices = texts_buffer[full:], [matrix[full:]]
+        if texts_buffer:
+            yield texts_buffer, concatenate(matrices, axis=0)
+
+    async def _embed_requests(
+        self, texts: Union[Iterable[str], AsyncIterable[str]]
+    ) -> AsyncIterator[Tuple[List[str], ndarray]]:
+        # Yields each packed request with its embeddings, in order, keeping `concurrency` requests ahead
+        pending: Deque[Tuple[List[str], asyncio.Task]] = deque()
+        current: List[str] = []
+        tokens = 0
+        try:
+            async for text in _aiter(texts):
+                text_tokens = estimate_tokens(text)
+                if current and (len(current) >= self.max_inputs or tokens + text_tokens > self.max_tokens):
+                    pending.append((current, asyncio.create_task(self._request(current))))
+                    current, tokens = [], 0
+                    while len(pending) > self.concurrency:
+                        batch, task = pending.popleft()
+                        yield batch, await task
+                current.append(text)
+                tokens += text_tokens
+            if current:
+                pending.append((current, asyncio.create_task(self._request(current))))
+            while pending:
+                batch, task = pending.popleft()
+                yield batch, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _request(self, texts: List[str], **kwargs: Any) -> ndarray:
+        try:
+            return await self._send(texts, **kwargs)
+        except Exception as e:
+            # Token counts are estimates: a request rejected as too long is split in two and retried
+            if len(texts) < 2 or not is_too_long(e):
+                raise
+            middle = len(texts) // 2
+            print(f"Embedding request of {len(texts)} texts exceeds the token limit, splitting it in two.")
+            first, second = await asyncio.gather(self._request(texts[:middle], **kwargs), self._request(texts[middle:], **kwargs))
+            return concatenate([first, second], axis=0)
+
+    async def _send(self, texts: List[str], **kwargs: Any) -> ndarray:
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    embeddings = asarray(await self.embedding_service.generate_embeddings(texts, **kwargs))
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    delay = retry_after(e)
+                    if delay is None:
+                        delay = min(EMBEDDING_MAX_BACKOFF_SECONDS, EMBEDDING_BACKOFF_SECONDS * 2 ** attempt)
+                        delay *= 0.5 + random.random() / 2
+                    else:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    attempt += 1
+                    print(f"Embedding request of {len(texts)} texts failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+                    continue
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Embedding service returned {len(embeddings)} embeddings for {len(texts)} texts.")
+                return embeddings
+
+
+class CoalescingEmbedder:
+    """
+    Merges embedding calls made at the same time into shared requests. The texts of concurrent calls
+    are collected for `window` seconds after the first one, or until `max_inputs` are waiting, then
+    embedded together through a `BatchEmbedder`, and every caller gets back its own rows. Identical
+    texts waiting together are embedded once.
+
+    Made for query embeddings: many sessions searching at once each embed one short text, and one
+    request for all of them costs about as much as one of them alone.
+    """
+
+    def __init__(self, embedder: BatchEmbedder, window: float = EMBEDDING_COALESCE_SECONDS, max_inputs: int = EMBEDDING_MAX_INPUTS):
+        """
+        :param embedder: Embedder the merged requests are sent through, with its retries and concurrency limit
+        :param window: Seconds a call waits for others to share its request, 0 to send every call on its own
+        :param max_inputs: Number of waiting texts that sends the request without waiting for the end of the window
+        """
+        self.embedder = embedder
+        self.window = window
+        self.max_inputs = max_inputs
+        # Calls and requests so far, their ratio is the number of calls served per request
+        self.calls = 0
+        self.requests = 0
+        self._waiting: List[Tuple[List[str], asyncio.Future]] = []
+        self._waiting_texts = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def generate_embeddings(self, texts: List[str], **kwargs: Any) -> ndarray:
+        """
+        Embeds the texts along with those of concurrent calls, returning one row per text.
+        Calls with provider options (e.g. `dimensions`) can't share requests and are sent on their own,
+        still through the `BatchEmbedder`.
+        """
+        self.calls += 1
+        if kwargs or self.window <= 0 or not texts:
+            self.requests += 1
+            return await self.embedder.embed(list(texts), **kwargs)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((list(texts), future))
+        self._waiting_texts += len(texts)
+        if self._waiting_texts >= self.max_inputs:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        waiting, self._waiting, self._waiting_texts = self._waiting, [], 0
+        if waiting:
+            self.requests += 1
+            task = asyncio.ensure_future(self._embed(waiting))
+            # The event loop only keeps weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed(self, waiting: List[Tuple[List[str], asyncio.Future]]) -> None:
+        unique = list(dict.fromkeys(text for texts, _ in waiting for text in texts))
+        try:
+            embeddings = await self.embedder.embed(unique)
+        except BaseException as e:
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        rows = {text: i for i, text in enumerate(unique)}
+        for texts, future in waiting:
+            # Callers cancelled while waiting have a future that is already done
+            if not future.done():
+                future.set_result(embeddings[[rows[text] for text in texts]])
+
+
+async def _aiter(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from numpy import ndarray, asarray, float32, frombuffer, stack
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES, EMBEDDING_CACHE_HOT_SIZE
+
+
+@dataclass
+class CacheStats:
+    hot_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hot_hits + self.disk_hits + self.misses
+        return (self.hot_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache: an in-process LRU hot tier in front of a
+    size-bounded SQLite store on disk with least-recently-used eviction.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        hot_size: int = EMBEDDING_CACHE_HOT_SIZE,
+    ):
+        """
+        :param path: Path of the SQLite file backing the cache
+        :param max_bytes: Maximum size of the stored vectors on disk before eviction
+        :param hot_size: Maximum number of embeddings kept in memory
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hot_size = hot_size
+        self._hot: "OrderedDict[str, ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings(accessed)")
+        self._conn.commit()
+        entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        self._stats = CacheStats(entries=entries, bytes=total)
+
+    @staticmethod
+    def key(model: str, dimensions: Optional[int], text: str) -> str:
+        """
+        Returns the cache key of a text embedded by a given model deployment and dimension count.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{model}\x00{dimensions}\x00".encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, ndarray]:
+        """
+        Looks up several keys at once, returning the embeddings that were found.
+        """
+        found: Dict[str, ndarray] = {}
+        with self._lock:
+            cold = []
+            for key in keys:
+                vector = self._hot.get(key)
+                if vector is None:
+                    cold.append(key)
+                    continue
+                self._hot.move_to_end(key)
+                found[key] = vector
+                self._stats.hot_hits += 1
+            unique = list(dict.fromkeys(cold))
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vector = frombuffer(blob, dtype=float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                if rows:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET accessed = ? WHERE key = ?", [(now, key) for key, _ in rows]
+                    )
+            self._conn.commit()
+            self._stats.disk_hits += sum(1 for key in cold if key in found)
+            self._stats.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, ndarray]) -> None:
+        """
+        Stores several embeddings at once, evicting the least recently used ones if the store grows too large.
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            rows = []
+            for key, vector in items.items():
+                vector = asarray(vector, dtype=float32).ravel()
+                self._remember(key, vector)
+                blob = vector.tobytes()
+                rows.append((key, blob, len(blob), now))
+            existing = self._existing_sizes([row[0] for row in rows])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, accessed) VALUES (?, ?, ?, ?)", rows
+            )
+            for key, _, size, _ in rows:
+                if key in existing:
+                    self._stats.bytes -= existing[key]
+                else:
+                    self._stats.entries += 1
+                self._stats.bytes += size
+            if self._stats.bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def stats(self) -> CacheStats:
+        """
+        Returns a snapshot of the hit/miss counters and the size of the disk store.
+        """
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _remember(self, key: str, vector: ndarray) -> None:
+        self._hot[key] = vector
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
+
+    def _existing_sizes(self, keys: List[str]) -> Dict[str, int]:
+        sizes: Dict[str, int] = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            sizes.update(self._conn.execute(
+                f"SELECT key, size FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return sizes
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the budget so eviction doesn't run on every insert
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY accessed")
+        evicted = []
+        for key, size in cursor:
+            if self._stats.bytes <= target:
+                break
+            evicted.append((key,))
+            self._stats.bytes -= size
+            self._stats.entries -= 1
+        cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+
+class CachedEmbeddingService:
+    """
+    Wraps an embedding service so that texts already embedded by the same model deployment
+    and dimension count are served from an `EmbeddingCache` instead of the network.
+    """
+
+    def __init__(self, embedding_service: Any, cache: EmbeddingCache, dimensions: Optional[int] = None):
+        """
+        :param embedding_service: Service exposing `async generate_embeddings(texts) -> ndarray`
+        :param cache: The cache to read from and write to
+        :param dimensions: Output dimensions of the service, part of the cache key, defaults to the service's
+                           `dimensions`, so shortened embeddings of a deployment never read its full-size ones
+        """
+        self.embedding_service = embedding_service
+        self.cache = cache
+        self.dimensions = dimensions if dimensions is not None else getattr(embedding_service, "dimensions", None)
+        self.model_id = (
+            getattr(embedding_service, "model_id", None)
+            or getattr(embedding_service, "ai_model_id", None)
+            or type(embedding_service).__name__
+        )
+
+    async def generate_embeddings(self, texts: List[str], **kwargs: Any) -> ndarray:
+        if not texts:
+            return await self.embedding_service.generate_embeddings(texts, **kwargs)
+        dimensions = kwargs.get("dimensions", self.dimensions)
+        keys = [self.cache.key(self.model_id, dimensions, text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            embeddings = await self.embedding_service.generate_embeddings(list(missing.values()), **kwargs)
+            computed = {key: asarray(vector, dtype=float32) for key, vector in zip(missing, embeddings)}
+            self.cache.put_many(computed)
+            found.update(computed)
+        return stack([found[key] for key in keys])
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.embedding_service, name)
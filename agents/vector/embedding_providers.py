@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import numpy as np
+from numpy import ndarray
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.embedding_generator_base import EmbeddingGeneratorBase
+from semantic_kernel.connectors.ai.open_ai import AzureTextEmbedding
+from vector.sparse import tokenize, token_index
+from config import VECTOR_SIZE, LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_BATCH_SIZE
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns texts into embedding vectors. This is the interface the vector databases embed through,
+    so any model, remote or in-process, can back them.
+    """
+
+    model_id: str = ""
+    dimensions: Optional[int] = None
+
+    @abstractmethod
+    async def generate_embeddings(self, texts: List[str], **kwargs: Any) -> ndarray:
+        """
+        Embeds the texts, returning one row per text.
+
+        :param texts: The texts to embed
+        :param kwargs: Provider-specific options, e.g. `dimensions` for models with shortened outputs
+        """
+        pass
+
+
+class KernelEmbeddingProvider(EmbeddingProvider):
+    """
+    Any Semantic Kernel embedding service (Azure OpenAI, OpenAI, Hugging Face, Ollama...).
+    """
+
+    def __init__(self, service: EmbeddingGeneratorBase, dimensions: Optional[int] = None):
+        """
+        :param service: The Semantic Kernel embedding service
+        :param dimensions: Ask the model for shortened embeddings of this size, if it supports it
+        """
+        self.service = service
+        self.dimensions = dimensions
+        self.model_id = service.ai_model_id
+
+    async def generate_embeddings(self, texts: List[str], **kwargs: Any) -> ndarray:
+        dimensions = kwargs.pop("dimensions", None) or self.dimensions
+        if dimensions is not None and "settings" not in kwargs:
+            kwargs["settings"] = self.service.get_prompt_execution_settings_class()(dimensions=dimensions)
+        return await self.service.generate_embeddings(texts, **kwargs)
+
+
+class AzureEmbeddingProvider(KernelEmbeddingProvider):
+    """
+    An Azure OpenAI embedding deployment, e.g. text-embedding-3-small.
+    """
+
+    def __init__(
+        self,
+        deployment_name: str,
+        endpoint: str,
+        api_key: str,
+        api_version: str = "2024-12-01-preview",
+        dimensions: Optional[int] = None
+    ):
+        """
+        :param deployment_name: Name of the embedding deployment
+        :param endpoint: Endpoint of the Azure OpenAI resource
+        :param api_key: API key of the resource
+        :param api_version: Azure OpenAI API version
+        :param dimensions: Ask the model for shortened embeddings of this size (text-embedding-3 models)
+        """
+        super().__init__(
+            AzureTextEmbedding(
+                service_id="azure_embeddings",
+                deployment_name=deployment_name,
+                endpoint=endpoint,
+                api_key=api_key,
+                api_version=api_version,
+            ),
+            dimensions,
+        )
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    An in-process sentence-transformers model. Texts are embedded on the CPU (or `device`) in a
+    worker thread, so there is no network round trip and the event loop stays free.
+    Needs `pip install sentence-transformers`.
+    """
+
+    def __init__(
+        self,
+        model_name: str = LOCAL_EMBEDDING_MODEL,
+        device: Optional[str] = None,
+        batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+        normalize: bool = True
+    ):
+        """
+        :param model_name: Name or path of the sentence-transformers model
+        :param device: Device to run the model on, e.g. "cpu" or "cuda", picked automatically if not given
+        :param batch_size: Number of texts per forward pass
+        :param normalize: Return unit-length embeddings
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("LocalEmbeddingProvider needs sentence-transformers: pip install sentence-transformers") from e
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model_id = model_name
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size
+        self.normalize = normalize
+        # One forward pass at a time: concurrent calls would only compete for the same cores
+        self._lock = threading.Lock()
+
+    async def generate_embeddings(self, texts: List[str], **kwargs: Any) -> ndarray:
+        return await asyncio.to_thread(self._encode, texts)
+
+    def _encode(self, texts: List[str]) -> ndarray:
+        with self._lock:
+            return self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+            ).astype(np.float32)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic embeddings for tests and benchmarks: the tokens of a text are hashed into the
+    vector's components (feature hashing) and the result is normalized. Texts sharing words get
+    similar vectors, identical texts identical ones, with no model and no network.
+    """
+
+    def __init__(self, dimensions: int = VECTOR_SIZE):
+        """
+        :param dimensions: Size of the embeddings
+        """
+        self.dimensions = dimensions
+        self.model_id = f"hashing-{dimensions}"
+
+    async def generate_embeddings(self, texts: List[str], **kwargs: Any) -> ndarray:
+        dimensions = kwargs.get("dimensions") or self.dimensions
+        return np.stack([self.embed(text, dimensions) for text in texts])
+
+    def embed(self, text: str, dimensions: Optional[int] = None) -> ndarray:
+        dimensions = dimensions or self.dimensions
+        vector = np.zeros(dimensions, dtype=np.float32)
+        for token in tokenize(text):
+            index = token_index(token)
+            # The top bit picks the sign, so collisions cancel out instead of piling up
+            vector[index % dimensions] += 1.0 if index >> 31 else -1.0
+        if not vector.any():
+            # Texts without tokens still get a stable, non-zero vector
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+def embedding_model(provider: Any) -> Dict[str, Any]:
+    """
+    The model a provider embeds with, `{"model_id": ..., "dimensions": ...}`: what is recorded with
+    the collections it embeds, see `VectorDatabaseBase.set_embedding_service`.
+    """
+    return {
+        "model_id": getattr(provider, "model_id", None) or getattr(provider, "ai_model_id", None) or type(provider).__name__,
+        "dimensions": getattr(provider, "dimensions", None),
+    }
+
+
+def provider_for_model(model: Dict[str, Any]) -> Optional[EmbeddingProvider]:
+    """
+    Recreates the provider of a recorded model if it needs no configuration (hashing embeddings).
+    Returns None for the other models, whose provider must be registered with the database.
+    """
+    if model["dimensions"] is not None and model["model_id"] == f"hashing-{model['dimensions']}":
+        return HashingEmbeddingProvider(model["dimensions"])
+    return None
+
+
+def resolve_provider(kernel: Optional[Kernel], embedding_service: Optional[Any] = None) -> Any:
+    """
+    Returns the provider a vector database embeds with: `embedding_service` if given, otherwise the
+    kernel's "azure_embeddings" service. Semantic Kernel services are wrapped in a
+    `KernelEmbeddingProvider`; providers, and any other object with an async
+    `generate_embeddings(texts)` (e.g. a batching proxy), are used as they are.
+    """
+    if embedding_service is None:
+        if kernel is None:
+            raise ValueError("Either a kernel with an 'azure_embeddings' service or an embedding_service is required.")
+        embedding_service = kernel.get_service("azure_embeddings")
+    if isinstance(embedding_service, EmbeddingProvider):
+        return embedding_service
+    if isinstance(embedding_service, EmbeddingGeneratorBase):
+        return KernelEmbeddingProvider(embedding_service)
+    if callable(getattr(embedding_service, "generate_embeddings", None)):
+        return embedding_service
+    raise ValueError(f"Invalid embedding service: {type(embedding_service).__name__}. Expected an EmbeddingProvider or a Semantic Kernel embedding service.")
@@ -0,0 +1,45 @@
+import heapq
+from itertools import chain
+from typing import Any, Dict, List
+import numpy as np
+
+SCORE_NORMALIZATIONS = ("minmax", "zscore", "none")
+
+
+def normalize_scores(results: List[Dict[str, Any]], normalization: str = "minmax") -> List[Dict[str, Any]]:
+    """
+    Rescales the scores of one collection's results so they compare with other collections' scores,
+    which may come from other distance functions, hybrid fusion or differently spread data.
+    The raw score is kept under `raw_score`. Both normalizations preserve the order of the results.
+
+    :param normalization: "minmax" maps the scores to [0, 1], "zscore" centres them on their mean in
+                          units of their standard deviation, "none" keeps them as they are. Both put the
+                          best result of every collection on a par, so "none" fits better collections
+                          embedded with the same model and searched with the same distance
+    """
+    if normalization not in SCORE_NORMALIZATIONS:
+        raise ValueError(f"Invalid normalization: {normalization}. Valid options are: {', '.join(SCORE_NORMALIZATIONS)}")
+    if not results:
+        return []
+    scores = np.array([result["score"] for result in results], dtype=np.float64)
+    if normalization == "minmax":
+        spread = scores.max() - scores.min()
+        # A single result, or results all tied, are all as good as this collection gets
+        normalized = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    elif normalization == "zscore":
+        deviation = scores.std()
+        normalized = (scores - scores.mean()) / deviation if deviation > 0 else np.zeros_like(scores)
+    else:
+        normalized = scores
+    return [
+        {**result, "score": float(score), "raw_score": result["score"]}
+        for result, score in zip(results, normalized)
+    ]
+
+
+def merge_top_k(result_lists: List[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Merges lists of results into the overall top `limit` by descending score. The lists need not be
+    sorted: diversified results come in pick order, not score order. Ties keep the order of the lists.
+    """
+    return heapq.nlargest(limit, chain.from_iterable(result_lists), key=lambda result: result["score"])
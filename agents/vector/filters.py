@@ -0,0 +1,100 @@
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchAny, Range, DatetimeRange, PayloadSchemaType
+
+# A search filter maps payload fields to conditions, all of which must hold:
+#   {"source": "report.pdf"}                      the field equals the value
+#   {"tags": ["finance", "q3"]}                   the field (or one of its elements) is any of the values
+#   {"timestamp": {"gte": datetime(2024, 1, 1)}}  range with any of "gt", "gte", "lt", "lte"
+# Qdrant backends also accept a native `Filter`.
+SearchFilter = Union[Dict[str, Any], Filter]
+
+RANGE_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+PAYLOAD_SCHEMAS = ("keyword", "integer", "float", "bool", "datetime", "text")
+FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def to_qdrant_filter(filters: Optional[SearchFilter]) -> Optional[Filter]:
+    """
+    Converts a search filter to a Qdrant `Filter`. Native filters are returned unchanged.
+    """
+    if filters is None or isinstance(filters, Filter):
+        return filters
+    conditions = []
+    for field, condition in filters.items():
+        check_field(field)
+        if _is_range(condition):
+            range_type = DatetimeRange if any(isinstance(v, (date, datetime)) for v in condition.values()) else Range
+            conditions.append(FieldCondition(key=field, range=range_type(**condition)))
+        elif isinstance(condition, (list, tuple, set)):
+            conditions.append(FieldCondition(key=field, match=MatchAny(any=list(condition))))
+        else:
+            conditions.append(FieldCondition(key=field, match=MatchValue(value=condition)))
+    return Filter(must=conditions)
+
+
+def to_sql_filter(filters: Dict[str, Any], list_fields: Iterable[str] = ()) -> Tuple[str, List[Any]]:
+    """
+    Converts a search filter to a WHERE clause over the JSON `payload` column of the numpy backend.
+
+    Scalar fields are compared through `json_extract`, the expression the payload indexes are built
+    on, so SQLite can use them. Fields holding lists (`list_fields`) are matched on their elements.
+
+    :return: The clause and its parameters
+    """
+    if isinstance(filters, Filter):
+        raise ValueError("Native Qdrant filters are only supported by the Qdrant backends.")
+    list_fields = set(list_fields)
+    clauses: List[str] = []
+    params: List[Any] = []
+    for field, condition in filters.items():
+        check_field(field)
+        # Fields are validated above, so inlining the path is safe and keeps the expression index-usable
+        expression = f"json_extract(payload, '$.{field}')"
+        if _is_range(condition):
+            for operator, value in condition.items():
+                clauses.append(f"{expression} {RANGE_OPERATORS[operator]} ?")
+                params.append(_sql_value(value))
+            continue
+        values = list(condition) if isinstance(condition, (list, tuple, set)) else [condition]
+        if not values:
+            clauses.append("0")
+            continue
+        placeholders = ",".join("?" * len(values))
+        if field in list_fields:
+            clauses.append(f"EXISTS (SELECT 1 FROM json_each(payload, '$.{field}') WHERE value IN ({placeholders}))")
+        else:
+            clauses.append(f"{expression} IN ({placeholders})")
+        params.extend(_sql_value(value) for value in values)
+    return " AND ".join(clauses) or "1", params
+
+
+def payload_schema(field_schema: str) -> PayloadSchemaType:
+    try:
+        return PayloadSchemaType[field_schema.upper()]
+    except KeyError:
+        raise ValueError(f"Invalid payload schema: {field_schema}. Valid options are: {', '.join(PAYLOAD_SCHEMAS)}")
+
+
+def _is_range(condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return False
+    invalid = set(condition) - set(RANGE_OPERATORS)
+    if invalid:
+        raise ValueError(f"Invalid range operators: {', '.join(sorted(invalid))}. Valid options are: {', '.join(RANGE_OPERATORS)}")
+    return True
+
+
+def check_field(field: str) -> None:
+    if not FIELD_PATTERN.match(field):
+        raise ValueError(f"Invalid payload field name: {field!r}")
+
+
+def _sql_value(value: Any) -> Any:
+    # Timestamps are stored as ISO 8601 strings, which sort chronologically
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
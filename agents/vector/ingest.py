@@ -0,0 +1,470 @@
+"""
+Ingests directories of documents into a collection and prints a throughput summary.
+
+Run from the `agents` directory, e.g.:
+
+    python -m vector.ingest docs/ notes/ --collection docs
+    python -m vector.ingest /data/wiki --collection wiki --backend qdrant_async --qdrant-url http://localhost:6333 --bulk-load
+
+Files are read and chunked in a process pool while the chunks of earlier files are embedded and
+upserted. Each file is recorded in the manifest with its size and modification time once all of its
+points are written, so a run that was interrupted resumes, when started again with the same arguments,
+from the files it had not finished. Files changed since are re-ingested incrementally: only their new
+chunks are embedded, and the chunks they lost are deleted.
+"""
+import argparse
+import asyncio
+import os
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set
+from dotenv import load_dotenv
+from numpy import ndarray
+from semantic_kernel import Kernel
+from config import (
+    BATCH_SIZE,
+    CHUNK_OVERLAP,
+    UPSERT_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    INGEST_UPSERT_CONCURRENCY,
+    INGEST_REPORT_SECONDS,
+    INGEST_EXTENSIONS,
+    VECTOR_SIZE,
+    NUMPY_DATA_DIR,
+    MANIFEST_PATH,
+    LOCAL_EMBEDDING_MODEL,
+)
+from vector.chunking import iter_chunks
+from vector.manifest import SourceChanges, SourceManifest
+from vector.pipeline import IngestProgress, point_queue_size, run_stages, _drain
+from vector.vector_base import VectorDatabaseBase, PointBatch
+
+BACKENDS = ("numpy", "ivf", "qdrant", "qdrant_async")
+EMBEDDINGS = ("azure", "local", "hashing")
+# Number of paths listed and checked against the manifest per worker-thread hop
+FILE_READ_AHEAD = 256
+
+
+@dataclass
+class ParsedFile:
+    path: str
+    size: int
+    mtime_ns: int
+    chunks: List[str]
+
+
+class _HTMLText(HTMLParser):
+    # Collects the text of a page, without its scripts and styles
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag in ("script", "style"):
+            self._skipping += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("script", "style") and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data: str) -> None:
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_text(data: bytes) -> str:
+    parser = _HTMLText()
+    parser.feed(data.decode("utf-8", errors="replace"))
+    parser.close()
+    return "".join(parser.parts)
+
+
+# Extensions whose files are converted to text before chunking, the others are chunked as UTF-8 text
+PARSERS: Dict[str, Callable[[bytes], str]] = {
+    ".html": html_text,
+    ".htm": html_text,
+}
+
+
+def parse_file(path: str, chunk_size: int = BATCH_SIZE, overlap: int = CHUNK_OVERLAP) -> ParsedFile:
+    """
+    Reads and chunks a file. Runs in the worker processes of a `DirectoryIngest`.
+    The file is stat'ed before it is read, so a file modified while it is read is ingested again on the next run.
+    """
+    stat = os.stat(path)
+    parser = PARSERS.get(os.path.splitext(path)[1].lower())
+    with open(path, "rb") as f:
+        chunks = list(iter_chunks(parser(f.read()) if parser else f, chunk_size, overlap))
+    return ParsedFile(path, stat.st_size, stat.st_mtime_ns, chunks)
+
+
+def iter_files(paths: Iterable[str], extensions: Iterable[str]) -> Iterator[str]:
+    """
+    Yields the absolute path of every file with one of the extensions under the paths, in a stable
+    order and each once. Paths naming a file are yielded whatever their extension; hidden files and
+    directories are skipped.
+    """
+    extensions = {extension.lower() for extension in extensions}
+    seen: Set[str] = set()
+    for path in paths:
+        if os.path.isfile(path):
+            candidates: Iterable[str] = [path]
+        elif os.path.isdir(path):
+            candidates = _walk(path, extensions)
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{path}'")
+        for candidate in candidates:
+            candidate = os.path.abspath(candidate)
+            if candidate not in seen:
+                seen.add(candidate)
+                yield candidate
+
+
+def _walk(directory: str, extensions: Set[str]) -> Iterator[str]:
+    for root, directories, names in os.walk(directory):
+        directories[:] = sorted(name for name in directories if not name.startswith("."))
+        for name in sorted(names):
+            if not name.startswith(".") and os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(root, name)
+
+
+@dataclass
+class DirectoryProgress(IngestProgress):
+    files: int = 0
+    skipped: int = 0
+    failed: int = 0
+    completed: int = 0
+    bytes: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files found, {self.skipped} unchanged, {self.completed} ingested, {self.failed} failed; "
+            + super().__str__()
+        )
+
+    def summary(self) -> str:
+        elapsed = self.elapsed or float("inf")
+        return (
+            f"{self.completed} files ingested, {self.skipped} unchanged and skipped, {self.failed} failed, out of {self.files} found\n"
+            f"{self.bytes / 1024 ** 2:.1f} MB read in {self.elapsed:.1f}s "
+            f"({self.completed / elapsed:.1f} files/s, {self.bytes / 1024 ** 2 / elapsed:.2f} MB/s)\n"
+            f"{self.chunks} new chunks, {self.embedded} embedded, {self.upserted} upserted in {self.batches} batches "
+            f"({self.throughput:.1f} points/s)"
+        )
+
+
+@dataclass(eq=False)
+class _FileState:
+    parsed: ParsedFile
+    changes: SourceChanges
+    # Chunks queued for embedding and not upserted yet
+    pending: int = 0
+    # Set once every new chunk of the file is queued
+    queued: bool = False
+
+
+class DirectoryIngest:
+    """
+    Ingests the files under directories through concurrent stages: files are parsed and chunked in a
+    process pool, chunks from all files are embedded in shared requests, and upsert batches go out in
+    parallel. Bounded queues between the stages keep memory bounded whatever the number of files, and
+    the first failing stage (e.g. upserts to a dead backend) stops the others.
+
+    Every file is ingested as the source with its absolute path as id. A file is committed to the
+    manifest, with its size and modification time, once all of its points are written; files whose
+    size and modification time match the manifest are skipped without being read.
+    """
+
+    def __init__(
+        self,
+        database: VectorDatabaseBase,
+        collection_name: str,
+        batch_size: int = BATCH_SIZE,
+        overlap: int = CHUNK_OVERLAP,
+        upsert_batch_size: int = UPSERT_BATCH_SIZE,
+        workers: Optional[int] = None,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        upsert_concurrency: int = INGEST_UPSERT_CONCURRENCY,
+        report_interval: float = INGEST_REPORT_SECONDS,
+        on_progress: Optional[Callable[[DirectoryProgress], None]] = None,
+        extensions: Iterable[str] = INGEST_EXTENSIONS.split(","),
+        tags: Optional[List[str]] = None,
+        resume: bool = True,
+    ):
+        """
+        :param database: The vector database to ingest into
+        :param collection_name: Name of the collection to upsert into
+        :param batch_size: Maximum number of characters per chunk
+        :param overlap: Number of characters shared between consecutive chunks
+        :param upsert_batch_size: Number of points sent to the database per upsert call
+        :param workers: Number of processes parsing files, the number of CPUs by default
+        :param queue_size: Capacity of the queue of chunks waiting to be embedded
+        :param upsert_concurrency: Number of upsert batches in flight
+        :param report_interval: Seconds between progress reports, 0 to disable
+        :param on_progress: Called with the progress on every report, defaults to printing it
+        :param extensions: Extensions of the files ingested from directories
+        :param tags: Tags stored in the payload of every point
+        :param resume: Skip the files recorded in the manifest with their current size and modification time
+        """
+        self.database = database
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.upsert_batch_size = upsert_batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.upsert_concurrency = upsert_concurrency
+        self.report_interval = report_interval
+        self.extensions = list(extensions)
+        self.tags = tags
+        self.resume = resume
+        self.on_progress = on_progress or (lambda progress: print(f"Ingest '{self.collection_name}': {progress}"))
+
+    async def run(self, paths: Iterable[str]) -> DirectoryProgress:
+        """
+        Ingests the files under the paths and returns the final progress counters.
+
+        :param paths: Directories to walk and files to ingest
+        """
+        progress = DirectoryProgress()
+        chunk_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        point_queue: asyncio.Queue = asyncio.Queue(point_queue_size(self.upsert_concurrency))
+        reporter = asyncio.create_task(self._report(progress)) if self.report_interval > 0 else None
+        try:
+            await run_stages(
+                [self._parse(list(paths), chunk_queue, progress), self._embed(chunk_queue, point_queue, progress)],
+                [self._upsert(point_queue, progress) for _ in range(self.upsert_concurrency)],
+                point_queue,
+            )
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        return progress
+
+    async def _parse(self, paths: List[str], chunk_queue: asyncio.Queue, progress: DirectoryProgress) -> None:
+        loop = asyncio.get_running_loop()
+        files = iter_files(paths, self.extensions)
+        parsing: Dict[Future, str] = {}
+        with ProcessPoolExecutor(self.workers) as pool:
+            try:
+                while True:
+                    # Walking and the manifest lookups may block on disk, so they run in a worker thread
+                    group = await asyncio.to_thread(lambda: [(path, self._unchanged(path)) for path in islice(files, FILE_READ_AHEAD)])
+                    if not group:
+                        break
+                    for path, unchanged in group:
+                        progress.files += 1
+                        if unchanged:
+                            progress.skipped += 1
+                            continue
+                        parsing[loop.run_in_executor(pool, parse_file, path, self.batch_size, self.overlap)] = path
+                        # A couple of files per worker in flight keeps the pool busy without reading ahead of the embedder
+                        if len(parsing) >= 2 * self.workers:
+                            await self._queue_parsed(parsing, chunk_queue, progress)
+                while parsing:
+                    await self._queue_parsed(parsing, chunk_queue, progress)
+            finally:
+                for future in parsing:
+                    future.cancel()
+        await chunk_queue.put(None)
+
+    def _unchanged(self, path: str) -> bool:
+        if not self.resume:
+            return False
+        fingerprint = self.database.manifest.file_fingerprint(self.collection_name, path)
+        if fingerprint is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return fingerprint == (stat.st_size, stat.st_mtime_ns)
+
+    async def _queue_parsed(self, parsing: Dict[Future, str], chunk_queue: asyncio.Queue, progress: DirectoryProgress) -> None:
+        # Queues the chunks of the files parsed so far, waiting for at least one. Parsed files are queued
+        # in the order they were found rather than the arbitrary order of the `done` set.
+        done, _ = await asyncio.wait(parsing, return_when=asyncio.FIRST_COMPLETED)
+        for future in [future for future in parsing if future in done]:
+            path = parsing.pop(future)
+            try:
+                parsed = future.result()
+            except (OSError, ValueError) as e:
+                # A file that can't be read doesn't stop the run; it is not recorded, so the next run retries it
+                print(f"Failed to read '{path}': {e}")
+                progress.failed += 1
+                continue
+            progress.bytes += parsed.size
+            state = _FileState(parsed, self.database.manifest.changes(self.collection_name, path))
+            for chunk in state.changes.filter(parsed.chunks):
+                state.pending += 1
+                progress.chunks += 1
+                await chunk_queue.put((state, chunk))
+            # The chunks are only needed until they are embedded
+            parsed.chunks = []
+            state.queued = True
+            if state.pending == 0:
+                await self._complete(state, progress)
+
+    async def _embed(self, chunk_queue: asyncio.Queue, point_queue: asyncio.Queue, progress: DirectoryProgress) -> None:
+        # Chunks of different files share embedding requests; the file of every text in flight is kept in order
+        owners: Deque[_FileState] = deque()
+
+        async def texts() -> AsyncIterator[str]:
+            async for state, chunk in _drain(chunk_queue):
+                owners.append(state)
+                yield chunk
+
+        embedder = self.database.embedder_for(await self.database.resolve_collection(self.collection_name))
+        async for batch_texts, embeddings in embedder.embed_batches(texts(), self.upsert_batch_size):
+            progress.embedded += len(batch_texts)
+            batch_owners = [owners.popleft() for _ in batch_texts]
+            await point_queue.put((self._make_batch(batch_texts, embeddings, batch_owners), batch_owners))
+
+    def _make_batch(self, texts: List[str], embeddings: ndarray, owners: List[_FileState]) -> PointBatch:
+        # One sub-batch per run of consecutive texts from the same file, joined into a single upsert
+        batches = []
+        start = 0
+        for end in range(1, len(texts) + 1):
+            if end == len(texts) or owners[end] is not owners[start]:
+                batches.append(self.database._make_batch(texts[start:end], embeddings[start:end], owners[start].parsed.path, self.tags))
+                start = end
+        return batches[0] if len(batches) == 1 else PointBatch.concatenate(batches)
+
+    async def _upsert(self, point_queue: asyncio.Queue, progress: DirectoryProgress) -> None:
+        while True:
+            item = await point_queue.get()
+            if item is None:
+                return
+            batch, owners = item
+            await self.database._write_points(self.collection_name, batch)
+            progress.upserted += len(batch)
+            progress.batches += 1
+            for state, count in Counter(owners).items():
+                state.pending -= count
+                if state.pending == 0 and state.queued:
+                    await self._complete(state, progress)
+
+    async def _complete(self, state: _FileState, progress: DirectoryProgress) -> None:
+        await self.database._commit_changes(self.collection_name, state.changes)
+        self.database.manifest.record_file(self.collection_name, state.parsed.path, state.parsed.size, state.parsed.mtime_ns)
+        progress.completed += 1
+
+    async def _report(self, progress: DirectoryProgress) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.on_progress(progress)
+
+
+def _make_embedding_service(args: argparse.Namespace) -> Any:
+    if args.embedding == "hashing":
+        from vector.embedding_providers import HashingEmbeddingProvider
+        return HashingEmbeddingProvider(args.dimensions)
+    if args.embedding == "local":
+        from vector.embedding_providers import LocalEmbeddingProvider
+        return LocalEmbeddingProvider(args.local_model)
+    if args.embedding == "azure":
+        from vector.embedding_providers import AzureEmbeddingProvider
+        return AzureEmbeddingProvider(
+            args.deployment,
+            os.getenv("AZURE_AI_ENDPOINT"),
+            os.getenv("AZURE_OPEN_AI_KEY"),
+            dimensions=args.dimensions if args.dimensions != VECTOR_SIZE else None,
+        )
+    raise ValueError(f"Invalid embedding: {args.embedding}. Valid options are: {', '.join(EMBEDDINGS)}")
+
+
+def _make_database(args: argparse.Namespace) -> VectorDatabaseBase:
+    kernel = Kernel()
+    options: Dict[str, Any] = {
+        "embedding_service": _make_embedding_service(args),
+        "manifest": SourceManifest(args.manifest),
+    }
+    if args.embedding_cache:
+        from vector.embedding_cache import EmbeddingCache
+        options["embedding_cache"] = EmbeddingCache()
+    if args.backend == "numpy":
+        from vector.numpy_store import NumpyVectorDatabase
+        return NumpyVectorDatabase(kernel, args.data_dir, **options)
+    if args.backend == "ivf":
+        from vector.ivf import IVFVectorDatabase
+        return IVFVectorDatabase(kernel, args.data_dir, **options)
+    if args.qdrant_url is None:
+        raise ValueError(f"The {args.backend} backend needs --qdrant-url.")
+    if args.backend == "qdrant":
+        from vector.qdrant import QdrantVectorDatabase
+        return QdrantVectorDatabase(kernel, args.qdrant_url, args.qdrant_api_key, **options)
+    if args.backend == "qdrant_async":
+        from vector.qdrant_async import AsyncQdrantVectorDatabase
+        return AsyncQdrantVectorDatabase(kernel, args.qdrant_url, args.qdrant_api_key, **options)
+    raise ValueError(f"Invalid backend: {args.backend}. Valid options are: {', '.join(BACKENDS)}")
+
+
+async def run(args: argparse.Namespace) -> DirectoryProgress:
+    database = _make_database(args)
+    try:
+        create = database.create_collection(args.collection, args.dimensions, args.distance)
+        if asyncio.iscoroutine(create):
+            await create
+        ingest = DirectoryIngest(
+            database,
+            args.collection,
+            batch_size=args.chunk_size,
+            overlap=args.overlap,
+            upsert_batch_size=args.upsert_batch_size,
+            workers=args.workers,
+            upsert_concurrency=args.upsert_concurrency,
+            report_interval=args.report_interval,
+            extensions=args.extensions.split(","),
+            tags=args.tags.split(",") if args.tags else None,
+            resume=not args.restart,
+        )
+        if not args.bulk_load:
+            return await ingest.run(args.paths)
+        async with database.bulk_load(args.collection):
+            return await ingest.run(args.paths)
+    finally:
+        close = getattr(database, "close", None)
+        if close is not None:
+            closed = close()
+            if asyncio.iscoroutine(closed):
+                await closed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Ingest the documents under directories into a vector collection.")
+    parser.add_argument("paths", nargs="+", help="Directories to walk and files to ingest")
+    parser.add_argument("--collection", required=True, help="Name of the collection, created if it doesn't exist")
+    parser.add_argument("--backend", choices=BACKENDS, default="numpy")
+    parser.add_argument("--data-dir", default=NUMPY_DATA_DIR, help="Directory of the numpy and IVF collections")
+    parser.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--qdrant-api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--embedding", choices=EMBEDDINGS, default="azure", help="Embedding provider")
+    parser.add_argument("--deployment", default="text-embedding-3-small", help="Azure embedding deployment")
+    parser.add_argument("--local-model", default=LOCAL_EMBEDDING_MODEL, help="sentence-transformers model of the local provider")
+    parser.add_argument("--embedding-cache", action="store_true", help="Cache embeddings on disk, so files re-read after an interruption are not embedded twice")
+    parser.add_argument("--dimensions", type=int, default=VECTOR_SIZE, help="Embedding dimensions")
+    parser.add_argument("--distance", default="Cosine", help="Distance function of a new collection")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="SQLite manifest recording the ingested files")
+    parser.add_argument("--extensions", default=INGEST_EXTENSIONS, help="Comma-separated extensions of the files ingested from directories")
+    parser.add_argument("--tags", help="Comma-separated tags stored with every point")
+    parser.add_argument("--workers", type=int, help="Processes parsing files, the number of CPUs by default")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_SIZE, help="Maximum number of characters per chunk")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--upsert-batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--upsert-concurrency", type=int, default=INGEST_UPSERT_CONCURRENCY)
+    parser.add_argument("--report-interval", type=float, default=INGEST_REPORT_SECONDS, help="Seconds between progress reports, 0 to disable")
+    parser.add_argument("--bulk-load", action="store_true", help="Defer index building until the ingest is done")
+    parser.add_argument("--restart", action="store_true", help="Read every file again instead of skipping the ones already ingested")
+    args = parser.parse_args(argv)
+    progress = asyncio.run(run(args))
+    print(f"\nIngested into '{args.collection}':")
+    print(progress.summary())
+
+
+if __name__ == "__main__":
+    main()
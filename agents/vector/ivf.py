@@ -0,0 +1,326 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from numpy import ndarray
+from semantic_kernel import Kernel
+from vector.numpy_store import NumpyCollection, NumpyVectorDatabase, grow_memmap
+from vector.embedding_cache import EmbeddingCache
+from vector.manifest import SourceManifest
+from vector.precision import SearchPrecision
+from config import (
+    NUMPY_DATA_DIR,
+    NUMPY_SEARCH_BLOCK_SIZE,
+    IVF_NLIST,
+    IVF_NPROBE,
+    IVF_KMEANS_ITERATIONS,
+    IVF_MIN_POINTS_PER_LIST,
+    IVF_TRAIN_POINTS_PER_LIST,
+    IVF_RETRAIN_GROWTH,
+    QUANTIZATION_OVERSAMPLING,
+)
+
+
+class IVFCollection(NumpyCollection):
+    """
+    A `NumpyCollection` with an inverted-file (IVF) index: k-means centroids partition the vectors
+    into `nlist` lists and a search only scans the `nprobe` lists closest to the query.
+
+    The index is trained automatically once the collection holds enough points, and retrained each
+    time the collection has grown `retrain_growth` times since; new points are assigned to their
+    nearest centroid as they are inserted. Until the first training searches are exact. Training
+    runs in the writing thread but outside the collection lock, so searches and other writes go on
+    with the previous index meanwhile. With `index_dimensions` the centroids are trained on the
+    truncated vectors. During a bulk load new points are left unassigned and the index is retrained
+    once at the end.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.index: Dict[str, Any] = self.config.setdefault("index", {
+            "nlist": IVF_NLIST,
+            "nprobe": IVF_NPROBE,
+            "kmeans_iterations": IVF_KMEANS_ITERATIONS,
+        })
+        centroids_path = os.path.join(path, "centroids.npy")
+        self.centroids: Optional[ndarray] = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        if self.centroids is not None:
+            # Collections trained before retraining existed grow from their current size
+            self.index.setdefault("trained_count", self.count)
+        assignments_path = os.path.join(path, "assignments.npy")
+        if not os.path.exists(assignments_path):
+            assignments = np.lib.format.open_memmap(assignments_path, mode="w+", dtype=np.int32, shape=(len(self.vectors),))
+            assignments[:] = -1
+            assignments.flush()
+            del assignments
+        self.assignments: ndarray = np.load(assignments_path, mmap_mode="r+")
+        self._lists: Optional[List[ndarray]] = None
+        # Rows written while the index is being trained, reassigned when the new centroids are installed
+        self._changed_rows: Optional[set] = None
+        if self._needs_training():
+            self.train()
+
+    def upsert(self, ids: List[str], vectors: ndarray, payloads: List[Dict[str, Any]]) -> ndarray:
+        with self.lock:
+            rows = super().upsert(ids, vectors, payloads)
+            self._lists = None
+            if self._changed_rows is not None:
+                self._changed_rows.update(rows.tolist())
+            if self.bulk_loading:
+                # Assigned when the index is retrained at the end of the load
+                return rows
+            if self.centroids is not None:
+                self.assignments[rows] = self._nearest(self.index_matrix[rows], self.centroids)
+                self.assignments.flush()
+            train = self._needs_training()
+        if train:
+            self.train()
+        return rows
+
+    def end_bulk_load(self) -> None:
+        with self.lock:
+            if not self.bulk_loading:
+                return
+            super().end_bulk_load()
+            train = self.centroids is not None or self.count >= self.index["nlist"] * IVF_MIN_POINTS_PER_LIST
+        # Retrained on a sample as large as the one of the incremental path, but drawn from the whole
+        # load, which also assigns the new points. `build_index` trains on a larger sample.
+        if train:
+            self.train(points_per_list=IVF_MIN_POINTS_PER_LIST)
+
+    def delete(self, ids: List[str]) -> int:
+        with self.lock:
+            deleted = super().delete(ids)
+            self.assignments.flush()
+            self._lists = None
+            return deleted
+
+    def train(self, nlist: Optional[int] = None, seed: int = 0, points_per_list: int = IVF_TRAIN_POINTS_PER_LIST) -> None:
+        """
+        (Re)builds the index: runs k-means on a sample of the vectors and assigns every vector to its nearest centroid.
+
+        The lock is only held to draw the sample and to install the new centroids: k-means and the
+        assignment of the existing vectors run while searches use the previous index (or scan
+        exactly) and writes go on. Rows written meanwhile are reassigned when the index is installed.
+        Does nothing if the index is already being trained.
+
+        :param nlist: Number of lists (centroids), defaults to the collection's setting
+        :param seed: Seed of the sampling and centroid initialisation
+        :param points_per_list: Size of the k-means sample, per list
+        """
+        with self.lock:
+            if self.count == 0 or self._changed_rows is not None:
+                return
+            if nlist is not None:
+                self.index["nlist"] = nlist
+            nlist = min(self.index["nlist"], self.count)
+            count = self.count
+            rng = np.random.default_rng(seed)
+            sample_size = min(count, nlist * points_per_list)
+            sample = np.sort(rng.choice(count, sample_size, replace=False))
+            data = np.array(self.index_matrix[sample])
+            self._changed_rows = set()
+        try:
+            centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+            for _ in range(self.index["kmeans_iterations"]):
+                centroids = self._update_centroids(data, self._nearest(data, centroids), centroids, rng)
+            centroids = centroids.astype(np.float32)
+            assignments = np.empty(count, dtype=np.int32)
+            for start in range(0, count, NUMPY_SEARCH_BLOCK_SIZE):
+                end = min(start + NUMPY_SEARCH_BLOCK_SIZE, count)
+                # Copied under the lock: the matrix is swapped out while writes grow it
+                with self.lock:
+                    block = np.array(self.index_matrix[start:end])
+                assignments[start:end] = self._nearest(block, centroids)
+            with self.lock:
+                # Rows overwritten, moved by deletes or appended since the sample was drawn
+                stale = np.array(sorted(row for row in self._changed_rows if row < self.count) + list(range(count, self.count)), dtype=np.int64)
+                kept = min(count, self.count)
+                self.centroids = centroids
+                np.save(os.path.join(self.path, "centroids.npy"), self.centroids)
+                self.assignments[:kept] = assignments[:kept]
+                if len(stale):
+                    self.assignments[stale] = self._nearest(self.index_matrix[stale], self.centroids)
+                self.assignments.flush()
+                self.index["trained_count"] = self.count
+                self._lists = None
+                self._flush()
+                print(f"Trained IVF index with {nlist} lists on {sample_size} of {self.count} points.")
+        finally:
+            with self.lock:
+                self._changed_rows = None
+
+    def precision_params(self, precision: SearchPrecision) -> Dict[str, Any]:
+        params = super().precision_params(precision)
+        if precision.nprobe is not None:
+            params["nprobe"] = precision.nprobe
+        return params
+
+    def _top_k(self, queries: ndarray, limit: int, exact: bool = False, oversampling: Optional[float] = None, nprobe: Optional[int] = None) -> Tuple[List[ndarray], List[ndarray]]:
+        """
+        Scans only the `nprobe` lists whose centroids score best against each query.
+        Falls back to a full scan when `exact` is set or the index isn't trained yet.
+        """
+        if exact or self.centroids is None:
+            return super()._top_k(queries, limit, exact, oversampling)
+        nprobe = min(nprobe or self.index["nprobe"], len(self.centroids))
+        lists = self._inverted_lists()
+        centroid_scores = self._scores(self._index_view(queries), self.centroids)
+        probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        all_rows, all_scores = [], []
+        for query, probe in zip(queries, probes):
+            rows, scores = self._rank_rows(query, np.concatenate([lists[list_id] for list_id in probe]), limit, oversampling=oversampling)
+            all_rows.append(rows)
+            all_scores.append(scores)
+        return all_rows, all_scores
+
+    def _move_row(self, source: int, target: int) -> None:
+        super()._move_row(source, target)
+        self.assignments[target] = self.assignments[source]
+        if self._changed_rows is not None:
+            self._changed_rows.add(target)
+
+    def _reserve(self, count: int) -> None:
+        super()._reserve(count)
+        if len(self.assignments) < len(self.vectors):
+            grow_memmap(self, "assignments", os.path.join(self.path, "assignments.npy"), len(self.vectors), self.count, fill=-1)
+
+    def _needs_training(self) -> bool:
+        # First training once every list can get enough points, then retraining as the collection grows
+        if self.bulk_loading or self.count == 0 or self._changed_rows is not None:
+            return False
+        if self.centroids is None:
+            return self.count >= self.index["nlist"] * IVF_MIN_POINTS_PER_LIST
+        growth = self.index.get("retrain_growth", IVF_RETRAIN_GROWTH)
+        return bool(growth) and self.count >= self.index.get("trained_count", self.count) * growth
+
+    def _nearest(self, vectors: ndarray, centroids: ndarray) -> ndarray:
+        nearest = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), NUMPY_SEARCH_BLOCK_SIZE):
+            end = min(start + NUMPY_SEARCH_BLOCK_SIZE, len(vectors))
+            nearest[start:end] = np.argmax(self._scores(np.asarray(vectors[start:end]), centroids), axis=1)
+        return nearest
+
+    def _update_centroids(self, data: ndarray, assignments: ndarray, centroids: ndarray, rng: np.random.Generator) -> ndarray:
+        nlist = len(centroids)
+        counts = np.bincount(assignments, minlength=nlist)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        updated = centroids.copy()
+        updated[filled] = np.add.reduceat(data[order], starts[filled], axis=0) / counts[filled, None]
+        # Re-seed empty lists with random points so every list stays in use
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            updated[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        if self.distance == "COSINE":
+            norms = np.linalg.norm(updated, axis=1, keepdims=True)
+            updated /= np.where(norms == 0, 1, norms)
+        return updated
+
+    def _inverted_lists(self) -> List[ndarray]:
+        # Rebuilt lazily after writes: one sort of the assignments, then a slice per list
+        if self._lists is None:
+            assignments = np.asarray(self.assignments[:self.count])
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+
+class IVFVectorDatabase(NumpyVectorDatabase):
+    """
+    In-process approximate nearest-neighbour database: the `NumpyVectorDatabase` storage with an
+    IVF index persisted next to each collection. Build parameters are `nlist` and the k-means
+    iteration count; the search parameter `nprobe` trades recall for speed and can be overridden
+    per call (`search(..., nprobe=64)`, or `exact=True` for a full scan).
+    """
+
+    collection_class = IVFCollection
+
+    def __init__(
+        self,
+        kernel: Kernel,
+        data_dir: str = NUMPY_DATA_DIR,
+        nlist: int = IVF_NLIST,
+        nprobe: int = IVF_NPROBE,
+        kmeans_iterations: int = IVF_KMEANS_ITERATIONS,
+        retrain_growth: Optional[float] = IVF_RETRAIN_GROWTH,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        manifest: Optional[SourceManifest] = None,
+        embedding_service: Optional[Any] = None
+    ):
+        """
+        :param kernel: The Semantic Kernel instance
+        :param data_dir: Directory holding one sub-directory per collection
+        :param nlist: Default number of lists of new collections
+        :param nprobe: Default number of lists scanned per query in new collections
+        :param kmeans_iterations: Default number of k-means iterations when training new collections
+        :param retrain_growth: Retrain the index of new collections each time they grow this many times
+                               since the last training, None to only retrain with `build_index`
+        :param embedding_cache: Optional cache consulted before calling the embedding service
+        :param manifest: Manifest of the chunks ingested per source, opened on first use if not given
+        :param embedding_service: Service used instead of the kernel's "azure_embeddings" service
+        """
+        super().__init__(kernel, data_dir, embedding_cache, manifest, embedding_service)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.retrain_growth = retrain_growth
+
+    def create_collection(
+        self,
+        collection_name: str,
+        vector_size: int,
+        distance_function: str = "Cosine",
+        quantization: Optional[str] = None,
+        oversampling: float = QUANTIZATION_OVERSAMPLING,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        index_dimensions: Optional[int] = None,
+        sparse: bool = False,
+        payload_indexes: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Creates a new collection if it doesn't exist.
+        If the collection already exists, this method does nothing.
+
+        :param collection_name: Name of the collection to create
+        :param vector_size: Size of the embedding vectors
+        :param distance_function: Distance metric to use: "Cosine", "Dot" or "Euclid" (default: "Cosine")
+        :param quantization: Keep "scalar" (int8) or "binary" codes of the vectors in RAM for the first search pass
+        :param oversampling: Number of candidates rescored with full-precision vectors, as a multiple of the limit
+        :param nlist: Number of lists of the index, defaults to the database setting
+        :param nprobe: Number of lists scanned per query, defaults to the database setting
+        :param index_dimensions: Run the first search pass (and train the centroids) on the embeddings truncated to this many dimensions
+        :param sparse: Also index the chunk texts for BM25 keyword matching, for hybrid search
+        :param payload_indexes: Payload fields to index for filtered searches, mapped to their type
+        """
+        self._create_collection(collection_name, vector_size, distance_function, quantization, oversampling, index_dimensions, payload_indexes, sparse=sparse, index={
+            "nlist": nlist or self.nlist,
+            "nprobe": nprobe or self.nprobe,
+            "kmeans_iterations": self.kmeans_iterations,
+            "retrain_growth": self.retrain_growth,
+        })
+
+    async def _collection_config(self, collection_name: str) -> Dict[str, Any]:
+        config = await super()._collection_config(collection_name)
+        index = self._collection(collection_name).index
+        return {**config, "nlist": index["nlist"], "nprobe": index["nprobe"]}
+
+    def build_index(self, collection_name: str, nlist: Optional[int] = None) -> None:
+        """
+        Trains (or retrains) the index of a collection, e.g. after a large ingest changed its distribution.
+
+        :param collection_name: The collection to index
+        :param nlist: Number of lists, defaults to the collection's setting
+        """
+        self._collection(collection_name).train(nlist)
+
+    def set_nprobe(self, collection_name: str, nprobe: int) -> None:
+        """
+        Changes the default number of lists scanned per query of a collection.
+        """
+        collection = self._collection(collection_name)
+        with collection.lock:
+            collection.index["nprobe"] = nprobe
+            collection._flush()
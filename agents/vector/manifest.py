@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config import MANIFEST_PATH
+
+# Namespace of the content-derived point ids, must never change or every point id changes with it
+POINT_ID_NAMESPACE = uuid.UUID("8a3c5e0e-2f4b-5d1a-9c7e-6b0d4f2a1e93")
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def point_id(source_id: Optional[str], text: str) -> str:
+    """
+    Returns the point id of a chunk. With a source, the id is deterministic: the same text from the
+    same source always maps to the same id, so re-ingesting it overwrites instead of duplicating.
+    Without one the id is random, since identical chunks of different documents must not overwrite
+    each other.
+    """
+    if source_id is None:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source_id}\x00{chunk_hash(text)}"))
+
+
+class SourceChanges:
+    """
+    Diff between the chunks previously ingested from a source and the chunks of a new version of it.
+    """
+
+    def __init__(self, source_id: str, previous: Set[str]):
+        self.source_id = source_id
+        self.previous = previous
+        self.current: Set[str] = set()
+        self.added = 0
+        self.unchanged = 0
+
+    def filter(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Yields only the chunks that are new or changed since the previous ingest, recording every chunk seen.
+        """
+        for chunk in chunks:
+            id = point_id(self.source_id, chunk)
+            if id in self.current:
+                continue
+            self.current.add(id)
+            if id in self.previous:
+                self.unchanged += 1
+                continue
+            self.added += 1
+            yield chunk
+
+    @property
+    def removed(self) -> List[str]:
+        """Ids of the chunks that disappeared from the source, valid once `filter` has been consumed."""
+        return list(self.previous - self.current)
+
+    def __str__(self) -> str:
+        return f"{self.added} added, {self.unchanged} unchanged, {len(self.removed)} removed"
+
+
+class SourceManifest:
+    """
+    Records which point ids were ingested from each source of each collection, in a SQLite file,
+    and for sources ingested from files, the size and modification time of the file they were read from.
+    Backends that can't store metadata with a collection also record its embedding model here.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        """
+        :param path: Path of the SQLite file backing the manifest
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            "collection TEXT NOT NULL, source TEXT NOT NULL, point_id TEXT NOT NULL, "
+            "PRIMARY KEY (collection, source, point_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "collection TEXT NOT NULL, source TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "PRIMARY KEY (collection, source))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS models ("
+            "collection TEXT NOT NULL PRIMARY KEY, model_id TEXT NOT NULL, dimensions INTEGER)"
+        )
+        self._conn.commit()
+
+    def point_ids(self, collection_name: str, source_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id FROM manifest WHERE collection = ? AND source = ?", (collection_name, source_id)
+            )
+            return {row[0] for row in rows}
+
+    def sources(self, collection_name: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT source FROM manifest WHERE collection = ? ORDER BY source", (collection_name,)
+            )
+            return [row[0] for row in rows]
+
+    def changes(self, collection_name: str, source_id: str) -> SourceChanges:
+        """
+        Starts a diff against the chunks currently recorded for a source.
+        """
+        return SourceChanges(source_id, self.point_ids(collection_name, source_id))
+
+    def replace(self, collection_name: str, source_id: str, point_ids: Iterable[str]) -> None:
+        """
+        Atomically replaces the point ids recorded for a source. The file fingerprint of the source
+        is cleared: it is only valid for the version of the file that was recorded with it.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM manifest WHERE collection = ? AND source = ?", (collection_name, source_id)
+            )
+            self._conn.execute(
+                "DELETE FROM files WHERE collection = ? AND source = ?", (collection_name, source_id)
+            )
+            self._conn.executemany(
+                "INSERT INTO manifest (collection, source, point_id) VALUES (?, ?, ?)",
+                ((collection_name, source_id, id) for id in point_ids),
+            )
+
+    def file_fingerprint(self, collection_name: str, source_id: str) -> Optional[Tuple[int, int]]:
+        """
+        Returns the `(size, mtime_ns)` of the file a source was last fully ingested from, if recorded.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM files WHERE collection = ? AND source = ?", (collection_name, source_id)
+            ).fetchone()
+            return (row[0], row[1]) if row is not None else None
+
+    def record_file(self, collection_name: str, source_id: str, size: int, mtime_ns: int) -> None:
+        """
+        Records that a source was fully ingested from a file of this size and modification time.
+        Must be called after the source's point ids are replaced.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (collection, source, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                (collection_name, source_id, size, mtime_ns),
+            )
+
+    def embedding_model(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the `{"model_id": ..., "dimensions": ...}` a collection was recorded as embedded with, if any.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model_id, dimensions FROM models WHERE collection = ?", (collection_name,)
+            ).fetchone()
+            return {"model_id": row[0], "dimensions": row[1]} if row is not None else None
+
+    def record_embedding_model(self, collection_name: str, model: Dict[str, Any]) -> None:
+        """
+        Records the model a collection is embedded with, for backends that can't keep it with the collection.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO models (collection, model_id, dimensions) VALUES (?, ?, ?)",
+                (collection_name, model["model_id"], model["dimensions"]),
+            )
+
+    def drop_collection(self, collection_name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM manifest WHERE collection = ?", (collection_name,))
+            self._conn.execute("DELETE FROM files WHERE collection = ?", (collection_name,))
+            self._conn.execute("DELETE FROM models WHERE collection = ?", (collection_name,))
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,894 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from numpy import ndarray
+from semantic_kernel import Kernel
+from vector.vector_base import VectorDatabaseBase, PointBatch, format_result
+from vector.embedding_cache import EmbeddingCache
+from vector.manifest import SourceManifest
+from vector.quantization import QUANTIZATION_TYPES, fit_quantizer, load_quantizer
+from vector.dimensions import truncate_vectors
+from vector.sparse import tokenize, reciprocal_rank_fusion
+from vector.filters import SearchFilter, to_sql_filter, check_field, payload_schema
+from vector.diversity import diversify, check_diversity, candidate_count
+from vector.precision import Precision, SearchPrecision
+from config import NUMPY_DATA_DIR, NUMPY_SEARCH_BLOCK_SIZE, NUMPY_INITIAL_CAPACITY, QUANTIZATION_OVERSAMPLING, HYBRID_OVERSAMPLING
+
+DISTANCES = ("COSINE", "DOT", "EUCLID")
+# Aliases of the collections, mapped to the collection they point to, in the data directory
+ALIASES_FILE = "aliases.json"
+
+
+class NumpyCollection:
+    """
+    One collection on disk: a memory-mapped float32 `vectors.npy` matrix whose first `count` rows
+    are live, a `config.json` with its parameters and a `points.sqlite3` sidecar mapping point ids
+    to rows and holding the JSON payloads.
+
+    Deleted rows are filled with the last live row, so the live rows always stay contiguous.
+
+    A quantized collection also keeps int8 or binary codes of its vectors in RAM (persisted in
+    `codes.npy`). Searches rank candidates on the codes and rescore the best `limit * oversampling`
+    of them with the full-precision vectors, which are then only read for those rows.
+
+    A collection with `index_dimensions` also keeps the embeddings truncated to that many components
+    (re-normalized, as text-embedding-3 models do for shortened outputs) in `index.npy`. The first
+    search pass then scans those, or their codes, and only the candidates are re-ranked with the
+    full-dimension vectors.
+
+    A collection with `sparse` also indexes the chunk texts in an SQLite FTS5 table of the sidecar,
+    whose BM25 ranking is fused with the dense results in hybrid searches.
+
+    Filtered searches select the matching rows in SQLite, where payload indexes are expression
+    indexes on the JSON payloads, and only score those rows.
+
+    During a bulk load the keyword index, payload indexes and quantized codes are rebuilt once at
+    the end instead of being maintained on every upsert.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "config.json")) as f:
+            self.config: Dict[str, Any] = json.load(f)
+        self.vector_size: int = self.config["vector_size"]
+        self.distance: str = self.config["distance"]
+        self.count: int = self.config["count"]
+        self.index_size: int = self.config.get("index_dimensions") or self.vector_size
+        self.oversampling: float = self.config.get("oversampling", QUANTIZATION_OVERSAMPLING)
+        self.sparse: bool = self.config.get("sparse", False)
+        # Set while index maintenance is deferred, see `begin_bulk_load`
+        self.bulk_loading: bool = self.config.get("bulk_loading", False)
+        # Payload fields that hold lists (e.g. tags), which filters match on their elements
+        self.list_fields: List[str] = self.config.setdefault("list_fields", [])
+        self.lock = threading.RLock()
+        self.vectors: ndarray = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r+")
+        self.index_vectors: Optional[ndarray] = None
+        if self.index_size < self.vector_size:
+            self.index_vectors = np.load(os.path.join(path, "index.npy"), mmap_mode="r+")
+        self.db = sqlite3.connect(os.path.join(path, "points.sqlite3"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.quantization: Optional[Dict[str, Any]] = self.config.get("quantization")
+        self.quantizer = None
+        self.codes: Optional[ndarray] = None
+        self._codes_file: Optional[ndarray] = None
+        if self.quantization is not None and self.quantization.get("params") is not None:
+            self.quantizer = load_quantizer(self.quantization["params"])
+            self._codes_file = np.load(os.path.join(path, "codes.npy"), mmap_mode="r+")
+            self.codes = np.array(self._codes_file)
+        if self.bulk_loading:
+            # The count isn't flushed during a bulk load, but batches are committed to SQLite after
+            # their vectors are written, so its row count is the live count
+            self.count = self.db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    @classmethod
+    def create(cls, path: str, vector_size: int, distance: str, capacity: int = NUMPY_INITIAL_CAPACITY, **config: Any) -> "NumpyCollection":
+        os.makedirs(path, exist_ok=True)
+        vectors = np.lib.format.open_memmap(
+            os.path.join(path, "vectors.npy"), mode="w+", dtype=np.float32, shape=(capacity, vector_size)
+        )
+        del vectors
+        index_dimensions = config.get("index_dimensions")
+        if index_dimensions and index_dimensions < vector_size:
+            index_vectors = np.lib.format.open_memmap(
+                os.path.join(path, "index.npy"), mode="w+", dtype=np.float32, shape=(capacity, index_dimensions)
+            )
+            del index_vectors
+        db = sqlite3.connect(os.path.join(path, "points.sqlite3"))
+        db.execute("CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, payload TEXT NOT NULL)")
+        if config.get("sparse"):
+            # rowid is the point's row; '_' is a token character so snake_case identifiers stay whole
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS text_index USING fts5(text, tokenize=\"unicode61 tokenchars '_'\")")
+        db.commit()
+        db.close()
+        _write_json(os.path.join(path, "config.json"), {"vector_size": vector_size, "distance": distance, "count": 0, **config})
+        return cls(path)
+
+    def upsert(self, ids: List[str], vectors: ndarray, payloads: List[Dict[str, Any]]) -> ndarray:
+        """
+        Writes points, overwriting the ones whose id already exists, and returns the rows written.
+        """
+        vectors = self._prepare(vectors)
+        with self.lock:
+            for payload in payloads:
+                for field, value in payload.items():
+                    if isinstance(value, list) and field not in self.list_fields:
+                        self.list_fields.append(field)
+            existing = self._rows(ids)
+            rows = np.empty(len(ids), dtype=np.int64)
+            new_rows: Dict[str, int] = {}
+            for i, id in enumerate(ids):
+                row = existing.get(id, new_rows.get(id))
+                if row is None:
+                    row = self.count + len(new_rows)
+                    new_rows[id] = row
+                rows[i] = row
+            self._reserve(self.count + len(new_rows))
+            self.vectors[rows] = vectors
+            index_vectors = self._index_view(vectors)
+            if self.index_vectors is not None:
+                self.index_vectors[rows] = index_vectors
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO points (row, id, payload) VALUES (?, ?, ?)",
+                    [(int(row), id, json.dumps(payload)) for row, id, payload in zip(rows, ids, payloads)],
+                )
+                if self.sparse and not self.bulk_loading:
+                    self.db.executemany(
+                        "INSERT OR REPLACE INTO text_index (rowid, text) VALUES (?, ?)",
+                        [(int(row), payload.get("text", "")) for row, payload in zip(rows, payloads)],
+                    )
+            self.count += len(new_rows)
+            if self.bulk_loading:
+                return rows
+            if self.quantization is not None:
+                self._quantize(rows, index_vectors)
+            self._flush()
+            return rows
+
+    def delete(self, ids: List[str]) -> int:
+        with self.lock:
+            deleted = 0
+            with self.db:
+                for id in ids:
+                    # Looked up one at a time since filling a hole moves the last row
+                    found = self.db.execute("SELECT row FROM points WHERE id = ?", (id,)).fetchone()
+                    if found is None:
+                        continue
+                    row, last = found[0], self.count - 1
+                    self.db.execute("DELETE FROM points WHERE row = ?", (row,))
+                    if self.sparse:
+                        self.db.execute("DELETE FROM text_index WHERE rowid = ?", (row,))
+                    if row != last:
+                        self._move_row(last, row)
+                        self.db.execute("UPDATE points SET row = ? WHERE row = ?", (row, last))
+                        if self.sparse:
+                            self.db.execute("UPDATE text_index SET rowid = ? WHERE rowid = ?", (row, last))
+                    self.count -= 1
+                    deleted += 1
+            if not self.bulk_loading:
+                self._flush()
+            return deleted
+
+    def search(
+        self,
+        queries: ndarray,
+        limit: int,
+        score_threshold: Optional[float],
+        query_texts: Optional[List[str]] = None,
+        filters: Optional[SearchFilter] = None,
+        diversity: float = 0.0,
+        **search_params: Any,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k search of several queries at once, returning formatted results per query.
+        With `query_texts`, the dense results are fused with the BM25 matches of the texts.
+        With `filters`, only points whose payload matches them are returned.
+        With `diversity`, a larger candidate set is re-ranked by maximal marginal relevance.
+        """
+        if query_texts is not None and not self.sparse:
+            raise ValueError("This collection has no sparse index, create it with sparse=True for hybrid search.")
+        check_diversity(diversity)
+        queries = self._prepare(np.atleast_2d(queries))
+        fetch = candidate_count(max(limit, 1), diversity)
+        candidates = fetch if query_texts is None else int(np.ceil(fetch * HYBRID_OVERSAMPLING))
+        with self.lock:
+            if filters:
+                where = to_sql_filter(filters, self.list_fields)
+                rows, scores = self._top_k_in(queries, self._matching_rows(where), candidates, **search_params)
+            else:
+                where = None
+                rows, scores = self._top_k(queries, candidates, **search_params)
+            hits = [self._filter(row, score, score_threshold) for row, score in zip(rows, scores)]
+            keyword_hits = [self._keyword_search(text, candidates, where) for text in query_texts or []]
+            payloads = self._payloads(
+                {row for query_hits in hits + keyword_hits for row, _ in query_hits}
+            )
+            if diversity:
+                # Read under the lock, since a delete may move rows
+                candidate_rows = np.array(sorted(payloads), dtype=np.int64)
+                candidate_vectors = np.asarray(self.vectors[candidate_rows])
+        results = [
+            [format_result(payloads[row][0], score, payloads[row][1]) for row, score in query_hits]
+            for query_hits in hits
+        ]
+        if query_texts is not None:
+            results = [
+                reciprocal_rank_fusion([dense, [format_result(payloads[row][0], score, payloads[row][1]) for row, score in keyword]], fetch)
+                for dense, keyword in zip(results, keyword_hits)
+            ]
+        if not diversity:
+            return results
+        positions = {payloads[row][0]: i for i, row in enumerate(candidate_rows)}
+        return [
+            diversify(query_results, candidate_vectors[[positions[result["id"]] for result in query_results]], query, limit, diversity)
+            for query, query_results in zip(queries, results)
+        ]
+
+    def _keyword_search(self, text: str, limit: int, where: Optional[Tuple[str, List[Any]]] = None) -> List[Tuple[int, float]]:
+        """
+        The `limit` best BM25 matches of any of the text's tokens, as (row, score) pairs.
+        """
+        tokens = sorted(set(tokenize(text)))
+        if not tokens:
+            return []
+        query = "SELECT rowid, bm25(text_index) FROM text_index WHERE text_index MATCH ?"
+        params: List[Any] = [" OR ".join(f'"{token}"' for token in tokens)]
+        if where is not None:
+            query += f" AND rowid IN (SELECT row FROM points WHERE {where[0]})"
+            params.extend(where[1])
+        # FTS5's bm25() is lower-is-better, scores are negated to match the dense ones
+        return [(row, -score) for row, score in self.db.execute(query + " ORDER BY bm25(text_index) LIMIT ?", params + [limit])]
+
+    def _matching_rows(self, where: Tuple[str, List[Any]]) -> ndarray:
+        clause, params = where
+        return np.fromiter((row for row, in self.db.execute(f"SELECT row FROM points WHERE {clause}", params)), dtype=np.int64)
+
+    def _top_k_in(self, queries: ndarray, rows: ndarray, limit: int, exact: bool = False, oversampling: Optional[float] = None, **index_params: Any) -> Tuple[List[ndarray], List[ndarray]]:
+        """
+        Like `_top_k`, restricted to the given rows. Like Qdrant does for filtered searches, the
+        matching rows are scored directly, so index parameters such as `nprobe` don't apply.
+        """
+        all_rows, all_scores = [], []
+        for query in queries:
+            best_rows = np.empty(0, dtype=np.int64)
+            best_scores = np.empty(0, dtype=np.float32)
+            for start in range(0, len(rows), NUMPY_SEARCH_BLOCK_SIZE):
+                block_rows, block_scores = self._rank_rows(query, rows[start:start + NUMPY_SEARCH_BLOCK_SIZE], limit, exact, oversampling)
+                best_rows = np.concatenate([best_rows, block_rows])
+                best_scores = np.concatenate([best_scores, block_scores])
+            order = np.argsort(-best_scores, kind="stable")[:limit]
+            all_rows.append(best_rows[order])
+            all_scores.append(best_scores[order])
+        return all_rows, all_scores
+
+    def create_payload_index(self, field_name: str, field_schema: str = "keyword") -> None:
+        """
+        Indexes a payload field so filters on it don't scan every payload. Fields holding lists
+        are matched on their elements, which the index doesn't cover.
+        """
+        check_field(field_name)
+        payload_schema(field_schema)
+        with self.lock:
+            if not self.bulk_loading:
+                with self.db:
+                    self._index_payload_field(field_name)
+            self.config.setdefault("payload_indexes", {})[field_name] = field_schema
+            self._flush()
+
+    def begin_bulk_load(self) -> None:
+        """
+        Defers index maintenance for a large load: upserts skip the keyword index, the payload
+        indexes (dropped until the end), the quantized codes and the config flushes, and SQLite
+        stops syncing every commit. `end_bulk_load` rebuilds everything once.
+        """
+        with self.lock:
+            if self.bulk_loading:
+                return
+            self.bulk_loading = True
+            self.config["bulk_loading"] = True
+            self._flush()
+            self.db.execute("PRAGMA synchronous=OFF")
+            with self.db:
+                for field_name in self.config.get("payload_indexes", {}):
+                    self.db.execute(f"DROP INDEX IF EXISTS \"payload_{field_name}\"")
+
+    def end_bulk_load(self) -> None:
+        """
+        Rebuilds the indexes deferred by `begin_bulk_load` and persists the collection.
+        """
+        with self.lock:
+            if not self.bulk_loading:
+                return
+            with self.db:
+                if self.sparse:
+                    self.db.execute("DELETE FROM text_index")
+                    self.db.execute("INSERT INTO text_index (rowid, text) SELECT row, json_extract(payload, '$.text') FROM points")
+                for field_name in self.config.get("payload_indexes", {}):
+                    self._index_payload_field(field_name)
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.bulk_loading = False
+            self.config.pop("bulk_loading", None)
+            if self.quantization is not None and self.count > 0:
+                self.requantize()
+            self._flush()
+
+    def _index_payload_field(self, field_name: str) -> None:
+        self.db.execute(
+            f"CREATE INDEX IF NOT EXISTS \"payload_{field_name}\" ON points (json_extract(payload, '$.{field_name}'))"
+        )
+
+    def read(self, start: int, stop: int) -> Tuple[List[str], ndarray, List[Dict[str, Any]]]:
+        """
+        Returns the ids, vectors and payloads of the live rows from `start` to `stop`.
+        """
+        with self.lock:
+            stop = min(stop, self.count)
+            vectors = np.array(self.vectors[start:stop])
+            records = self.db.execute(
+                "SELECT id, payload FROM points WHERE row >= ? AND row < ? ORDER BY row", (start, stop)
+            ).fetchall()
+        return [id for id, _ in records], vectors, [json.loads(payload) for _, payload in records]
+
+    def precision_params(self, precision: SearchPrecision) -> Dict[str, Any]:
+        """
+        The search parameters applying a `SearchPrecision` to this collection.
+        """
+        return {"exact": precision.exact, "oversampling": precision.oversampling}
+
+    def _top_k(self, queries: ndarray, limit: int, exact: bool = False, oversampling: Optional[float] = None) -> Tuple[List[ndarray], List[ndarray]]:
+        """
+        Returns the rows and scores (higher is better) of the `limit` best rows for each query.
+        Quantized and reduced-dimension collections are scanned on their codes or index vectors and
+        the candidates rescored with the full vectors, unless `exact` is set.
+        """
+        if exact or not self._two_stage():
+            return self._scan(queries, limit, lambda start, end: self._scores(queries, self.vectors[start:end]))
+        index_queries = self._index_view(queries)
+        candidates, _ = self._scan(
+            queries,
+            self._candidates(limit, oversampling),
+            lambda start, end: self._first_pass_scores(index_queries, slice(start, end)),
+        )
+        ranked = [self._rank_rows(query, rows, limit, exact=True) for query, rows in zip(queries, candidates)]
+        return [rows for rows, _ in ranked], [scores for _, scores in ranked]
+
+    def _rank_rows(self, query: ndarray, rows: ndarray, limit: int, exact: bool = False, oversampling: Optional[float] = None) -> Tuple[ndarray, ndarray]:
+        """
+        Returns the `limit` best of the given rows for one query, with full-precision scores. On quantized
+        and reduced-dimension collections the rows are first narrowed down on their codes or index
+        vectors unless `exact` is set.
+        """
+        if self._two_stage() and not exact:
+            candidates = self._candidates(limit, oversampling)
+            if len(rows) > candidates:
+                # The index vectors are memory-mapped too, sorted rows keep those reads sequential
+                rows = np.sort(rows)
+                scores = self._first_pass_scores(self._index_view(query[None, :]), rows)[0]
+                rows = rows[np.argpartition(-scores, candidates - 1)[:candidates]]
+        # Sorted rows keep reads from the memory map sequential
+        rows = np.sort(rows)
+        scores = self._scores(query[None, :], self.vectors[rows])[0]
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    def _scan(self, queries: ndarray, limit: int, block_scores: Callable[[int, int], ndarray]) -> Tuple[ndarray, ndarray]:
+        """
+        Scans every live row in blocks, so memory stays bounded, keeping the `limit` best rows per query.
+        """
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.count, NUMPY_SEARCH_BLOCK_SIZE):
+            end = min(start + NUMPY_SEARCH_BLOCK_SIZE, self.count)
+            scores = block_scores(start, end)
+            rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > limit:
+                top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _two_stage(self) -> bool:
+        return self.quantizer is not None or self.index_vectors is not None
+
+    def _first_pass_scores(self, index_queries: ndarray, rows: Any) -> ndarray:
+        if self.quantizer is not None:
+            return self.quantizer.scores(index_queries, self.codes[rows], self.distance)
+        return self._scores(index_queries, self.index_vectors[rows])
+
+    def _index_view(self, vectors: ndarray) -> ndarray:
+        """
+        The vectors as stored for the first search pass: truncated to `index_dimensions` if set.
+        """
+        if self.index_size == self.vector_size:
+            return vectors
+        return truncate_vectors(vectors, self.index_size)
+
+    @property
+    def index_matrix(self) -> ndarray:
+        """
+        The stored vectors of the first search pass (and of the IVF centroids).
+        """
+        return self.vectors if self.index_vectors is None else self.index_vectors
+
+    def _candidates(self, limit: int, oversampling: Optional[float]) -> int:
+        return int(np.ceil(limit * (oversampling or self.oversampling)))
+
+    def _quantize(self, rows: ndarray, vectors: ndarray) -> None:
+        if self.quantizer is None:
+            # The quantizer is fitted on the first batch, `requantize` refits it on the whole collection
+            self.requantize(vectors)
+            return
+        codes = self.quantizer.encode(vectors)
+        self.codes[rows] = codes
+        self._codes_file[rows] = codes
+        self._codes_file.flush()
+
+    def requantize(self, sample: Optional[ndarray] = None) -> None:
+        """
+        Fits the quantizer (on `sample`, or on a sample of the collection) and re-encodes every vector.
+        """
+        with self.lock:
+            if sample is None:
+                rng = np.random.default_rng(0)
+                sample = np.asarray(self.index_matrix[np.sort(rng.choice(self.count, min(self.count, 65536), replace=False))])
+            self.quantizer = fit_quantizer(self.quantization["type"], sample)
+            self.quantization["params"] = self.quantizer.to_dict()
+            shape = (len(self.vectors), self.quantizer.code_size(self.index_size))
+            self._codes_file = None
+            codes_file = np.lib.format.open_memmap(os.path.join(self.path, "codes.npy"), mode="w+", dtype=self.quantizer.dtype, shape=shape)
+            for start in range(0, self.count, NUMPY_SEARCH_BLOCK_SIZE):
+                end = min(start + NUMPY_SEARCH_BLOCK_SIZE, self.count)
+                codes_file[start:end] = self.quantizer.encode(self.index_matrix[start:end])
+            codes_file.flush()
+            self._codes_file = codes_file
+            self.codes = np.array(codes_file)
+            self._flush()
+
+    def _move_row(self, source: int, target: int) -> None:
+        self.vectors[target] = self.vectors[source]
+        if self.index_vectors is not None:
+            self.index_vectors[target] = self.index_vectors[source]
+        if self.codes is not None:
+            self.codes[target] = self.codes[source]
+            self._codes_file[target] = self.codes[source]
+
+    def _scores(self, queries: ndarray, vectors: ndarray) -> ndarray:
+        dot = queries @ vectors.T
+        if self.distance == "EUCLID":
+            squared = (vectors * vectors).sum(axis=1)[None, :] - 2 * dot + (queries * queries).sum(axis=1)[:, None]
+            return -np.sqrt(np.maximum(squared, 0))
+        return dot
+
+    def _filter(self, rows: ndarray, scores: ndarray, score_threshold: Optional[float]) -> List[Tuple[int, float]]:
+        hits = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            # Euclidean scores are negated distances internally, Qdrant reports the distance itself
+            if self.distance == "EUCLID":
+                score = -score
+                if score_threshold is not None and score > score_threshold:
+                    continue
+            elif score_threshold is not None and score < score_threshold:
+                continue
+            hits.append((row, score))
+        return hits
+
+    def _prepare(self, vectors: ndarray) -> ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if vectors.shape[1] != self.vector_size:
+            raise ValueError(f"Expected vectors of size {self.vector_size}, got {vectors.shape[1]}.")
+        if self.distance == "COSINE":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def _rows(self, ids: List[str]) -> Dict[str, int]:
+        rows: Dict[str, int] = {}
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            rows.update(self.db.execute(
+                f"SELECT id, row FROM points WHERE id IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return rows
+
+    def _payloads(self, rows: set) -> Dict[int, Tuple[str, Dict[str, Any]]]:
+        rows = list(rows)
+        payloads: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        for i in range(0, len(rows), 500):
+            part = rows[i:i + 500]
+            for row, id, payload in self.db.execute(
+                f"SELECT row, id, payload FROM points WHERE row IN ({','.join('?' * len(part))})", part
+            ):
+                payloads[row] = (id, json.loads(payload))
+        return payloads
+
+    def _reserve(self, count: int) -> None:
+        capacity = len(self.vectors)
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        grow_memmap(self, "vectors", os.path.join(self.path, "vectors.npy"), capacity, self.count)
+        if self.index_vectors is not None:
+            grow_memmap(self, "index_vectors", os.path.join(self.path, "index.npy"), capacity, self.count)
+        if self.codes is not None:
+            grow_memmap(self, "_codes_file", os.path.join(self.path, "codes.npy"), capacity, self.count)
+            codes = np.zeros((capacity,) + self.codes.shape[1:], dtype=self.codes.dtype)
+            codes[:self.count] = self.codes[:self.count]
+            self.codes = codes
+
+    def _flush(self) -> None:
+        self.vectors.flush()
+        if self.index_vectors is not None:
+            self.index_vectors.flush()
+        if self._codes_file is not None:
+            self._codes_file.flush()
+        self.config["count"] = self.count
+        _write_json(os.path.join(self.path, "config.json"), self.config)
+
+    def close(self) -> None:
+        with self.lock:
+            self.vectors.flush()
+            self.db.close()
+
+
+class NumpyVectorDatabase(VectorDatabaseBase):
+    """
+    In-process exact vector database: vectors live in memory-mapped float32 `.npy` matrices and
+    search is a vectorized dot product with an `argpartition` top-k. Needs no external service and
+    opens instantly, which makes it a fit for tests, offline work and collections of up to a few
+    million points.
+    """
+
+    collection_class = NumpyCollection
+
+    def __init__(
+        self,
+        kernel: Kernel,
+        data_dir: str = NUMPY_DATA_DIR,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        manifest: Optional[SourceManifest] = None,
+        embedding_service: Optional[Any] = None
+    ):
+        """
+        :param kernel: The Semantic Kernel instance
+        :param data_dir: Directory holding one sub-directory per collection
+        :param embedding_cache: Optional cache consulted before calling the embedding service
+        :param manifest: Manifest of the chunks ingested per source, opened on first use if not given
+        :param embedding_service: Service used instead of the kernel's "azure_embeddings" service
+        """
+        super().__init__(kernel, embedding_cache, manifest, embedding_service)
+        self.data_dir = data_dir
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+        self._aliases = self._read_aliases()
+
+    def create_collection(
+        self,
+        collection_name: str,
+        vector_size: int,
+        distance_function: str = "Cosine",
+        quantization: Optional[str] = None,
+        oversampling: float = QUANTIZATION_OVERSAMPLING,
+        index_dimensions: Optional[int] = None,
+        sparse: bool = False,
+        payload_indexes: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Creates a new collection if it doesn't exist.
+        If the collection already exists, this method does nothing.
+
+        :param collection_name: Name of the collection to create
+        :param vector_size: Size of the embedding vectors
+        :param distance_function: Distance metric to use: "Cosine", "Dot" or "Euclid" (default: "Cosine")
+        :param quantization: Keep "scalar" (int8) or "binary" codes of the vectors in RAM for the first search pass
+        :param oversampling: Number of candidates rescored with full-precision vectors, as a multiple of the limit
+        :param index_dimensions: Run the first search pass on the embeddings truncated to this many dimensions
+        :param sparse: Also index the chunk texts for BM25 keyword matching, for hybrid search
+        :param payload_indexes: Payload fields to index for filtered searches, mapped to their type
+                                ("keyword", "integer", "float", "bool", "datetime" or "text")
+        """
+        self._create_collection(collection_name, vector_size, distance_function, quantization, oversampling, index_dimensions, payload_indexes, sparse=sparse)
+
+    def _create_collection(
+        self,
+        collection_name: str,
+        vector_size: int,
+        distance_function: str,
+        quantization: Optional[str] = None,
+        oversampling: float = QUANTIZATION_OVERSAMPLING,
+        index_dimensions: Optional[int] = None,
+        payload_indexes: Optional[Dict[str, str]] = None,
+        **config: Any,
+    ) -> None:
+        distance = distance_function.upper()
+        if distance not in DISTANCES:
+            raise ValueError(f"Invalid distance function: {distance_function}. Valid options are: {', '.join(DISTANCES)}")
+        if quantization is not None:
+            if quantization not in QUANTIZATION_TYPES:
+                raise ValueError(f"Invalid quantization: {quantization}. Valid options are: {', '.join(QUANTIZATION_TYPES)}")
+            config["quantization"] = {"type": quantization}
+        if index_dimensions is not None:
+            if not 0 < index_dimensions <= vector_size:
+                raise ValueError(f"index_dimensions must be between 1 and the vector size ({vector_size}), got {index_dimensions}.")
+            config["index_dimensions"] = index_dimensions
+        config["oversampling"] = oversampling
+        with self._lock:
+            if self._exists(collection_name):
+                print(f"Collection '{collection_name}' already exists. Skipping creation.")
+                return
+            collection = self._collections[collection_name] = self.collection_class.create(
+                self._path(collection_name), vector_size, distance, **config
+            )
+        for field_name, field_schema in (payload_indexes or {}).items():
+            collection.create_payload_index(field_name, field_schema)
+        print(f"Collection '{collection_name}' created successfully.")
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema: str = "keyword") -> None:
+        """
+        Indexes a payload field of a collection so filtered searches on it stay fast.
+
+        :param collection_name: The collection to index
+        :param field_name: The payload field, e.g. "source" or "timestamp"
+        :param field_schema: Type of the field: "keyword", "integer", "float", "bool", "datetime" or "text"
+        """
+        self._collection(collection_name).create_payload_index(field_name, field_schema)
+        print(f"Payload index on '{field_name}' created in collection '{collection_name}'.")
+
+    def count(self, collection_name: str) -> int:
+        return self._collection(collection_name).count
+
+    def requantize(self, collection_name: str) -> None:
+        """
+        Refits the quantizer of a quantized collection on a sample of all its vectors and re-encodes them.
+        The quantizer is otherwise fitted on the first upserted batch.
+        """
+        collection = self._collection(collection_name)
+        if collection.quantization is None:
+            raise ValueError(f"Collection '{collection_name}' is not quantized.")
+        collection.requantize()
+
+    def close(self) -> None:
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
+
+    async def _begin_bulk_load(self, collection_name: str) -> None:
+        await asyncio.to_thread(self._collection(collection_name).begin_bulk_load)
+        print(f"Bulk load of collection '{collection_name}' started, indexing deferred.")
+
+    async def _end_bulk_load(self, collection_name: str) -> None:
+        await asyncio.to_thread(self._collection(collection_name).end_bulk_load)
+        print(f"Bulk load of collection '{collection_name}' finished, indexes rebuilt.")
+
+    async def _collection_config(self, collection_name: str) -> Dict[str, Any]:
+        config = self._collection(collection_name).config
+        return {
+            "vector_size": config["vector_size"],
+            "distance_function": config["distance"].capitalize(),
+            "quantization": (config.get("quantization") or {}).get("type"),
+            "oversampling": config.get("oversampling"),
+            "index_dimensions": config.get("index_dimensions"),
+            "sparse": config.get("sparse", False),
+            "payload_indexes": config.get("payload_indexes") or None,
+        }
+
+    async def _scroll_points(self, collection_name: str, batch_size: int) -> AsyncIterator[Tuple[List[str], ndarray, List[Dict[str, Any]]]]:
+        collection = self._collection(collection_name)
+        for start in range(0, collection.count, batch_size):
+            yield await asyncio.to_thread(collection.read, start, start + batch_size)
+
+    def _upsert_points(self, collection_name: str, batch: PointBatch) -> None:
+        """
+        Upserts a batch of points into the specified collection.
+
+        :param collection_name: The name of the collection
+        :param batch: The ids, vectors and payloads of the points
+        """
+        self._collection(collection_name).upsert([str(id) for id in batch.ids], batch.vectors, batch.payload_dicts())
+        print(f"Upserted {len(batch)} points into collection '{collection_name}'.")
+
+    def _delete_points(self, collection_name: str, point_ids: List[str]) -> None:
+        """
+        Deletes points by id from the specified collection.
+
+        :param collection_name: The name of the collection
+        :param point_ids: Ids of the points to delete
+        """
+        if not point_ids:
+            return
+        deleted = self._collection(collection_name).delete([str(id) for id in point_ids])
+        print(f"Deleted {deleted} points from collection '{collection_name}'.")
+
+    async def search(self, collection_name: str, query_text: str, limit: int = 10, score_threshold=0.7, hybrid: bool = False, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None, **search_params: Any) -> List[Any]:
+        """
+        Searches the collection for the nearest neighbors of a query string.
+
+        :param collection_name: The collection to search in
+        :param query_text: The query string to search for
+        :param limit: The number of nearest neighbors to return
+        :param hybrid: Fuse the dense results with BM25 keyword matches (collections created with `sparse=True`)
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          oversampling and, for IVF collections, `nprobe` (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision`
+        :param search_params: Backend-specific search parameters (`exact`, `oversampling`, `nprobe` for IVF collections)
+        :return: A list of results with the nearest neighbors
+        """
+        collection_name = await self.resolve_collection(collection_name)
+        embeddings = await self.query_embedder_for(collection_name).generate_embeddings([query_text])
+        if embeddings is None or len(embeddings) == 0:
+            return []
+        return await self.search_by_vector(collection_name, embeddings[0], limit, score_threshold, query_text if hybrid else None, filters, diversity, precision, latency_target, **search_params)
+
+    async def search_by_vector(self, collection_name: str, query_vector: List[float], limit: int = 10, score_threshold=0.7, query_text: Optional[str] = None, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None, **search_params: Any) -> List[Any]:
+        """
+        Searches the collection using a pre-computed embedding vector.
+
+        :param collection_name: The collection to search in
+        :param query_vector: The embedding vector to search with
+        :param limit: The number of nearest neighbors to return
+        :param query_text: Text of the query, given for a hybrid search with BM25 keyword matches
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          oversampling and, for IVF collections, `nprobe` (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision`
+        :param search_params: Backend-specific search parameters (`exact`, `oversampling`, `nprobe` for IVF collections)
+        :return: A list of results with the nearest neighbors
+        """
+        query_texts = None if query_text is None else [query_text]
+        results = await self.search_many_by_vector(collection_name, [query_vector], limit, score_threshold, query_texts, filters, diversity, precision, latency_target, **search_params)
+        return results[0]
+
+    async def search_many(self, collection_name: str, queries: List[str], limit: int = 10, score_threshold=0.7, hybrid: bool = False, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None, **search_params: Any) -> List[List[Any]]:
+        """
+        Searches the collection for several query strings with one embedding request and one matrix product.
+
+        :param collection_name: The collection to search in
+        :param queries: The query strings to search for
+        :param limit: The number of nearest neighbors to return per query
+        :param hybrid: Fuse the dense results with BM25 keyword matches (collections created with `sparse=True`)
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          oversampling and, for IVF collections, `nprobe` (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision`
+        :param search_params: Backend-specific search parameters (`exact`, `oversampling`, `nprobe` for IVF collections)
+        :return: One list of results per query, in the same order as the queries
+        """
+        if not queries:
+            return []
+        collection_name = await self.resolve_collection(collection_name)
+        embeddings = await self.query_embedder_for(collection_name).embedder.embed(queries)
+        return await self.search_many_by_vector(collection_name, embeddings, limit, score_threshold, queries if hybrid else None, filters, diversity, precision, latency_target, **search_params)
+
+    async def search_many_by_vector(self, collection_name: str, query_vectors: List[List[float]], limit: int = 10, score_threshold=0.7, query_texts: Optional[List[str]] = None, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None, **search_params: Any) -> List[List[Any]]:
+        """
+        Searches the collection with several pre-computed embedding vectors at once.
+
+        :param collection_name: The collection to search in
+        :param query_vectors: The embedding vectors to search with
+        :param limit: The number of nearest neighbors to return per vector
+        :param query_texts: Texts of the queries, given for a hybrid search: the dense and BM25 results are
+                            fused with reciprocal rank fusion, and `score_threshold` only filters the dense ones
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          oversampling and, for IVF collections, `nprobe` (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision`
+        :param search_params: Backend-specific search parameters (`exact`, `oversampling`, `nprobe` for IVF collections)
+        :return: One list of results per vector, in the same order as the vectors
+        """
+        if len(query_vectors) == 0:
+            return []
+        collection_name = await self.resolve_collection(collection_name)
+        collection = self._collection(collection_name)
+        with self.adaptive_precision.choose(collection_name, precision, latency_target=latency_target) as search_precision:
+            if search_precision is not None:
+                # Search parameters given explicitly win over the precision's
+                search_params = {**collection.precision_params(search_precision), **search_params}
+            # The matrix products release the GIL, so searching in a worker thread keeps the event loop free
+            return await asyncio.to_thread(collection.search, np.asarray(query_vectors), limit, score_threshold, query_texts, filters, diversity, **search_params)
+
+    async def _load_aliases(self) -> Dict[str, str]:
+        return self._read_aliases()
+
+    async def _set_alias(self, alias: str, collection_name: str) -> None:
+        if self._exists(alias):
+            raise ValueError(f"Invalid alias: '{alias}' is the name of a collection.")
+        if not self._exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' does not exist.")
+        os.makedirs(self.data_dir, exist_ok=True)
+        aliases = {**self._read_aliases(), alias: collection_name}
+        # Written aside and renamed, so readers see either the old or the new alias, never a partial file
+        temporary = os.path.join(self.data_dir, ALIASES_FILE + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(aliases, f, indent=2)
+        os.replace(temporary, os.path.join(self.data_dir, ALIASES_FILE))
+
+    def _load_embedding_model(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        if not self._exists(collection_name):
+            return None
+        return self._collection(collection_name).config.get("embedding_model")
+
+    def _save_embedding_model(self, collection_name: str, model: Dict[str, Any]) -> None:
+        # Kept in the collection's config, so it moves and is dropped with the collection
+        collection = self._collection(collection_name)
+        with collection.lock:
+            collection.config["embedding_model"] = model
+            collection._flush()
+
+    def _read_aliases(self) -> Dict[str, str]:
+        path = os.path.join(self.data_dir, ALIASES_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.data_dir, collection_name)
+
+    def _exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections or os.path.exists(os.path.join(self._path(collection_name), "config.json"))
+
+    def _collection(self, collection_name: str) -> NumpyCollection:
+        collection_name = (self._aliases or {}).get(collection_name, collection_name)
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                if not self._exists(collection_name):
+                    raise ValueError(f"Collection '{collection_name}' does not exist.")
+                collection = self._collections[collection_name] = self.collection_class(self._path(collection_name))
+                if collection.bulk_loading:
+                    print(f"Finishing the interrupted bulk load of collection '{collection_name}'.")
+                    collection.end_bulk_load()
+            return collection
+
+
+def grow_memmap(owner: Any, attribute: str, path: str, capacity: int, live: int, fill: Any = 0) -> None:
+    """
+    Grows the memory-mapped `.npy` array held in `owner.attribute` to `capacity` rows, keeping its
+    first `live` rows. The array is written to a new file and swapped in, so a crash never leaves a
+    truncated file behind; the old mapping is released first so the swap also works on Windows.
+    """
+    array = getattr(owner, attribute)
+    grown = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=array.dtype, shape=(capacity,) + array.shape[1:])
+    grown[:live] = array[:live]
+    if fill != 0:
+        grown[live:] = fill
+    grown.flush()
+    del grown
+    setattr(owner, attribute, None)
+    del array
+    os.replace(path + ".tmp", path)
+    setattr(owner, attribute, np.load(path, mmap_mode="r+"))
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable
+from config import PAYLOAD_STORE_PATH, PAYLOAD_COMPRESSION_LEVEL
+
+# Number of ids per SQL statement, below SQLite's limit on bound parameters
+LOOKUP_BATCH_SIZE = 500
+
+
+class PayloadStore:
+    """
+    Keeps the chunk texts of collections outside the vector database: zlib-compressed, keyed by
+    collection and point id, in a local SQLite file. Vector databases given a store only send ids,
+    vectors and small metadata to the server, and read the texts back for the final results of a search.
+    """
+
+    def __init__(self, path: str = PAYLOAD_STORE_PATH, compression_level: int = PAYLOAD_COMPRESSION_LEVEL):
+        """
+        :param path: Path of the SQLite file backing the store
+        :param compression_level: zlib level of the stored texts, from 1 (fastest) to 9 (smallest)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "collection TEXT NOT NULL, id TEXT NOT NULL, text BLOB NOT NULL, "
+            "PRIMARY KEY (collection, id)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def put_many(self, collection_name: str, ids: Iterable[str], texts: Iterable[str]) -> None:
+        rows = [
+            (collection_name, str(id), zlib.compress(text.encode("utf-8"), self.compression_level))
+            for id, text in zip(ids, texts)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO texts (collection, id, text) VALUES (?, ?, ?)", rows)
+
+    def get_many(self, collection_name: str, ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Returns the texts of the given points, in one query per `LOOKUP_BATCH_SIZE` ids. Unknown ids are left out.
+        """
+        ids = list(dict.fromkeys(str(id) for id in ids))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+                batch = ids[start:start + LOOKUP_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT id, text FROM texts WHERE collection = ? AND id IN ({','.join('?' * len(batch))})",
+                    [collection_name, *batch],
+                )
+                found.update((id, zlib.decompress(text).decode("utf-8")) for id, text in rows)
+        return found
+
+    def delete_many(self, collection_name: str, ids: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM texts WHERE collection = ? AND id = ?", ((collection_name, str(id)) for id in ids)
+            )
+
+    def drop_collection(self, collection_name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM texts WHERE collection = ?", (collection_name,))
+
+    def close(self) -> None:
+        self._conn.close()
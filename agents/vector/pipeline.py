@@ -0,0 +1,201 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, List, Optional
+from config import (
+    BATCH_SIZE,
+    CHUNK_OVERLAP,
+    UPSERT_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    INGEST_UPSERT_CONCURRENCY,
+    INGEST_REPORT_SECONDS,
+)
+from vector.chunking import TextSource, iter_chunks
+from vector.manifest import SourceChanges
+
+if TYPE_CHECKING:
+    from vector.vector_base import VectorDatabaseBase
+
+# Number of chunks pulled from the (blocking) chunker per worker-thread hop
+CHUNK_READ_AHEAD = 64
+
+
+@dataclass
+class IngestProgress:
+    chunks: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    batches: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Points upserted per second."""
+        elapsed = self.elapsed
+        return self.upserted / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.chunks} chunks read, {self.embedded} embedded, {self.upserted} upserted "
+            f"in {self.batches} batches ({self.elapsed:.1f}s, {self.throughput:.1f} points/s)"
+        )
+
+
+class IngestPipeline:
+    """
+    Runs chunking, embedding and upserting as concurrent stages connected by bounded queues.
+
+    A slow stage applies backpressure to the ones before it, so memory stays bounded by the
+    chunk queue and two upsert batches per upserter, while upsert batches go out in parallel
+    with the embedding of later chunks. The first failing stage stops the others.
+    """
+
+    def __init__(
+        self,
+        database: "VectorDatabaseBase",
+        collection_name: str,
+        batch_size: int = BATCH_SIZE,
+        overlap: int = CHUNK_OVERLAP,
+        upsert_batch_size: int = UPSERT_BATCH_SIZE,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        upsert_concurrency: int = INGEST_UPSERT_CONCURRENCY,
+        report_interval: float = INGEST_REPORT_SECONDS,
+        on_progress: Optional[Callable[[IngestProgress], None]] = None,
+        source_id: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ):
+        """
+        :param database: The vector database to ingest into
+        :param collection_name: Name of the collection to upsert into
+        :param batch_size: Maximum number of characters per chunk
+        :param overlap: Number of characters shared between consecutive chunks
+        :param upsert_batch_size: Number of points sent to the database per upsert call
+        :param queue_size: Capacity of the queue of chunks waiting to be embedded
+        :param upsert_concurrency: Number of upsert batches in flight
+        :param report_interval: Seconds between progress reports, 0 to disable
+        :param on_progress: Called with the progress on every report, defaults to printing it
+        :param source_id: Identifier of the document being ingested, enables incremental re-ingestion
+        :param tags: Tags stored in the payload of every point
+        """
+        self.database = database
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.upsert_batch_size = upsert_batch_size
+        self.queue_size = queue_size
+        self.upsert_concurrency = upsert_concurrency
+        self.report_interval = report_interval
+        self.source_id = source_id
+        self.tags = tags
+        self.on_progress = on_progress or (lambda progress: print(f"Ingest '{self.collection_name}': {progress}"))
+
+    async def run(self, data: TextSource) -> IngestProgress:
+        """
+        Ingests the data and returns the final progress counters.
+
+        :param data: A raw string, a file-like object or an iterable of strings
+        """
+        progress = IngestProgress()
+        changes = None
+        if self.source_id is not None:
+            changes = self.database.manifest.changes(self.collection_name, self.source_id)
+        chunk_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        point_queue: asyncio.Queue = asyncio.Queue(point_queue_size(self.upsert_concurrency))
+        reporter = asyncio.create_task(self._report(progress)) if self.report_interval > 0 else None
+        try:
+            await run_stages(
+                [self._read(data, changes, chunk_queue, progress), self._embed(chunk_queue, point_queue, progress)],
+                [self._upsert(point_queue, progress) for _ in range(self.upsert_concurrency)],
+                point_queue,
+            )
+            if changes is not None:
+                await self.database._commit_changes(self.collection_name, changes)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        self.on_progress(progress)
+        return progress
+
+    async def _read(
+        self, data: TextSource, changes: Optional[SourceChanges], chunk_queue: asyncio.Queue, progress: IngestProgress
+    ) -> None:
+        # Reading and splitting may block on disk, so it runs in a worker thread a few chunks at a time
+        chunks = iter_chunks(data, self.batch_size, self.overlap)
+        if changes is not None:
+            chunks = changes.filter(chunks)
+        while True:
+            group = await asyncio.to_thread(lambda: list(islice(chunks, CHUNK_READ_AHEAD)))
+            if not group:
+                break
+            for chunk in group:
+                await chunk_queue.put(chunk)
+                progress.chunks += 1
+        await chunk_queue.put(None)
+
+    async def _embed(self, chunk_queue: asyncio.Queue, point_queue: asyncio.Queue, progress: IngestProgress) -> None:
+        embedder = self.database.embedder_for(await self.database.resolve_collection(self.collection_name))
+        async for texts, embeddings in embedder.embed_batches(_drain(chunk_queue), self.upsert_batch_size):
+            progress.embedded += len(texts)
+            await point_queue.put(self.database._make_batch(texts, embeddings, self.source_id, self.tags))
+
+    async def _upsert(self, point_queue: asyncio.Queue, progress: IngestProgress) -> None:
+        while True:
+            batch = await point_queue.get()
+            if batch is None:
+                return
+            await self.database._write_points(self.collection_name, batch)
+            progress.upserted += len(batch)
+            progress.batches += 1
+
+    async def _report(self, progress: IngestProgress) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.on_progress(progress)
+
+
+def point_queue_size(upsert_concurrency: int) -> int:
+    """
+    Capacity of the queue of embedded upsert batches: two per upserter keeps them busy, and each
+    batch holds a float32 matrix, so a deeper queue would only hold more memory.
+    """
+    return 2 * upsert_concurrency
+
+
+async def run_stages(producers: List[Awaitable[None]], consumers: List[Awaitable[None]], queue: asyncio.Queue) -> None:
+    """
+    Runs the stages filling `queue` and the consumers draining it concurrently. Once every producer
+    is done, each consumer gets a None to stop on. The first stage to fail cancels all the others
+    and its error is raised, so e.g. a failing upsert stops the embedding of the rest of the input.
+    """
+    producer_tasks = [asyncio.create_task(producer) for producer in producers]
+    consumer_tasks = [asyncio.create_task(consumer) for consumer in consumers]
+
+    async def close() -> None:
+        await asyncio.gather(*producer_tasks)
+        for _ in consumer_tasks:
+            await queue.put(None)
+
+    tasks = producer_tasks + consumer_tasks + [asyncio.create_task(close())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        # In stage order, so the closer's copy of a producer's error doesn't hide which stage failed
+        for task in tasks:
+            if task in done and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator[Any]:
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        yield item
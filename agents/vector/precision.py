@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple, Union
+from config import QUANTIZATION_OVERSAMPLING, IVF_NPROBE, SEARCH_LATENCY_HEADROOM, SEARCH_LATENCY_SAMPLES
+
+# Weight of the latest search in the moving average of a level's latency
+LATENCY_SMOOTHING = 0.2
+
+
+@dataclass(frozen=True)
+class SearchPrecision:
+    """
+    The effort spent on one search: more effort finds more of the true nearest neighbors, slower.
+    Each backend applies the settings of its own index and ignores the others.
+
+    :param hnsw_ef: Size of the candidate list walked in the HNSW graph (Qdrant), the index default if None
+    :param nprobe: Number of lists scanned (IVF collections), the collection default if None
+    :param oversampling: Candidates re-ranked with the full vectors on quantized or reduced-dimension
+                         collections, as a multiple of the limit
+    :param exact: Skip the index (and quantization) for an exact full-dimension search
+    """
+    hnsw_ef: Optional[int] = None
+    nprobe: Optional[int] = None
+    oversampling: float = QUANTIZATION_OVERSAMPLING
+    exact: bool = False
+
+
+PRECISION_LEVELS: Dict[str, SearchPrecision] = {
+    "fast": SearchPrecision(hnsw_ef=32, nprobe=max(1, IVF_NPROBE // 4), oversampling=1.0),
+    "balanced": SearchPrecision(hnsw_ef=128, nprobe=IVF_NPROBE, oversampling=QUANTIZATION_OVERSAMPLING),
+    "accurate": SearchPrecision(hnsw_ef=512, nprobe=4 * IVF_NPROBE, oversampling=2 * QUANTIZATION_OVERSAMPLING),
+    "exact": SearchPrecision(exact=True),
+}
+# Levels an adaptive search moves between, cheapest first. Exact searches scan the whole collection,
+# so a single one can cost far more than any latency target and they are left out.
+ADAPTIVE_LEVELS = ("fast", "balanced", "accurate")
+
+Precision = Union[str, SearchPrecision]
+
+
+def resolve_precision(precision: Optional[Precision] = None, exact: bool = False) -> Optional[SearchPrecision]:
+    """
+    Returns the precision of a search from its `precision` (a level name or a `SearchPrecision`) and
+    `exact` flag, None if neither asks for one, for the collection's defaults.
+    """
+    if exact:
+        return PRECISION_LEVELS["exact"]
+    if precision is None:
+        return None
+    if isinstance(precision, SearchPrecision):
+        return precision
+    if precision not in PRECISION_LEVELS:
+        raise ValueError(f"Invalid precision: {precision}. Valid options are: {', '.join(PRECISION_LEVELS)}")
+    return PRECISION_LEVELS[precision]
+
+
+@dataclass
+class _LevelState:
+    level: int
+    latency: Optional[float] = None
+    samples: int = 0
+
+
+class AdaptivePrecision:
+    """
+    Picks, per collection and latency target, the most precise level of `ADAPTIVE_LEVELS` that meets
+    the target. Searches start at "balanced"; the moving average of the latency at the current level
+    moves them one level down as soon as it exceeds the target, and one level up once it stayed under
+    `headroom * target` for `samples` searches, so the level follows the load of the collection.
+    """
+
+    def __init__(self, headroom: float = SEARCH_LATENCY_HEADROOM, samples: int = SEARCH_LATENCY_SAMPLES):
+        """
+        :param headroom: Fraction of the target the latency must stay under before trying the next level up
+        :param samples: Number of searches measured at a level before trying the next level up
+        """
+        self.headroom = headroom
+        self.samples = samples
+        self._states: Dict[Tuple[str, float], _LevelState] = {}
+        self._lock = threading.Lock()
+
+    def level(self, collection_name: str, target: float) -> str:
+        """
+        The level the next search of a collection runs at to meet a latency target, in seconds.
+        """
+        if target <= 0:
+            raise ValueError(f"Invalid latency target: {target}. Expected a positive number of seconds.")
+        with self._lock:
+            state = self._states.setdefault((collection_name, target), _LevelState(ADAPTIVE_LEVELS.index("balanced")))
+            return ADAPTIVE_LEVELS[state.level]
+
+    def record(self, collection_name: str, target: float, level: str, seconds: float) -> None:
+        """
+        Records the latency of a search run at a level, moving the collection's level if needed.
+        Searches that started before the last move are ignored.
+        """
+        with self._lock:
+            state = self._states.get((collection_name, target))
+            if state is None or ADAPTIVE_LEVELS[state.level] != level:
+                return
+            if state.latency is None:
+                state.latency = seconds
+            else:
+                state.latency += LATENCY_SMOOTHING * (seconds - state.latency)
+            state.samples += 1
+            if state.latency > target and state.level > 0:
+                self._states[(collection_name, target)] = _LevelState(state.level - 1)
+            elif state.latency < self.headroom * target and state.samples >= self.samples and state.level < len(ADAPTIVE_LEVELS) - 1:
+                self._states[(collection_name, target)] = _LevelState(state.level + 1)
+
+    @contextmanager
+    def choose(
+        self,
+        collection_name: str,
+        precision: Optional[Precision] = None,
+        exact: bool = False,
+        latency_target: Optional[float] = None,
+    ) -> Iterator[Optional[SearchPrecision]]:
+        """
+        Yields the precision of a search: the one asked for, or with a `latency_target`, the level
+        expected to meet it, and then records how long the block took. Failed searches are not recorded.
+        """
+        if latency_target is None:
+            yield resolve_precision(precision, exact)
+            return
+        if precision is not None or exact:
+            raise ValueError("A search takes either a precision or a latency_target, not both.")
+        level = self.level(collection_name, latency_target)
+        started = time.perf_counter()
+        yield PRECISION_LEVELS[level]
+        self.record(collection_name, latency_target, level, time.perf_counter() - started)
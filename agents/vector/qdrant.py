@@ -1,17 +1,72 @@
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.models import (
+    Distance, VectorParams, PointIdsList, QueryRequest, Prefetch, ScoredPoint, SearchParams,
+    QuantizationSearchParams, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, HnswConfigDiff, SparseVectorParams, SparseVector, Modifier,
+    FusionQuery, Fusion, Filter, Record, Batch, OptimizersConfigDiff,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+)
 from semantic_kernel import Kernel
-from vector.vector_base import VectorDatabaseBase,PointData
-from typing import List, Any, Optional, Dict
+from vector.vector_base import VectorDatabaseBase,PointBatch,format_result
+from vector.embedding_cache import EmbeddingCache
+from vector.manifest import SourceManifest
+from vector.payload_store import PayloadStore
+from vector.quantization import QUANTIZATION_TYPES
+from vector.dimensions import truncate_vectors
+from vector.sparse import bm25_document, bm25_query
+from vector.filters import SearchFilter, to_qdrant_filter, payload_schema
+from vector.diversity import diversify, check_diversity, candidate_count
+from vector.precision import Precision, SearchPrecision
+from dataclasses import dataclass
+from typing import List, Any, Optional, Dict, Union, AsyncIterator, Tuple
+from config import QUANTIZATION_QUANTILE, QUANTIZATION_OVERSAMPLING, DIMENSION_RERANK_OVERSAMPLING, HYBRID_OVERSAMPLING, QDRANT_INDEXING_THRESHOLD
+import asyncio
+import math
+import numpy as np
 import uuid
 
+# Quantized collections rank candidates on the quantized vectors, then rescore `limit * oversampling`
+# of them with the original vectors. Ignored by collections without quantization.
+SEARCH_PARAMS = SearchParams(
+    quantization=QuantizationSearchParams(rescore=True, oversampling=QUANTIZATION_OVERSAMPLING)
+)
+EXACT_SEARCH_PARAMS = SearchParams(exact=True)
+
+# Reduced-dimension collections hold two named vectors per point: the truncated embedding, which is
+# indexed, and the full embedding, kept on disk without an index and only read to re-rank candidates.
+# The truncated search fetches `limit * DIMENSION_RERANK_OVERSAMPLING` candidates for the re-ranking.
+INDEX_VECTOR = "index"
+FULL_VECTOR = "full"
+# Collections created with `sparse=True` also hold a BM25 sparse vector per point, weighted by IDF in Qdrant
+SPARSE_VECTOR = "bm25"
+
+
+@dataclass
+class CollectionLayout:
+    """
+    The vectors held by each point of a collection.
+    """
+    index_dimensions: Optional[int] = None
+    sparse: bool = False
+
+    @classmethod
+    def from_params(cls, params: Any) -> "CollectionLayout":
+        index_dimensions = None
+        if isinstance(params.vectors, dict) and INDEX_VECTOR in params.vectors:
+            index_dimensions = params.vectors[INDEX_VECTOR].size
+        return cls(index_dimensions, SPARSE_VECTOR in (params.sparse_vectors or {}))
+
 
 class QdrantVectorDatabase(VectorDatabaseBase):
     def __init__(
         self,
         kernel: Kernel,
         qdrant_url: str,
-        api_key: str
+        api_key: str,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        manifest: Optional[SourceManifest] = None,
+        embedding_service: Optional[Any] = None,
+        payload_store: Optional[PayloadStore] = None
     ):
         """
         Initializes the Qdrant database connection and sets up the embedding service.
@@ -19,14 +74,24 @@ class QdrantVectorDatabase(VectorDatabaseBase):
         :param kernel: The Semantic Kernel instance
         :param qdrant_url: URL of the Qdrant service (e.g., "https://abcd.qdrant.xyz")
         :param api_key: API key for Qdrant authentication
+        :param embedding_cache: Optional cache consulted before calling the embedding service
+        :param manifest: Manifest of the chunks ingested per source, opened on first use if not given
+        :param embedding_service: Service used instead of the kernel's "azure_embeddings" service
+        :param payload_store: Keep the chunk texts in this local store instead of the Qdrant payloads, so
+                              the server only holds ids, vectors and metadata, and searches only read
+                              the texts of their final results
         """
-        super().__init__(kernel)
+        super().__init__(kernel, embedding_cache, manifest, embedding_service)
         self.client = QdrantClient(
             url=qdrant_url,
             api_key=api_key,
         )
+        self.payload_store = payload_store
+        self._layouts: Dict[str, CollectionLayout] = {}
+        # Indexing thresholds of the collections being bulk-loaded, restored at the end of the load
+        self._indexing_thresholds: Dict[str, int] = {}
     
-    def create_collection(self, collection_name: str, vector_size: int, distance_function: str = "Cosine") -> None:
+    def create_collection(self, collection_name: str, vector_size: int, distance_function: str = "Cosine", quantization: Optional[str] = None, always_ram: bool = True, index_dimensions: Optional[int] = None, sparse: bool = False, payload_indexes: Optional[Dict[str, str]] = None) -> None:
         """
         Creates a new collection in Qdrant if it doesn't exist.
         If the collection already exists, this method does nothing.
@@ -34,129 +99,457 @@ class QdrantVectorDatabase(VectorDatabaseBase):
         :param collection_name: Name of the collection to create
         :param vector_size: Size of the embedding vectors
         :param distance_function: Distance metric to use (default: "Cosine")
+        :param quantization: "scalar" (int8) or "binary" quantization of the vectors. The full-precision
+                             vectors then stay on disk and are only read to rescore the top candidates.
+        :param always_ram: Keep the quantized vectors in RAM
+        :param index_dimensions: Index the embeddings truncated to this many dimensions, and re-rank the
+                                 candidates with the full embeddings
+        :param sparse: Also index a BM25 sparse vector of every chunk's text, for hybrid search
+        :param payload_indexes: Payload fields to index for filtered searches, mapped to their type
+                                ("keyword", "integer", "float", "bool", "datetime" or "text")
         """
-        # Check if collection already exists
-        collections = self.client.get_collections().collections
-        collection_names = [collection.name for collection in collections]
-        
-        if collection_name in collection_names:
+        # Known collections are answered from the metadata cache without a round trip; collections found
+        # on the server are added to it with their layout
+        if collection_name in self._layouts or self.client.collection_exists(collection_name):
+            self._collection_layout(collection_name)
             print(f"Collection '{collection_name}' already exists. Skipping creation.")
             return
             
-        # Convert the distance function string to the appropriate enum value
-        try:
-            distance = Distance[distance_function.upper()]
-        except KeyError:
-            valid_distances = [d.name for d in Distance]
-            raise ValueError(f"Invalid distance function: {distance_function}. Valid options are: {', '.join(valid_distances)}")
-            
         # Create a new collection
         self.client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=vector_size,
-                distance=distance
-            )
+            vectors_config=_vectors_config(vector_size, distance_function, quantization, index_dimensions),
+            sparse_vectors_config=_sparse_vectors_config(sparse),
+            quantization_config=_quantization_config(quantization, always_ram)
         )
+        self._layouts[collection_name] = CollectionLayout(index_dimensions, sparse)
+        for field_name, field_schema in (payload_indexes or {}).items():
+            self.create_payload_index(collection_name, field_name, field_schema)
         print(f"Collection '{collection_name}' created successfully.")
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema: str = "keyword") -> None:
+        """
+        Indexes a payload field of a collection so filtered searches on it stay fast.
+
+        :param collection_name: The collection to index
+        :param field_name: The payload field, e.g. "source" or "timestamp"
+        :param field_schema: Type of the field: "keyword", "integer", "float", "bool", "datetime" or "text"
+        """
+        self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=payload_schema(field_schema)
+        )
+        print(f"Payload index on '{field_name}' created in collection '{collection_name}'.")
     
  
-    def _upsert_points(self, collection_name: str, points: List[PointData]) -> None:
+    def _upsert_points(self, collection_name: str, batch: PointBatch) -> None:
         """
-        Upserts a list of Qdrant PointStructs into the specified collection.
+        Upserts a batch of points into the specified collection, sent as one columnar Qdrant `Batch`.
 
         :param collection_name: The name of the collection
-        :param points: List of PointData with 'id', 'embeddings', and 'payload'
+        :param batch: The ids, vectors and payloads of the points
         """
-        if not points:
-            print("No points to upsert.")
-            return
+        if self.payload_store is not None:
+            # Stored first, so a point is never searchable without its text
+            self.payload_store.put_many(collection_name, batch.ids, batch.texts)
+        self.client.upsert(
+            collection_name=collection_name,
+            points=_qdrant_batch(batch, self._collection_layout(collection_name), self.payload_store is not None)
+        )
+        print(f"Upserted {len(batch)} points into collection '{collection_name}'.")
 
-        qdrant_points = [
-            PointStruct(
-                id=str(point.id),
-                vector=point.embeddings.flatten().tolist(),  # convert from NumPy to list of floats
-                payload={
-                    "timestamp": point.payload.timestamp.isoformat(),
-                    "text": point.payload.text
-                }
-            )
-            for point in points
-        ]
+    def _delete_points(self, collection_name: str, point_ids: List[str]) -> None:
+        """
+        Deletes points by id from the specified collection.
 
-        self.client.upsert(
+        :param collection_name: The name of the collection
+        :param point_ids: Ids of the points to delete
+        """
+        if not point_ids:
+            return
+        self.client.delete(
             collection_name=collection_name,
-            points=qdrant_points
+            points_selector=PointIdsList(points=list(point_ids))
         )
-        print(f"Upserted {len(qdrant_points)} points into collection '{collection_name}'.")
+        if self.payload_store is not None:
+            self.payload_store.delete_many(collection_name, point_ids)
+        print(f"Deleted {len(point_ids)} points from collection '{collection_name}'.")
     
     
 
-    async def search(self, collection_name: str, query_text: str,  limit: int = 10,score_threshold=0.7) -> List[Any]:
+    async def search(self, collection_name: str, query_text: str,  limit: int = 10,score_threshold=0.7, exact: bool = False, hybrid: bool = False, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[Any]:
         """
         Searches the Qdrant collection for the nearest neighbors of a query string.
         
         :param collection_name: The collection to search in
         :param query_text: The query string to search for
         :param limit: The number of nearest neighbors to return
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param hybrid: Fuse the dense results with BM25 keyword matches (collections created with `sparse=True`)
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
         :return: A list of results with the nearest neighbors
         """
         # Generate embedding for the query text
-        embeddings = await self.embedding_service.generate_embeddings([query_text])
+        collection_name = await self.resolve_collection(collection_name)
+        embeddings = await self.query_embedder_for(collection_name).generate_embeddings([query_text])
         
         if embeddings is None or len(embeddings) == 0:
             return []
             
-        # Get the embedding vector for the query
-        query_vector = embeddings[0]
-        
-        # Perform the search directly with the Qdrant client
-        search_results = self.client.search(
-            collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit,
-            score_threshold=score_threshold
-        )
-        
-        # Format the results
-        formatted_results = []
-        for result in search_results:
-            formatted_result = {
-                'id': result.id,
-                'score': result.score,
-                'text': result.payload.get('text', ''),
-                'metadata': {k: v for k, v in result.payload.items() if k != 'text'}
-            }
-            formatted_results.append(formatted_result)
-            
-        return formatted_results
+        return await self.search_by_vector(collection_name, embeddings[0], limit, score_threshold, exact, query_text if hybrid else None, filters, diversity, precision, latency_target)
         
-    async def search_by_vector(self, collection_name: str, query_vector: List[float], limit: int = 10,score_threshold=0.7) -> List[Any]:
+    async def search_by_vector(self, collection_name: str, query_vector: List[float], limit: int = 10,score_threshold=0.7, exact: bool = False, query_text: Optional[str] = None, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[Any]:
         """
         Searches the Qdrant collection using a pre-computed embedding vector.
         
         :param collection_name: The collection to search in
         :param query_vector: The embedding vector to search with
         :param limit: The number of nearest neighbors to return
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param query_text: Text of the query, given for a hybrid search with BM25 keyword matches
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
         :return: A list of results with the nearest neighbors
         """
-        # Perform the search with the provided query vector
-        search_results = self.client.search(
-            collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit,
-            score_threshold=score_threshold
-        )
+        query_texts = None if query_text is None else [query_text]
+        results = await self.search_many_by_vector(collection_name, [query_vector], limit, score_threshold, exact, query_texts, filters, diversity, precision, latency_target)
+        return results[0]
+
+    async def search_many(self, collection_name: str, queries: List[str], limit: int = 10, score_threshold=0.7, exact: bool = False, hybrid: bool = False, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[List[Any]]:
+        """
+        Searches the Qdrant collection for several query strings at once. All queries are embedded
+        in a single request and searched through a single batch search call.
         
-        # Format the results
-        formatted_results = []
-        for result in search_results:
-            formatted_result = {
-                'id': result.id,
-                'score': result.score,
-                'text': result.payload.get('text', ''),
-                'metadata': {k: v for k, v in result.payload.items() if k != 'text'}
-            }
-            formatted_results.append(formatted_result)
-            
-        return formatted_results
\ No newline at end of file
+        :param collection_name: The collection to search in
+        :param queries: The query strings to search for
+        :param limit: The number of nearest neighbors to return per query
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param hybrid: Fuse the dense results with BM25 keyword matches (collections created with `sparse=True`)
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
+        :return: One list of results per query, in the same order as the queries
+        """
+        if not queries:
+            return []
+        collection_name = await self.resolve_collection(collection_name)
+        embeddings = await self.query_embedder_for(collection_name).embedder.embed(queries)
+        return await self.search_many_by_vector(collection_name, embeddings, limit, score_threshold, exact, queries if hybrid else None, filters, diversity, precision, latency_target)
+
+    async def search_many_by_vector(self, collection_name: str, query_vectors: List[List[float]], limit: int = 10, score_threshold=0.7, exact: bool = False, query_texts: Optional[List[str]] = None, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[List[Any]]:
+        """
+        Searches the Qdrant collection with several pre-computed embedding vectors in a single batch search call.
+        
+        :param collection_name: The collection to search in
+        :param query_vectors: The embedding vectors to search with
+        :param limit: The number of nearest neighbors to return per vector
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param query_texts: Texts of the queries, given for a hybrid search: the dense and BM25 results are
+                            fused with reciprocal rank fusion, and `score_threshold` only filters the dense ones
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
+        :return: One list of results per vector, in the same order as the vectors
+        """
+        if len(query_vectors) == 0:
+            return []
+        collection_name = await self.resolve_collection(collection_name)
+        # The client is synchronous: its calls run in worker threads so concurrent searches (e.g. of a
+        # federated search) overlap and can be timed out
+        layout = await asyncio.to_thread(self._collection_layout, collection_name)
+        _check_hybrid(collection_name, layout, query_texts)
+        check_diversity(diversity)
+        query_filter = to_qdrant_filter(filters)
+        with self.adaptive_precision.choose(collection_name, precision, exact, latency_target) as search_precision:
+            batch_results = await asyncio.to_thread(
+                self.client.query_batch_points,
+                collection_name=collection_name,
+                requests=[
+                    _query_request(query_vector, candidate_count(limit, diversity), score_threshold, layout, search_precision, query_texts[i] if query_texts else None, query_filter, bool(diversity))
+                    for i, query_vector in enumerate(query_vectors)
+                ]
+            )
+        if diversity:
+            results = [_diverse_results(response.points, query_vector, limit, diversity) for response, query_vector in zip(batch_results, query_vectors)]
+        else:
+            results = [_format_results(response.points) for response in batch_results]
+        return await asyncio.to_thread(_hydrate_texts, self.payload_store, collection_name, results)
+
+    async def _begin_bulk_load(self, collection_name: str) -> None:
+        # With an indexing threshold of 0 Qdrant only appends to segments, the HNSW graph is built once afterwards
+        info = await asyncio.to_thread(self.client.get_collection, collection_name)
+        self._indexing_thresholds[collection_name] = info.config.optimizer_config.indexing_threshold
+        await asyncio.to_thread(
+            self.client.update_collection, collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+        )
+        print(f"Bulk load of collection '{collection_name}' started, indexing deferred.")
+
+    async def _end_bulk_load(self, collection_name: str) -> None:
+        threshold = self._indexing_thresholds.pop(collection_name, None)
+        if threshold is None:
+            threshold = QDRANT_INDEXING_THRESHOLD
+        await asyncio.to_thread(
+            self.client.update_collection, collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+        )
+        print(f"Bulk load of collection '{collection_name}' finished, Qdrant is building its index.")
+
+    async def _collection_config(self, collection_name: str) -> Dict[str, Any]:
+        info = await asyncio.to_thread(self.client.get_collection, collection_name)
+        return _snapshot_config(info)
+
+    async def _scroll_points(self, collection_name: str, batch_size: int) -> AsyncIterator[Tuple[List[Any], np.ndarray, List[Dict[str, Any]]]]:
+        offset = None
+        while True:
+            records, offset = await asyncio.to_thread(
+                self.client.scroll, collection_name, limit=batch_size, offset=offset, with_payload=True, with_vectors=True
+            )
+            if records:
+                # The store is SQLite, read in a worker thread like the scroll itself
+                yield await asyncio.to_thread(_stored_texts, self.payload_store, collection_name, *_records_batch(records))
+            if offset is None:
+                return
+
+    async def _load_aliases(self) -> Dict[str, str]:
+        response = await asyncio.to_thread(self.client.get_aliases)
+        return {alias.alias_name: alias.collection_name for alias in response.aliases}
+
+    async def _set_alias(self, alias: str, collection_name: str) -> None:
+        await asyncio.to_thread(
+            self.client.update_collection_aliases, change_aliases_operations=_alias_operations(alias, collection_name, alias in self._aliases)
+        )
+
+    def _collection_layout(self, collection_name: str) -> CollectionLayout:
+        if collection_name not in self._layouts:
+            info = self.client.get_collection(collection_name)
+            self._layouts[collection_name] = CollectionLayout.from_params(info.config.params)
+        return self._layouts[collection_name]
+
+
+def _alias_operations(alias: str, collection_name: str, exists: bool) -> List[Any]:
+    # Sent in one request, which Qdrant applies atomically: searches never find the alias missing
+    operations: List[Any] = [CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias))]
+    if exists:
+        operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    return operations
+
+
+def _parse_distance(distance_function: str) -> Distance:
+    # Convert the distance function string to the appropriate enum value
+    try:
+        return Distance[distance_function.upper()]
+    except KeyError:
+        valid_distances = [d.name for d in Distance]
+        raise ValueError(f"Invalid distance function: {distance_function}. Valid options are: {', '.join(valid_distances)}")
+
+
+def _vectors_config(vector_size: int, distance_function: str, quantization: Optional[str], index_dimensions: Optional[int]) -> Union[VectorParams, Dict[str, VectorParams]]:
+    distance = _parse_distance(distance_function)
+    if index_dimensions is None:
+        return VectorParams(size=vector_size, distance=distance, on_disk=True if quantization else None)
+    if not 0 < index_dimensions < vector_size:
+        raise ValueError(f"index_dimensions must be between 1 and the vector size ({vector_size}), got {index_dimensions}.")
+    return {
+        INDEX_VECTOR: VectorParams(size=index_dimensions, distance=distance, on_disk=True if quantization else None),
+        # m=0 skips building an HNSW graph: the full vectors are only read by id when re-ranking
+        FULL_VECTOR: VectorParams(size=vector_size, distance=distance, on_disk=True, hnsw_config=HnswConfigDiff(m=0)),
+    }
+
+
+def _sparse_vectors_config(sparse: bool) -> Optional[Dict[str, SparseVectorParams]]:
+    if not sparse:
+        return None
+    # Qdrant applies the IDF part of BM25 from its own collection statistics
+    return {SPARSE_VECTOR: SparseVectorParams(modifier=Modifier.IDF)}
+
+
+def _qdrant_batch(batch: PointBatch, layout: CollectionLayout, external_text: bool = False) -> Batch:
+    # Each vector column is converted with a single tolist() of its matrix rather than point by point
+    vectors = batch.vectors
+    payloads = batch.payload_dicts(exclude=("text",) if external_text else ())
+    if layout.index_dimensions is None:
+        if not layout.sparse:
+            return Batch(ids=[str(id) for id in batch.ids], vectors=vectors.tolist(), payloads=payloads)
+        columns: Dict[str, Any] = {"": vectors.tolist()}
+    else:
+        columns = {INDEX_VECTOR: truncate_vectors(vectors, layout.index_dimensions).tolist(), FULL_VECTOR: vectors.tolist()}
+    if layout.sparse:
+        columns[SPARSE_VECTOR] = [
+            SparseVector(indices=indices, values=values) for indices, values in map(bm25_document, batch.texts)
+        ]
+    return Batch(ids=[str(id) for id in batch.ids], vectors=columns, payloads=payloads)
+
+
+def _hydrate_texts(payload_store: Optional[PayloadStore], collection_name: str, result_lists: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+    # Results without a text in their payload get it from the store, all queries' results in one lookup
+    if payload_store is None:
+        return result_lists
+    missing = [result for results in result_lists for result in results if not result["text"]]
+    if missing:
+        texts = payload_store.get_many(collection_name, [result["id"] for result in missing])
+        for result in missing:
+            result["text"] = texts.get(str(result["id"]), "")
+    return result_lists
+
+
+def _stored_texts(payload_store: Optional[PayloadStore], collection_name: str, ids: List[Any], vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> Tuple[List[Any], np.ndarray, List[Dict[str, Any]]]:
+    # Puts the stored texts back into scrolled payloads, so exports hold them
+    if payload_store is not None:
+        texts = payload_store.get_many(collection_name, ids)
+        for id, payload in zip(ids, payloads):
+            if "text" not in payload and str(id) in texts:
+                payload["text"] = texts[str(id)]
+    return ids, vectors, payloads
+
+
+def _diverse_results(points: List[ScoredPoint], query_vector: Any, limit: int, diversity: float) -> List[Dict[str, Any]]:
+    vectors = [_dense_vector(point.vector) for point in points]
+    return diversify(_format_results(points), vectors, query_vector, limit, diversity)
+
+
+def _check_hybrid(collection_name: str, layout: CollectionLayout, query_texts: Optional[List[str]]) -> None:
+    if query_texts is not None and not layout.sparse:
+        raise ValueError(f"Collection '{collection_name}' has no sparse index, create it with sparse=True for hybrid search.")
+
+
+def _query_request(
+    query_vector: Any,
+    limit: int,
+    score_threshold: Optional[float],
+    layout: CollectionLayout,
+    precision: Optional[SearchPrecision] = None,
+    query_text: Optional[str] = None,
+    query_filter: Optional[Filter] = None,
+    with_vector: bool = False,
+) -> QueryRequest:
+    """
+    Builds the request of one search. On reduced-dimension collections the index vector returns
+    `limit * oversampling` candidates, which are re-ranked with the full vectors. Hybrid searches
+    fuse `limit * HYBRID_OVERSAMPLING` dense and BM25 candidates with reciprocal rank fusion.
+    The filter is applied to every stage, so candidates are only drawn from matching points.
+    `with_vector` also returns the vectors of the results, for re-ranking them. `precision` sets
+    the effort of the dense stages, the collection defaults if None.
+    """
+    vector = np.asarray(query_vector, dtype=np.float32).ravel()
+    if query_text is None:
+        return QueryRequest(**_dense_query(vector, limit, score_threshold, layout.index_dimensions, precision, query_filter), with_payload=True, with_vector=with_vector)
+    candidates = math.ceil(limit * HYBRID_OVERSAMPLING)
+    indices, values = bm25_query(query_text)
+    return QueryRequest(
+        prefetch=[
+            Prefetch(**_dense_query(vector, candidates, score_threshold, layout.index_dimensions, precision, query_filter)),
+            Prefetch(query=SparseVector(indices=indices, values=values), using=SPARSE_VECTOR, filter=query_filter, limit=candidates),
+        ],
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=limit,
+        with_payload=True,
+        with_vector=with_vector,
+    )
+
+
+def _search_params(precision: Optional[SearchPrecision]) -> SearchParams:
+    if precision is None:
+        return SEARCH_PARAMS
+    if precision.exact:
+        return EXACT_SEARCH_PARAMS
+    return SearchParams(
+        hnsw_ef=precision.hnsw_ef,
+        quantization=QuantizationSearchParams(rescore=True, oversampling=precision.oversampling),
+    )
+
+
+def _dense_query(vector: np.ndarray, limit: int, score_threshold: Optional[float], index_dimensions: Optional[int], precision: Optional[SearchPrecision], query_filter: Optional[Filter] = None) -> Dict[str, Any]:
+    params = _search_params(precision)
+    exact = precision is not None and precision.exact
+    if index_dimensions is None:
+        return dict(query=vector.tolist(), filter=query_filter, limit=limit, score_threshold=score_threshold, params=params)
+    prefetch = None
+    if not exact:
+        prefetch = Prefetch(
+            query=truncate_vectors(vector, index_dimensions).tolist(),
+            using=INDEX_VECTOR,
+            filter=query_filter,
+            limit=math.ceil(limit * (precision.oversampling if precision is not None else DIMENSION_RERANK_OVERSAMPLING)),
+            params=params,
+        )
+    return dict(
+        prefetch=prefetch,
+        query=vector.tolist(),
+        using=FULL_VECTOR,
+        filter=query_filter,
+        limit=limit,
+        score_threshold=score_threshold,
+        params=EXACT_SEARCH_PARAMS if exact else None,
+    )
+
+
+def _quantization_config(quantization: Optional[str], always_ram: bool) -> Optional[Union[ScalarQuantization, BinaryQuantization]]:
+    if quantization is None:
+        return None
+    if quantization == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=QUANTIZATION_QUANTILE, always_ram=always_ram)
+        )
+    if quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    raise ValueError(f"Invalid quantization: {quantization}. Valid options are: {', '.join(QUANTIZATION_TYPES)}")
+
+
+def _snapshot_config(info: Any) -> Dict[str, Any]:
+    # The create_collection arguments that recreate a collection, from its `get_collection` info
+    layout = CollectionLayout.from_params(info.config.params)
+    vectors = info.config.params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors[FULL_VECTOR] if layout.index_dimensions else vectors[""]
+    quantization = info.config.quantization_config
+    quantization_type, always_ram = None, True
+    if isinstance(quantization, ScalarQuantization):
+        quantization_type, always_ram = "scalar", quantization.scalar.always_ram
+    elif isinstance(quantization, BinaryQuantization):
+        quantization_type, always_ram = "binary", quantization.binary.always_ram
+    return {
+        "vector_size": vectors.size,
+        "distance_function": vectors.distance.value,
+        "quantization": quantization_type,
+        "always_ram": always_ram if always_ram is not None else True,
+        "index_dimensions": layout.index_dimensions,
+        "sparse": layout.sparse,
+        "payload_indexes": {
+            field: schema.data_type.value for field, schema in (info.payload_schema or {}).items()
+        } or None,
+    }
+
+
+def _records_batch(records: List[Record]) -> Tuple[List[Any], np.ndarray, List[Dict[str, Any]]]:
+    vectors = [_dense_vector(record.vector) for record in records]
+    return [record.id for record in records], np.asarray(vectors, dtype=np.float32), [record.payload or {} for record in records]
+
+
+def _dense_vector(vector: Any) -> Any:
+    # Reduced-dimension and hybrid collections hold named vectors, of which only the full dense one is used
+    if isinstance(vector, dict):
+        return vector[FULL_VECTOR] if FULL_VECTOR in vector else vector[""]
+    return vector
+
+
+def _format_results(search_results: List[ScoredPoint]) -> List[Dict[str, Any]]:
+    return [format_result(result.id, result.score, result.payload) for result in search_results]
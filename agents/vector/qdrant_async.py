@@ -0,0 +1,333 @@
+import asyncio
+import httpx
+import math
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import PointIdsList, OptimizersConfigDiff
+from semantic_kernel import Kernel
+from vector.vector_base import VectorDatabaseBase, PointBatch
+from vector.embedding_cache import EmbeddingCache
+from vector.filters import SearchFilter, to_qdrant_filter, payload_schema
+from vector.diversity import check_diversity, candidate_count
+from vector.precision import Precision
+from vector.manifest import SourceManifest
+from vector.payload_store import PayloadStore
+from vector.qdrant import (
+    CollectionLayout, _vectors_config, _sparse_vectors_config, _qdrant_batch, _check_hybrid, _query_request,
+    _format_results, _quantization_config, _snapshot_config, _records_batch, _diverse_results, _hydrate_texts, _stored_texts,
+    _alias_operations,
+)
+from typing import List, Any, Optional, Awaitable, TypeVar, Dict, AsyncIterator, Tuple
+from config import QDRANT_TIMEOUT, QDRANT_POOL_SIZE, QDRANT_GRPC_PORT, QDRANT_INDEXING_THRESHOLD
+
+T = TypeVar("T")
+
+
+class AsyncQdrantVectorDatabase(VectorDatabaseBase):
+    """
+    Qdrant backend built on `AsyncQdrantClient`: every call is awaited on the event loop instead of
+    blocking it, so concurrent searches and upserts from the same process actually overlap.
+    """
+
+    def __init__(
+        self,
+        kernel: Kernel,
+        qdrant_url: str,
+        api_key: str,
+        prefer_grpc: bool = False,
+        grpc_port: int = QDRANT_GRPC_PORT,
+        timeout: float = QDRANT_TIMEOUT,
+        pool_size: int = QDRANT_POOL_SIZE,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        manifest: Optional[SourceManifest] = None,
+        embedding_service: Optional[Any] = None,
+        payload_store: Optional[PayloadStore] = None
+    ):
+        """
+        Initializes the async Qdrant client and sets up the embedding service.
+
+        :param kernel: The Semantic Kernel instance
+        :param qdrant_url: URL of the Qdrant service (e.g., "https://abcd.qdrant.xyz")
+        :param api_key: API key for Qdrant authentication
+        :param prefer_grpc: Use the gRPC transport instead of REST
+        :param grpc_port: Port of the gRPC endpoint
+        :param timeout: Default timeout in seconds of every call
+        :param pool_size: Maximum number of pooled keep-alive HTTP connections
+        :param embedding_cache: Optional cache consulted before calling the embedding service
+        :param manifest: Manifest of the chunks ingested per source, opened on first use if not given
+        :param embedding_service: Service used instead of the kernel's "azure_embeddings" service
+        :param payload_store: Keep the chunk texts in this local store instead of the Qdrant payloads, so
+                              the server only holds ids, vectors and metadata, and searches only read
+                              the texts of their final results
+        """
+        super().__init__(kernel, embedding_cache, manifest, embedding_service)
+        self.timeout = timeout
+        self.client = AsyncQdrantClient(
+            url=qdrant_url,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            # Whole seconds for the client, rounded up so a sub-second timeout isn't 0; `_call` enforces the exact one
+            timeout=math.ceil(timeout),
+            # The client disables keep-alive by default, which opens a new connection per request
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        self.payload_store = payload_store
+        self._layouts: Dict[str, CollectionLayout] = {}
+        # Indexing thresholds of the collections being bulk-loaded, restored at the end of the load
+        self._indexing_thresholds: Dict[str, int] = {}
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def create_collection(self, collection_name: str, vector_size: int, distance_function: str = "Cosine", quantization: Optional[str] = None, always_ram: bool = True, index_dimensions: Optional[int] = None, sparse: bool = False, payload_indexes: Optional[Dict[str, str]] = None) -> None:
+        """
+        Creates a new collection in Qdrant if it doesn't exist.
+        If the collection already exists, this method does nothing.
+
+        :param collection_name: Name of the collection to create
+        :param vector_size: Size of the embedding vectors
+        :param distance_function: Distance metric to use (default: "Cosine")
+        :param quantization: "scalar" (int8) or "binary" quantization of the vectors. The full-precision
+                             vectors then stay on disk and are only read to rescore the top candidates.
+        :param always_ram: Keep the quantized vectors in RAM
+        :param index_dimensions: Index the embeddings truncated to this many dimensions, and re-rank the
+                                 candidates with the full embeddings
+        :param sparse: Also index a BM25 sparse vector of every chunk's text, for hybrid search
+        :param payload_indexes: Payload fields to index for filtered searches, mapped to their type
+                                ("keyword", "integer", "float", "bool", "datetime" or "text")
+        """
+        # Known collections are answered from the metadata cache without a round trip; collections found
+        # on the server are added to it with their layout
+        if collection_name in self._layouts or await self._call(self.client.collection_exists(collection_name)):
+            await self._collection_layout(collection_name)
+            print(f"Collection '{collection_name}' already exists. Skipping creation.")
+            return
+        await self._call(self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=_vectors_config(vector_size, distance_function, quantization, index_dimensions),
+            sparse_vectors_config=_sparse_vectors_config(sparse),
+            quantization_config=_quantization_config(quantization, always_ram)
+        ))
+        self._layouts[collection_name] = CollectionLayout(index_dimensions, sparse)
+        for field_name, field_schema in (payload_indexes or {}).items():
+            await self.create_payload_index(collection_name, field_name, field_schema)
+        print(f"Collection '{collection_name}' created successfully.")
+
+    async def create_payload_index(self, collection_name: str, field_name: str, field_schema: str = "keyword") -> None:
+        """
+        Indexes a payload field of a collection so filtered searches on it stay fast.
+
+        :param collection_name: The collection to index
+        :param field_name: The payload field, e.g. "source" or "timestamp"
+        :param field_schema: Type of the field: "keyword", "integer", "float", "bool", "datetime" or "text"
+        """
+        await self._call(self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=payload_schema(field_schema)
+        ))
+        print(f"Payload index on '{field_name}' created in collection '{collection_name}'.")
+
+    async def _upsert_points(self, collection_name: str, batch: PointBatch) -> None:
+        """
+        Upserts a batch of points into the specified collection, sent as one columnar Qdrant `Batch`.
+
+        :param collection_name: The name of the collection
+        :param batch: The ids, vectors and payloads of the points
+        """
+        layout = await self._collection_layout(collection_name)
+        if self.payload_store is not None:
+            # Stored first, so a point is never searchable without its text
+            await asyncio.to_thread(self.payload_store.put_many, collection_name, batch.ids, batch.texts)
+        await self._call(self.client.upsert(
+            collection_name=collection_name,
+            points=_qdrant_batch(batch, layout, self.payload_store is not None)
+        ))
+        print(f"Upserted {len(batch)} points into collection '{collection_name}'.")
+
+    async def _delete_points(self, collection_name: str, point_ids: List[str]) -> None:
+        """
+        Deletes points by id from the specified collection.
+
+        :param collection_name: The name of the collection
+        :param point_ids: Ids of the points to delete
+        """
+        if not point_ids:
+            return
+        await self._call(self.client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=list(point_ids))
+        ))
+        if self.payload_store is not None:
+            await asyncio.to_thread(self.payload_store.delete_many, collection_name, point_ids)
+        print(f"Deleted {len(point_ids)} points from collection '{collection_name}'.")
+
+    async def search(self, collection_name: str, query_text: str, limit: int = 10, score_threshold=0.7, timeout: Optional[float] = None, exact: bool = False, hybrid: bool = False, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[Any]:
+        """
+        Searches the Qdrant collection for the nearest neighbors of a query string.
+
+        :param collection_name: The collection to search in
+        :param query_text: The query string to search for
+        :param limit: The number of nearest neighbors to return
+        :param timeout: Timeout in seconds of the search call, defaults to the client timeout
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param hybrid: Fuse the dense results with BM25 keyword matches (collections created with `sparse=True`)
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
+        :return: A list of results with the nearest neighbors
+        """
+        collection_name = await self.resolve_collection(collection_name)
+        embeddings = await self.query_embedder_for(collection_name).generate_embeddings([query_text])
+        if embeddings is None or len(embeddings) == 0:
+            return []
+        return await self.search_by_vector(collection_name, embeddings[0], limit, score_threshold, timeout, exact, query_text if hybrid else None, filters, diversity, precision, latency_target)
+
+    async def search_by_vector(self, collection_name: str, query_vector: List[float], limit: int = 10, score_threshold=0.7, timeout: Optional[float] = None, exact: bool = False, query_text: Optional[str] = None, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[Any]:
+        """
+        Searches the Qdrant collection using a pre-computed embedding vector.
+
+        :param collection_name: The collection to search in
+        :param query_vector: The embedding vector to search with
+        :param limit: The number of nearest neighbors to return
+        :param timeout: Timeout in seconds of the search call, defaults to the client timeout
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param query_text: Text of the query, given for a hybrid search with BM25 keyword matches
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
+        :return: A list of results with the nearest neighbors
+        """
+        query_texts = None if query_text is None else [query_text]
+        results = await self.search_many_by_vector(collection_name, [query_vector], limit, score_threshold, timeout, exact, query_texts, filters, diversity, precision, latency_target)
+        return results[0]
+
+    async def search_many(self, collection_name: str, queries: List[str], limit: int = 10, score_threshold=0.7, timeout: Optional[float] = None, exact: bool = False, hybrid: bool = False, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[List[Any]]:
+        """
+        Searches the Qdrant collection for several query strings with one embedding request and one batch search call.
+
+        :param collection_name: The collection to search in
+        :param queries: The query strings to search for
+        :param limit: The number of nearest neighbors to return per query
+        :param timeout: Timeout in seconds of the search call, defaults to the client timeout
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param hybrid: Fuse the dense results with BM25 keyword matches (collections created with `sparse=True`)
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
+        :return: One list of results per query, in the same order as the queries
+        """
+        if not queries:
+            return []
+        collection_name = await self.resolve_collection(collection_name)
+        embeddings = await self.query_embedder_for(collection_name).embedder.embed(queries)
+        return await self.search_many_by_vector(collection_name, embeddings, limit, score_threshold, timeout, exact, queries if hybrid else None, filters, diversity, precision, latency_target)
+
+    async def search_many_by_vector(self, collection_name: str, query_vectors: List[List[float]], limit: int = 10, score_threshold=0.7, timeout: Optional[float] = None, exact: bool = False, query_texts: Optional[List[str]] = None, filters: Optional[SearchFilter] = None, diversity: float = 0.0, precision: Optional[Precision] = None, latency_target: Optional[float] = None) -> List[List[Any]]:
+        """
+        Searches the Qdrant collection with several pre-computed embedding vectors in a single batch search call.
+
+        :param collection_name: The collection to search in
+        :param query_vectors: The embedding vectors to search with
+        :param limit: The number of nearest neighbors to return per vector
+        :param timeout: Timeout in seconds of the search call, defaults to the client timeout
+        :param exact: Skip the index (and quantization) for an exact full-dimension search
+        :param query_texts: Texts of the queries, given for a hybrid search: the dense and BM25 results are
+                            fused with reciprocal rank fusion, and `score_threshold` only filters the dense ones
+        :param filters: Only return points whose payload matches, e.g. {"source": "a.pdf", "timestamp": {"gte": since}}
+        :param diversity: Between 0 and 1, trade relevance for diversity by re-ranking a larger candidate set with
+                          maximal marginal relevance, which drops near-duplicate chunks (0 disables it)
+        :param precision: Search effort: "fast", "balanced", "accurate", "exact", or a `SearchPrecision` with the
+                          HNSW `ef` and the oversampling of quantized collections (collection defaults if None)
+        :param latency_target: Seconds the search should take: the precision level is picked, and adapted as
+                               latencies are measured, to meet it. Excludes `precision` and `exact`
+        :return: One list of results per vector, in the same order as the vectors
+        """
+        if len(query_vectors) == 0:
+            return []
+        collection_name = await self.resolve_collection(collection_name)
+        layout = await self._collection_layout(collection_name)
+        _check_hybrid(collection_name, layout, query_texts)
+        check_diversity(diversity)
+        query_filter = to_qdrant_filter(filters)
+        with self.adaptive_precision.choose(collection_name, precision, exact, latency_target) as search_precision:
+            batch_results = await self._call(self.client.query_batch_points(
+                collection_name=collection_name,
+                requests=[
+                    _query_request(query_vector, candidate_count(limit, diversity), score_threshold, layout, search_precision, query_texts[i] if query_texts else None, query_filter, bool(diversity))
+                    for i, query_vector in enumerate(query_vectors)
+                ]
+            ), timeout)
+        if diversity:
+            results = [_diverse_results(response.points, query_vector, limit, diversity) for response, query_vector in zip(batch_results, query_vectors)]
+        else:
+            results = [_format_results(response.points) for response in batch_results]
+        # The store is SQLite: its reads block, so they run in a worker thread
+        return await asyncio.to_thread(_hydrate_texts, self.payload_store, collection_name, results)
+
+    async def _begin_bulk_load(self, collection_name: str) -> None:
+        # With an indexing threshold of 0 Qdrant only appends to segments, the HNSW graph is built once afterwards
+        info = await self._call(self.client.get_collection(collection_name))
+        self._indexing_thresholds[collection_name] = info.config.optimizer_config.indexing_threshold
+        await self._call(self.client.update_collection(
+            collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+        ))
+        print(f"Bulk load of collection '{collection_name}' started, indexing deferred.")
+
+    async def _end_bulk_load(self, collection_name: str) -> None:
+        threshold = self._indexing_thresholds.pop(collection_name, None)
+        if threshold is None:
+            threshold = QDRANT_INDEXING_THRESHOLD
+        await self._call(self.client.update_collection(
+            collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+        ))
+        print(f"Bulk load of collection '{collection_name}' finished, Qdrant is building its index.")
+
+    async def _collection_config(self, collection_name: str) -> Dict[str, Any]:
+        return _snapshot_config(await self._call(self.client.get_collection(collection_name)))
+
+    async def _scroll_points(self, collection_name: str, batch_size: int) -> AsyncIterator[Tuple[List[Any], np.ndarray, List[Dict[str, Any]]]]:
+        offset = None
+        while True:
+            records, offset = await self._call(self.client.scroll(
+                collection_name, limit=batch_size, offset=offset, with_payload=True, with_vectors=True
+            ))
+            if records:
+                # The store is SQLite, read in a worker thread like the scroll itself
+                yield await asyncio.to_thread(_stored_texts, self.payload_store, collection_name, *_records_batch(records))
+            if offset is None:
+                return
+
+    async def _load_aliases(self) -> Dict[str, str]:
+        response = await self._call(self.client.get_aliases())
+        return {alias.alias_name: alias.collection_name for alias in response.aliases}
+
+    async def _set_alias(self, alias: str, collection_name: str) -> None:
+        await self._call(self.client.update_collection_aliases(
+            change_aliases_operations=_alias_operations(alias, collection_name, alias in self._aliases)
+        ))
+
+    async def _collection_layout(self, collection_name: str) -> CollectionLayout:
+        if collection_name not in self._layouts:
+            info = await self._call(self.client.get_collection(collection_name))
+            self._layouts[collection_name] = CollectionLayout.from_params(info.config.params)
+        return self._layouts[collection_name]
+
+    async def _call(self, call: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Awaits a client call, cancelling it if it takes longer than `timeout` (or the client default).
+        """
+        return await asyncio.wait_for(call, timeout if timeout is not None else self.timeout)
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+from config import REEMBED_BATCH_SIZE, REEMBED_MAX_TEXTS_PER_SECOND, REEMBED_CHECKPOINT_DIR, INGEST_REPORT_SECONDS
+from vector.embedder import BatchEmbedder
+from vector.embedding_cache import CachedEmbeddingService
+from vector.embedding_providers import resolve_provider
+from vector.pipeline import IngestProgress
+from vector.snapshot import _create_options, _call
+
+if TYPE_CHECKING:
+    from vector.vector_base import VectorDatabaseBase, PointBatch
+
+# Re-embedding a collection without taking search down:
+#   1. the points of the collection the alias points to are scrolled in order, their texts embedded
+#      with the new model at a throttled rate and written, with their ids and payloads, to a new
+#      (shadow) collection; searches keep going to the old one meanwhile
+#   2. the number of points done is checkpointed after every write, so a stopped job resumes there
+#   3. once every point is copied, the alias is swapped to the new collection in one atomic step
+# Points written to the old collection while the job runs are not carried over: pause ingestion,
+# or re-ingest the changed sources once the alias is swapped.
+
+
+@dataclass
+class ReembedProgress(IngestProgress):
+    # Points done by an earlier run of the job, not embedded again
+    resumed: int = 0
+    # Points without a text to embed, left out of the new collection
+    skipped: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.resumed + self.upserted} points done ({self.resumed} in earlier runs), "
+            f"{self.skipped} without text; " + super().__str__()
+        )
+
+
+class _Throttle:
+    """
+    Spaces out embedding requests so no more than `rate` texts per second are sent on average,
+    leaving the rest of the provider's rate limit to the searches and ingests running meanwhile.
+    """
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self._next = time.monotonic()
+
+    async def wait(self, count: int) -> None:
+        if not self.rate:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(self._next, now) + count / self.rate
+
+
+class ReembedJob:
+    """
+    Rebuilds the collection behind an alias with another embedding model or size, then swaps the
+    alias to the rebuilt collection. See the notes at the top of this module.
+    """
+
+    def __init__(
+        self,
+        database: "VectorDatabaseBase",
+        alias: str,
+        target_collection: str,
+        embedding_service: Any,
+        source_collection: Optional[str] = None,
+        batch_size: int = REEMBED_BATCH_SIZE,
+        max_texts_per_second: Optional[float] = REEMBED_MAX_TEXTS_PER_SECOND,
+        collection_options: Optional[Dict[str, Any]] = None,
+        checkpoint_path: Optional[str] = None,
+        report_interval: float = INGEST_REPORT_SECONDS,
+        on_progress: Optional[Callable[[ReembedProgress], None]] = None,
+    ):
+        """
+        :param database: The vector database holding the collections
+        :param alias: Alias searched through, swapped to `target_collection` at the end
+        :param target_collection: Name of the collection to create with the new embeddings
+        :param embedding_service: Provider of the new embeddings, also used for the queries of the new collection
+        :param source_collection: Collection to re-embed, defaults to the one the alias points to; required
+                                  the first time, when the alias doesn't exist yet
+        :param batch_size: Number of points read, embedded and written at a time
+        :param max_texts_per_second: Maximum embedding throughput of the job, None for no limit
+        :param collection_options: `create_collection` options of the new collection, defaults to the
+                                   source collection's (distance, quantization, sparse, payload indexes...)
+        :param checkpoint_path: JSON file the progress is saved to, defaults to one per alias in REEMBED_CHECKPOINT_DIR
+        :param report_interval: Seconds between progress reports, 0 to disable
+        :param on_progress: Called with the progress on every report, defaults to printing it
+        """
+        self.database = database
+        self.alias = alias
+        self.target_collection = target_collection
+        self.embedding_service = resolve_provider(database.kernel, embedding_service)
+        provider = self.embedding_service
+        if database.embedding_cache is not None:
+            provider = CachedEmbeddingService(provider, database.embedding_cache, getattr(provider, "dimensions", None))
+        self.embedder = BatchEmbedder(provider)
+        self.source_collection = source_collection
+        self.batch_size = batch_size
+        self.throttle = _Throttle(max_texts_per_second)
+        self.collection_options = collection_options or {}
+        self.checkpoint_path = checkpoint_path or os.path.join(REEMBED_CHECKPOINT_DIR, f"{alias}.json")
+        self.report_interval = report_interval
+        self.on_progress = on_progress or (lambda progress: print(f"Re-embed '{self.alias}' into '{self.target_collection}': {progress}"))
+
+    async def run(self) -> ReembedProgress:
+        """
+        Copies every point of the source collection into the new one with new embeddings, resuming
+        from the checkpoint if there is one, and swaps the alias once done.
+        """
+        # Imported here: vector_base imports this module
+        from vector.vector_base import PointBatch
+
+        current = await self.database.resolve_collection(self.alias)
+        if current == self.target_collection:
+            print(f"Alias '{self.alias}' already points to collection '{self.target_collection}'.")
+            return ReembedProgress()
+        if self.source_collection is None and current == self.alias:
+            raise ValueError(f"'{self.alias}' is not an alias yet: pass the collection it should replace as source_collection.")
+        source = self.source_collection or current
+        done = self._read_checkpoint(source)
+        progress = ReembedProgress(resumed=done)
+        if done:
+            print(f"Resuming the re-embedding of '{source}' into '{self.target_collection}' after {done} points.")
+        reporter = asyncio.create_task(self._report(progress)) if self.report_interval > 0 else None
+        # Vector size of the new collection, known once it is created
+        target_size: Optional[int] = None
+        position = 0
+        write: Optional[asyncio.Task] = None
+        try:
+            async for ids, _, payloads in self.database._scroll_points(source, self.batch_size):
+                # Points before the checkpoint were written by an earlier run
+                start = max(0, done - position)
+                position += len(ids)
+                progress.chunks += len(ids)
+                if start >= len(ids):
+                    continue
+                ids, payloads = ids[start:], payloads[start:]
+                kept = [i for i, payload in enumerate(payloads) if payload.get("text")]
+                progress.skipped += len(ids) - len(kept)
+                texts = [payloads[i]["text"] for i in kept]
+                await self.throttle.wait(len(texts))
+                embeddings = await self.embedder.embed(texts) if texts else None
+                progress.embedded += len(texts)
+                if embeddings is not None:
+                    if target_size is None:
+                        target_size = await self._create_target(source, embeddings.shape[1])
+                    self._check_size(embeddings.shape[1], target_size)
+                # One write in flight: the next batch is embedded while the previous one is written
+                if write is not None:
+                    await write
+                batch = None
+                if kept:
+                    fields = {field: None for i in kept for field in payloads[i]}
+                    batch = PointBatch(
+                        ids=[ids[i] for i in kept],
+                        vectors=embeddings,
+                        payloads={field: [payloads[i].get(field) for i in kept] for field in fields},
+                    )
+                write = asyncio.create_task(self._write(batch, source, position, progress))
+            if write is not None:
+                await write
+        except BaseException:
+            if write is not None:
+                write.cancel()
+                await asyncio.gather(write, return_exceptions=True)
+            raise
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        # The queries sent through the alias are embedded by the same provider: they must fit the new collection too
+        probe = await self.embedder.embed([self.alias])
+        if target_size is None:
+            target_size = await self._create_target(source, probe.shape[1])
+        self._check_size(probe.shape[1], target_size)
+        # The new collection's chunks and queries are embedded with its model before the alias sends them there
+        self.database.set_embedding_service(self.target_collection, self.embedding_service)
+        previous = await self.database.swap_alias(self.alias, self.target_collection)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.on_progress(progress)
+        if previous is not None:
+            print(f"Collection '{previous}' is no longer searched through '{self.alias}' and can be dropped.")
+        return progress
+
+    async def _create_target(self, source: str, vector_size: int) -> int:
+        """
+        Creates the new collection unless an earlier run did, and returns the size of its vectors.
+        """
+        options = {**_create_options(self.database, await self.database._collection_config(source)), "vector_size": vector_size}
+        # Truncated index vectors only make sense if they are shorter than the new embeddings
+        if options.get("index_dimensions") is not None and options["index_dimensions"] >= vector_size:
+            del options["index_dimensions"]
+        options.update(self.collection_options)
+        await _call(self.database.create_collection, self.target_collection, **options)
+        return (await self.database._collection_config(self.target_collection))["vector_size"]
+
+    def _check_size(self, size: int, target_size: int) -> None:
+        if size != target_size:
+            raise ValueError(
+                f"Invalid embeddings: the new provider returns vectors of size {size}, "
+                f"collection '{self.target_collection}' holds vectors of size {target_size}."
+            )
+
+    async def _write(self, batch: Optional["PointBatch"], source: str, position: int, progress: ReembedProgress) -> None:
+        if batch is not None:
+            await self.database._write_points(self.target_collection, batch)
+            progress.upserted += len(batch)
+            progress.batches += 1
+        self._save_checkpoint(source, position)
+
+    def _read_checkpoint(self, source: str) -> int:
+        if not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint != {**checkpoint, **self._job(source)}:
+            print(f"Checkpoint '{self.checkpoint_path}' belongs to another re-embedding job, starting over.")
+            return 0
+        return checkpoint["done"]
+
+    def _save_checkpoint(self, source: str, done: int) -> None:
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        # Written aside and renamed, so a job stopped mid-write keeps the previous checkpoint
+        temporary = self.checkpoint_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({**self._job(source), "done": done}, f)
+        os.replace(temporary, self.checkpoint_path)
+
+    def _job(self, source: str) -> Dict[str, Any]:
+        return {
+            "alias": self.alias,
+            "source": source,
+            "target": self.target_collection,
+            "model": getattr(self.embedding_service, "model_id", ""),
+            "dimensions": getattr(self.embedding_service, "dimensions", None),
+        }
+
+    async def _report(self, progress: ReembedProgress) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.on_progress(progress)
@@ -0,0 +1,174 @@
+import asyncio
+import inspect
+import json
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, IO, List, Optional
+import numpy as np
+from config import SNAPSHOT_BATCH_SIZE, INGEST_UPSERT_CONCURRENCY
+
+# A snapshot is a directory holding:
+#   snapshot.json          format version, point count, vector size and the collection's configuration
+#   vectors.f32            the full-dimension vectors, one contiguous little-endian float32 row per point
+#   ids.jsonl              one point id per line, in the order of the vector rows
+#   payload/<field>.jsonl  one column per payload field: its JSON value for every point, null if missing
+# snapshot.json is written last, so a directory without it is an interrupted export.
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_FILE = "snapshot.json"
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.jsonl"
+PAYLOAD_DIR = "payload"
+
+
+class _ColumnWriter:
+    """
+    Writes payloads column by column. A field seen for the first time after `count` points gets
+    `count` nulls first, so every column has one line per point.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.columns: Dict[str, IO[str]] = {}
+
+    def write(self, payloads: List[Dict[str, Any]]) -> None:
+        for field in {field for payload in payloads for field in payload} - set(self.columns):
+            column = open(os.path.join(self.path, f"{field}.jsonl"), "w", encoding="utf-8")
+            column.write("null\n" * self.count)
+            self.columns[field] = column
+        for field, column in self.columns.items():
+            column.write("".join(json.dumps(payload.get(field), ensure_ascii=False) + "\n" for payload in payloads))
+        self.count += len(payloads)
+
+    def close(self) -> None:
+        for column in self.columns.values():
+            column.close()
+
+
+async def export_snapshot(database: Any, collection_name: str, path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> int:
+    """
+    Streams every point of a collection to a snapshot directory, `batch_size` points at a time.
+    Writes to the collection while it is exported may or may not be included.
+
+    :return: The number of points exported
+    """
+    if os.path.exists(os.path.join(path, SNAPSHOT_FILE)):
+        raise FileExistsError(f"A snapshot already exists in '{path}'.")
+    config = await database._collection_config(collection_name)
+    os.makedirs(os.path.join(path, PAYLOAD_DIR), exist_ok=True)
+    columns = _ColumnWriter(os.path.join(path, PAYLOAD_DIR))
+    count = 0
+    try:
+        with open(os.path.join(path, VECTORS_FILE), "wb") as vectors_file, open(os.path.join(path, IDS_FILE), "w", encoding="utf-8") as ids_file:
+            async for ids, vectors, payloads in database._scroll_points(collection_name, batch_size):
+                np.ascontiguousarray(vectors, dtype="<f4").tofile(vectors_file)
+                ids_file.write("".join(json.dumps(id) + "\n" for id in ids))
+                columns.write(payloads)
+                count += len(ids)
+    finally:
+        columns.close()
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "collection": collection_name,
+        "count": count,
+        "vector_size": config["vector_size"],
+        "config": config,
+        "fields": sorted(columns.columns),
+        "created": datetime.now().isoformat(),
+    }
+    with open(os.path.join(path, SNAPSHOT_FILE), "w") as f:
+        json.dump(snapshot, f, indent=2)
+    print(f"Exported {count} points of collection '{collection_name}' to '{path}'.")
+    return count
+
+
+async def import_snapshot(
+    database: Any,
+    path: str,
+    collection_name: Optional[str] = None,
+    batch_size: int = SNAPSHOT_BATCH_SIZE,
+    concurrency: int = INGEST_UPSERT_CONCURRENCY,
+) -> int:
+    """
+    Creates a collection from a snapshot and bulk-loads its points in parallel batches of `batch_size`.
+    Vectors are read from the memory-mapped snapshot, so nothing is embedded again. The manifest of
+    the sources found in the payloads is rebuilt, so incremental re-ingestion carries on from there.
+
+    :return: The number of points imported
+    """
+    # Imported here: vector_base imports this module
+    from vector.vector_base import PointBatch
+
+    snapshot = read_snapshot(path)
+    collection_name = collection_name or snapshot["collection"]
+    count, vector_size = snapshot["count"], snapshot["vector_size"]
+    await _call(database.create_collection, collection_name, **_create_options(database, snapshot["config"]))
+    if count == 0:
+        return 0
+    vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype="<f4", mode="r", shape=(count, vector_size))
+    columns = {field: open(os.path.join(path, PAYLOAD_DIR, f"{field}.jsonl"), encoding="utf-8") for field in snapshot["fields"]}
+    sources: Dict[str, List[str]] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: List[asyncio.Task] = []
+
+    async def write(batch: PointBatch) -> None:
+        try:
+            await database._write_points(collection_name, batch)
+        finally:
+            semaphore.release()
+
+    async with database.bulk_load(collection_name):
+        try:
+            with open(os.path.join(path, IDS_FILE), encoding="utf-8") as ids_file:
+                for start in range(0, count, batch_size):
+                    ids = [json.loads(line) for line in islice(ids_file, batch_size)]
+                    # The payload columns of the snapshot are the columns of the batch
+                    payloads = {field: [json.loads(line) for line in islice(column, len(ids))] for field, column in columns.items()}
+                    for id, source_id in zip(ids, payloads.get("source", ())):
+                        if source_id is not None:
+                            sources.setdefault(source_id, []).append(str(id))
+                    batch = PointBatch(ids=ids, vectors=np.array(vectors[start:start + len(ids)]), payloads=payloads)
+                    await semaphore.acquire()
+                    # A failed write stops the import before more batches are queued
+                    for task in tasks:
+                        if task.done() and task.exception() is not None:
+                            raise task.exception()
+                    tasks.append(asyncio.create_task(write(batch)))
+            await asyncio.gather(*tasks)
+        finally:
+            for column in columns.values():
+                column.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    for source_id, point_ids in sources.items():
+        database.manifest.replace(collection_name, source_id, point_ids)
+    print(f"Imported {count} points from '{path}' into collection '{collection_name}'.")
+    return count
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Reads the description of a snapshot: its point count, vector size, collection configuration and payload fields.
+    """
+    snapshot_file = os.path.join(path, SNAPSHOT_FILE)
+    if not os.path.exists(snapshot_file):
+        raise FileNotFoundError(f"No snapshot in '{path}' (missing {SNAPSHOT_FILE}, the export may have been interrupted).")
+    with open(snapshot_file) as f:
+        snapshot = json.load(f)
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Invalid snapshot format: {snapshot.get('format')}. Valid options are: {SNAPSHOT_FORMAT}")
+    return snapshot
+
+
+def _create_options(database: Any, config: Dict[str, Any]) -> Dict[str, Any]:
+    # Backends share most collection options; the ones the target backend doesn't know (e.g. IVF's nlist) are dropped
+    parameters = inspect.signature(database.create_collection).parameters
+    return {key: value for key, value in config.items() if key in parameters and value is not None}
+
+
+async def _call(function: Any, *args: Any, **kwargs: Any) -> Any:
+    if inspect.iscoroutinefunction(function):
+        return await function(*args, **kwargs)
+    return await asyncio.to_thread(function, *args, **kwargs)
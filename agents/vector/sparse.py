@@ -0,0 +1,62 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from config import BM25_K1, BM25_B, BM25_AVG_LENGTH, RRF_K
+
+# Words, numbers and snake_case identifiers. Hyphens and dots split identifiers into their parts,
+# which are indexed on their own so "survey-2024" matches both "survey" and "2024".
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def token_index(token: str) -> int:
+    """
+    Stable 32-bit index of a token in the sparse vectors. Python's `hash` is salted per process,
+    so a digest is used instead.
+    """
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little")
+
+
+def bm25_document(text: str, k1: float = BM25_K1, b: float = BM25_B, avg_length: float = BM25_AVG_LENGTH) -> Tuple[List[int], List[float]]:
+    """
+    Sparse BM25 term weights of a document: the saturated, length-normalized term frequencies.
+    The IDF part of the score depends on the whole collection and is applied by the index.
+
+    :return: The token indices and their weights
+    """
+    tokens = tokenize(text)
+    length_norm = k1 * (1 - b + b * len(tokens) / avg_length)
+    weights: Dict[int, float] = {}
+    for token, tf in Counter(tokens).items():
+        index = token_index(token)
+        # Hash collisions are rare enough to be merged
+        weights[index] = weights.get(index, 0.0) + tf * (k1 + 1) / (tf + length_norm)
+    return list(weights), list(weights.values())
+
+
+def bm25_query(text: str) -> Tuple[List[int], List[float]]:
+    """
+    Sparse vector of a query: every distinct token with weight 1, so the score is the sum of the
+    document weights (times IDF) of the query tokens.
+    """
+    indices = sorted({token_index(token) for token in tokenize(text)})
+    return indices, [1.0] * len(indices)
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], limit: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Fuses ranked result lists: every result scores the sum of 1 / (k + rank) over the lists it
+    appears in. The fused score replaces the original one.
+    """
+    scores: Dict[Any, float] = {}
+    results: Dict[Any, Dict[str, Any]] = {}
+    for result_list in result_lists:
+        for rank, result in enumerate(result_list, start=1):
+            scores[result["id"]] = scores.get(result["id"], 0.0) + 1 / (k + rank)
+            results.setdefault(result["id"], result)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [{**results[id], "score": scores[id]} for id in ranked]
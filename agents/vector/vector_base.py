@@ -1,12 +1,24 @@
+import asyncio
+import inspect
 from abc import ABC, abstractmethod
-from typing import List, Any, Union
+from contextlib import asynccontextmanager
+from typing import List, Any, Union, AsyncIterator, Optional, Dict, Tuple
 from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import AzureTextEmbedding
-from config import BATCH_SIZE
+from config import BATCH_SIZE, CHUNK_OVERLAP, UPSERT_BATCH_SIZE, SNAPSHOT_BATCH_SIZE, INGEST_UPSERT_CONCURRENCY, FEDERATED_SEARCH_TIMEOUT
+from vector.chunking import TextSource, iter_chunks
+from vector.embedder import BatchEmbedder, CoalescingEmbedder
+from vector.embedding_cache import EmbeddingCache, CachedEmbeddingService
+from vector.embedding_providers import EmbeddingProvider, resolve_provider, embedding_model, provider_for_model
+from vector.pipeline import IngestPipeline, IngestProgress
+from vector.manifest import SourceManifest, SourceChanges, point_id
+from vector.snapshot import export_snapshot, import_snapshot
+from vector.federation import normalize_scores, merge_top_k
+from vector.precision import AdaptivePrecision
+from vector.reembed import ReembedJob, ReembedProgress
 from dataclasses import dataclass
+import numpy as np
 from numpy import ndarray
 from datetime import datetime
-from uuid import uuid4
 
 @dataclass
 class VectorEmbeddingsData:
@@ -17,69 +29,578 @@ class VectorEmbeddingsData:
 class PointPayload:
     timestamp:datetime
     text:str
+    source:Optional[str]=None
+    tags:Optional[List[str]]=None
+    # Any other payload fields, kept as they are (e.g. when restoring a snapshot)
+    extra:Optional[Dict[str, Any]]=None
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = dict(self.extra or {})
+        payload["timestamp"] = self.timestamp.isoformat()
+        payload["text"] = self.text
+        if self.source is not None:
+            payload["source"] = self.source
+        if self.tags:
+            payload["tags"] = list(self.tags)
+        return payload
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "PointPayload":
+        payload = dict(payload)
+        timestamp = payload.pop("timestamp", None)
+        return cls(
+            timestamp=datetime.fromisoformat(timestamp) if timestamp else datetime.now(),
+            text=payload.pop("text", ""),
+            source=payload.pop("source", None),
+            tags=payload.pop("tags", None),
+            extra=payload or None
+        )
     
 @dataclass
 class PointData:
-    id:uuid4
+    id:str
     embeddings:ndarray
     payload:PointPayload
+
+@dataclass
+class PointBatch:
+    """
+    Points stored as columns: their ids, one float32 matrix with a row per point and one list of
+    values per payload field (None where a point lacks the field). Ingestion builds these straight
+    from the embedding matrices and backends write them whole, without per-point objects.
+    """
+    ids:List[Any]
+    vectors:ndarray
+    payloads:Dict[str, List[Any]]
+
+    def __post_init__(self):
+        vectors = np.asarray(self.vectors, dtype=np.float32)
+        # An empty batch keeps the width of its (0, n) matrix, which reshape(0, -1) can't infer
+        self.vectors = vectors.reshape(len(self.ids), -1) if len(self.ids) else vectors.reshape(0, vectors.shape[-1] if vectors.ndim > 1 else 0)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def texts(self) -> List[str]:
+        return self.payloads.get("text") or [""] * len(self)
+
+    def payload_dicts(self, exclude: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """
+        The payload of every point as a dict, for backends that store payloads per point.
+
+        :param exclude: Fields left out of the dicts
+        """
+        columns = [(field, values) for field, values in self.payloads.items() if field not in exclude]
+        return [{field: values[i] for field, values in columns if values[i] is not None} for i in range(len(self))]
+
+    @classmethod
+    def concatenate(cls, batches: List["PointBatch"]) -> "PointBatch":
+        """
+        Joins batches into one, e.g. the points of several sources written in a single upsert.
+        """
+        fields = {field: None for batch in batches for field in batch.payloads}
+        return cls(
+            ids=[id for batch in batches for id in batch.ids],
+            vectors=np.concatenate([batch.vectors for batch in batches], axis=0),
+            payloads={field: [value for batch in batches for value in batch.payloads.get(field) or [None] * len(batch)] for field in fields}
+        )
+
+    @classmethod
+    def from_points(cls, points: List[PointData]) -> "PointBatch":
+        payloads = [point.payload.to_dict() for point in points]
+        fields = {field for payload in payloads for field in payload}
+        return cls(
+            ids=[point.id for point in points],
+            vectors=np.stack([np.asarray(point.embeddings, dtype=np.float32).ravel() for point in points]) if points else np.empty((0, 0), dtype=np.float32),
+            payloads={field: [payload.get(field) for payload in payloads] for field in fields}
+        )
     
+def format_result(id: Any, score: float, payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Formats a search hit the way every backend returns it.
+    """
+    payload = payload or {}
+    return {
+        'id': id,
+        'score': score,
+        'text': payload.get('text', ''),
+        'metadata': {k: v for k, v in payload.items() if k != 'text'}
+    }
+
+def _model_key(model: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+    return model["model_id"], model["dimensions"]
+
 class VectorDatabaseBase(ABC):
     """
     A base class for interacting with vector databases in Semantic Kernel.
     """
 
-    def __init__(self, kernel: Kernel):
+    def __init__(
+        self,
+        kernel: Kernel,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        manifest: Optional[SourceManifest] = None,
+        embedding_service: Optional[Any] = None
+    ):
+        """
+        :param kernel: The Semantic Kernel instance
+        :param embedding_cache: Optional cache consulted before calling the embedding service
+        :param manifest: Manifest of the chunks ingested per source, opened on first use if not given
+        :param embedding_service: Provider used instead of the kernel's "azure_embeddings" service: an
+                                  `EmbeddingProvider` (Azure, local model, hashing...), a Semantic Kernel
+                                  embedding service or any object with an async `generate_embeddings(texts)`
+        """
         self.kernel = kernel
-        self.embedding_service: AzureTextEmbedding = self.kernel.get_service("azure_embeddings")
-        if not isinstance(self.embedding_service, AzureTextEmbedding):
-            raise ValueError("Invalid embedding service. Expected AzureTextEmbedding.")
+        self.embedding_service: EmbeddingProvider = resolve_provider(kernel, embedding_service)
+        self.embedding_cache = embedding_cache
+        if embedding_cache is not None:
+            self.embedding_service = CachedEmbeddingService(self.embedding_service, embedding_cache, getattr(self.embedding_service, "dimensions", None))
+        self.embedder = BatchEmbedder(self.embedding_service)
+        # Search queries embedded at the same time share requests
+        self.query_embedder = CoalescingEmbedder(self.embedder)
+        # Precision levels of the searches made with a latency target, per collection
+        self.adaptive_precision = AdaptivePrecision()
+        self._manifest = manifest
+        # Collection each alias points to, read from the backend on first use
+        self._aliases: Optional[Dict[str, str]] = None
+        # Query embedders per collection, resolved from the model recorded with the collection
+        self._collection_embedders: Dict[str, CoalescingEmbedder] = {}
+        # Query embedders of the providers registered for other models than the database's, per model
+        self._model_embedders: Dict[Tuple[str, Optional[int]], CoalescingEmbedder] = {}
         # print(self.embedding_service)
 
+    @property
+    def manifest(self) -> SourceManifest:
+        if self._manifest is None:
+            self._manifest = SourceManifest()
+        return self._manifest
+
     @abstractmethod
     def create_collection(self, collection_name: str, vector_size: int, distance_function: str) -> None:
         pass
 
     @abstractmethod
-    def _upsert_points(self, collection_name: str, points: List[PointData]) -> None:
+    def _upsert_points(self, collection_name: str, batch: PointBatch) -> None:
         """
-        Concrete classes must implement this method to handle a list of point dicts.
+        Concrete classes must implement this method to write a batch of points.
         """
         pass
 
-    async def upsert(self, collection_name: str, data: str, batch_size: int = BATCH_SIZE) -> None:
+    @abstractmethod
+    def _delete_points(self, collection_name: str, point_ids: List[str]) -> None:
         """
-        Upserts data into the vector database. Accepts a raw text string or a list of point dicts.
+        Concrete classes must implement this method to delete points by id.
+        """
+        pass
+
+    async def upsert(
+        self,
+        collection_name: str,
+        data: TextSource,
+        batch_size: int = BATCH_SIZE,
+        overlap: int = CHUNK_OVERLAP,
+        upsert_batch_size: int = UPSERT_BATCH_SIZE,
+        pipelined: bool = False,
+        source_id: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Upserts data into the vector database. The data is chunked and embedded lazily and
+        written in batches of `upsert_batch_size` points, so memory stays bounded for large inputs.
+        With a `source_id`, point ids are derived from the source and chunk content, so re-ingesting
+        unchanged data overwrites points instead of duplicating them; without one every chunk is a new point.
+        
+        When a `source_id` is given, only chunks that are new since the last ingest of that source
+        are embedded and upserted, and chunks that disappeared from it are deleted.
         
         :param collection_name: Name of the collection to upsert into.
-        :param data: Either a raw string to embed or a list of points with precomputed embeddings.
-        """
-        embedded_batches = await self.generate_embeddings(data,batch_size)
-        point_data:List[PointData]=[]
-        for i,batch in enumerate(embedded_batches):
-            time_stamp=datetime.now()
-            point_data.append(
-                PointData(
-                    id=uuid4(),
-                    embeddings=batch.embeddings,
-                    payload=PointPayload(
-                    timestamp=time_stamp,
-                    text=batch.text
-                )    
-            ))
-        self._upsert_points(collection_name, point_data)
+        :param data: A raw string, a file-like object or an iterable of strings to embed.
+        :param batch_size: Maximum number of characters per chunk.
+        :param overlap: Number of characters shared between consecutive chunks.
+        :param upsert_batch_size: Number of points sent to the database per upsert call.
+        :param pipelined: Run chunking, embedding and upserting concurrently with bounded queues
+                          and progress reporting, see `ingest`.
+        :param source_id: Identifier of the document the data comes from (e.g. a file path).
+        :param tags: Tags stored in the payload of every point, for filtered searches.
+        """
+        if pipelined:
+            await self.ingest(collection_name, data, batch_size, overlap, upsert_batch_size, source_id=source_id, tags=tags)
+            return
+        changes = self.manifest.changes(collection_name, source_id) if source_id is not None else None
+        chunks = iter_chunks(data, batch_size, overlap)
+        if changes is not None:
+            chunks = changes.filter(chunks)
+        embedder = self.embedder_for(await self.resolve_collection(collection_name))
+        async for texts, embeddings in embedder.embed_batches(chunks, upsert_batch_size):
+            await self._write_points(collection_name, self._make_batch(texts, embeddings, source_id, tags))
+        if changes is not None:
+            await self._commit_changes(collection_name, changes)
+
+    async def delete_source(self, collection_name: str, source_id: str) -> None:
+        """
+        Deletes every point ingested from a source.
+        
+        :param collection_name: Name of the collection the source was ingested into.
+        :param source_id: Identifier the source was ingested with.
+        """
+        changes = self.manifest.changes(collection_name, source_id)
+        await self._commit_changes(collection_name, changes)
+
+    async def ingest(
+        self,
+        collection_name: str,
+        data: TextSource,
+        batch_size: int = BATCH_SIZE,
+        overlap: int = CHUNK_OVERLAP,
+        upsert_batch_size: int = UPSERT_BATCH_SIZE,
+        bulk_load: bool = False,
+        **pipeline_options: Any,
+    ) -> IngestProgress:
+        """
+        Ingests data through a chunk -> embed -> upsert pipeline. Upsert batches are written in
+        parallel while later chunks are still being embedded, and progress is reported as it runs.
         
-            
-            
+        :param collection_name: Name of the collection to upsert into.
+        :param data: A raw string, a file-like object or an iterable of strings to embed.
+        :param batch_size: Maximum number of characters per chunk.
+        :param overlap: Number of characters shared between consecutive chunks.
+        :param upsert_batch_size: Number of points sent to the database per upsert call.
+        :param bulk_load: Defer index building until the ingest is done, see `bulk_load`.
+        :param pipeline_options: Extra options for `IngestPipeline` (source_id, tags, queue_size, upsert_concurrency, ...).
+        :return: The final progress counters.
+        """
+        pipeline = IngestPipeline(self, collection_name, batch_size, overlap, upsert_batch_size, **pipeline_options)
+        if not bulk_load:
+            return await pipeline.run(data)
+        async with self.bulk_load(collection_name):
+            return await pipeline.run(data)
+
+    def _make_batch(self, texts: List[str], embeddings: ndarray, source_id: Optional[str] = None, tags: Optional[List[str]] = None) -> PointBatch:
+        count = len(texts)
+        payloads: Dict[str, List[Any]] = {
+            "timestamp": [datetime.now().isoformat()] * count,
+            "text": list(texts),
+        }
+        if source_id is not None:
+            payloads["source"] = [source_id] * count
+        if tags:
+            payloads["tags"] = [list(tags)] * count
+        return PointBatch(
+            ids=[point_id(source_id, text) for text in texts],
+            vectors=embeddings,
+            payloads=payloads
+        )
+
+    async def _commit_changes(self, collection_name: str, changes: SourceChanges) -> None:
+        """
+        Deletes the points that disappeared from a source and records its current chunks in the manifest.
+        Must only be called once every new chunk of the source has been upserted.
+        """
+        removed = changes.removed
+        if removed:
+            target = await self.resolve_collection(collection_name)
+            if inspect.iscoroutinefunction(self._delete_points):
+                await self._delete_points(target, removed)
+            else:
+                await asyncio.to_thread(self._delete_points, target, removed)
+        self.manifest.replace(collection_name, changes.source_id, changes.current)
+        print(f"Source '{changes.source_id}' in '{collection_name}': {changes}.")
+
+    async def _write_points(self, collection_name: str, points: Union[PointBatch, List[PointData]]) -> None:
+        """
+        Upserts points without blocking the event loop, running synchronous backends in a worker thread.
+        """
+        batch = points if isinstance(points, PointBatch) else PointBatch.from_points(points)
+        if len(batch) == 0:
+            print("No points to upsert.")
+            return
+        collection_name = await self.resolve_collection(collection_name)
+        if inspect.iscoroutinefunction(self._upsert_points):
+            await self._upsert_points(collection_name, batch)
+        else:
+            await asyncio.to_thread(self._upsert_points, collection_name, batch)
 
     @abstractmethod
     def search(self, collection_name: str, query_vector: List[float], limit: int) -> List[Any]:
         pass
 
-    async def generate_embeddings(self, text: str, batch_size: int = BATCH_SIZE) -> List[VectorEmbeddingsData]:
-        text_batches = [text[i:i + batch_size] for i in range(0, len(text), batch_size)]
-        all_embeddings: List[VectorEmbeddingsData] = []
-        for batch in text_batches:
-            embeddings = await self.embedding_service.generate_embeddings(batch)  # returns List[np.ndarray]
-            all_embeddings.append(VectorEmbeddingsData(text=batch, embeddings=embeddings))
-        return all_embeddings
+    async def federated_search(
+        self,
+        collection_names: List[str],
+        query_text: str,
+        limit: int = 10,
+        hybrid: bool = False,
+        normalization: str = "minmax",
+        collection_timeout: Optional[float] = FEDERATED_SEARCH_TIMEOUT,
+        **search_options: Any,
+    ) -> List[Any]:
+        """
+        Searches several collections for a query string at once. The query is embedded once per
+        embedding model, every collection is searched concurrently for its top `limit`, and the results are merged into the
+        overall top `limit` after normalizing each collection's scores. Every result carries the
+        `collection` it comes from and its `raw_score`.
+
+        A collection that doesn't answer within `collection_timeout` seconds is left out of the results,
+        so one slow collection can't stall the search.
+
+        :param collection_names: The collections to search in
+        :param query_text: The query string to search for
+        :param limit: The number of results to return, across all collections
+        :param hybrid: Fuse the dense results with BM25 keyword matches in every collection
+        :param normalization: How each collection's scores are made comparable: "minmax", "zscore" or "none"
+        :param collection_timeout: Seconds to wait for each collection, None to wait for all of them
+        :param search_options: Options of `search_by_vector` applied to every collection (score_threshold, filters, diversity, ...)
+        :return: The merged results, best first
+        """
+        targets = [await self.resolve_collection(collection_name) for collection_name in collection_names]
+        embedders = [self.query_embedder_for(target) for target in targets]
+        query_vectors = {}
+        for embedder in set(embedders):
+            embeddings = await embedder.generate_embeddings([query_text])
+            if embeddings is None or len(embeddings) == 0:
+                return []
+            query_vectors[embedder] = embeddings[0]
+        if hybrid:
+            search_options["query_text"] = query_text
+        searches = [
+            asyncio.wait_for(self.search_by_vector(target, query_vectors[embedder], limit, **search_options), collection_timeout)
+            for target, embedder in zip(targets, embedders)
+        ]
+        result_lists = []
+        for collection_name, results in zip(collection_names, await asyncio.gather(*searches, return_exceptions=True)):
+            if isinstance(results, asyncio.TimeoutError):
+                print(f"Search of collection '{collection_name}' timed out after {collection_timeout}s, its results are left out.")
+                continue
+            if isinstance(results, BaseException):
+                raise results
+            for result in results:
+                result["collection"] = collection_name
+            result_lists.append(normalize_scores(results, normalization))
+        return merge_top_k(result_lists, limit)
+
+    async def resolve_collection(self, collection_name: str) -> str:
+        """
+        Returns the collection an alias points to, or the name itself if it isn't an alias.
+        Searches and writes go through this, so they follow an alias as soon as it is swapped.
+        """
+        if self._aliases is None:
+            self._aliases = await self._load_aliases()
+        return self._aliases.get(collection_name, collection_name)
+
+    async def swap_alias(self, alias: str, collection_name: str) -> Optional[str]:
+        """
+        Points an alias at a collection in one atomic step, creating the alias if needed. Searches
+        and writes made through the alias move to the new collection at once; the collection it
+        pointed to before is left as it is. Other processes see the swap when they next read the
+        aliases (e.g. on restart).
+
+        :param alias: Name the collection is searched by, it can't be the name of a collection
+        :param collection_name: The collection the alias should point to
+        :return: The collection the alias pointed to before, None if it is new
+        """
+        previous = await self.resolve_collection(alias)
+        await self._set_alias(alias, collection_name)
+        self._aliases[alias] = collection_name
+        print(f"Alias '{alias}' now points to collection '{collection_name}'.")
+        return None if previous == alias else previous
+
+    async def _load_aliases(self) -> Dict[str, str]:
+        """
+        Concrete classes override this to read the aliases they keep, mapped to their collections.
+        """
+        return {}
+
+    async def _set_alias(self, alias: str, collection_name: str) -> None:
+        """
+        Concrete classes implement this to support aliases: atomically points `alias` at `collection_name`.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support aliases.")
+
+    def register_embedding_service(self, embedding_service: Any) -> CoalescingEmbedder:
+        """
+        Makes a provider available to the collections recorded as embedded with its model (see
+        `set_embedding_service`), e.g. in a process started after a re-embedding. The embedding cache is shared.
+
+        :param embedding_service: An `EmbeddingProvider` or Semantic Kernel embedding service
+        :return: The query embedder of the provider
+        """
+        provider = resolve_provider(self.kernel, embedding_service)
+        model = embedding_model(provider)
+        key = _model_key(model)
+        if key not in self._model_embedders:
+            if self.embedding_cache is not None:
+                provider = CachedEmbeddingService(provider, self.embedding_cache, model["dimensions"])
+            self._model_embedders[key] = CoalescingEmbedder(BatchEmbedder(provider))
+        return self._model_embedders[key]
+
+    def set_embedding_service(self, collection_name: str, embedding_service: Any) -> None:
+        """
+        Embeds the chunks written to a collection, and its search queries, with another provider than
+        the database's, for a collection embedded with another model (see `reembed`). The model id and
+        dimensions are saved with the collection, so databases opened later embed its queries with the
+        same model, once its provider is registered with `register_embedding_service`.
+
+        :param collection_name: The collection, not an alias
+        :param embedding_service: An `EmbeddingProvider` or Semantic Kernel embedding service
+        """
+        embedder = self.register_embedding_service(embedding_service)
+        self._save_embedding_model(collection_name, embedding_model(embedder.embedder.embedding_service))
+        self._collection_embedders[collection_name] = embedder
+
+    def query_embedder_for(self, collection_name: str) -> CoalescingEmbedder:
+        """
+        The embedder of the search queries of a collection (not an alias): the one of the model recorded
+        with the collection, the database's if none is.
+
+        :raises ValueError: If the collection's model has no registered provider
+        """
+        embedder = self._collection_embedders.get(collection_name)
+        if embedder is not None:
+            return embedder
+        model = self._load_embedding_model(collection_name)
+        if model is None or _model_key(model) == _model_key(embedding_model(self.embedding_service)):
+            embedder = self.query_embedder
+        elif _model_key(model) in self._model_embedders:
+            embedder = self._model_embedders[_model_key(model)]
+        else:
+            provider = provider_for_model(model)
+            if provider is None:
+                raise ValueError(
+                    f"Collection '{collection_name}' is embedded with model '{model['model_id']}' "
+                    f"({model['dimensions'] or 'default'} dimensions): register its provider with register_embedding_service."
+                )
+            embedder = self.register_embedding_service(provider)
+        self._collection_embedders[collection_name] = embedder
+        return embedder
+
+    def _load_embedding_model(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """
+        The model recorded with a collection by `set_embedding_service`, None if there is none.
+        Backends that can store metadata with their collections override this and `_save_embedding_model`.
+        """
+        return self.manifest.embedding_model(collection_name)
+
+    def _save_embedding_model(self, collection_name: str, model: Dict[str, Any]) -> None:
+        self.manifest.record_embedding_model(collection_name, model)
+
+    def embedder_for(self, collection_name: str) -> BatchEmbedder:
+        """
+        The embedder of the chunks written to a collection (not an alias).
+        """
+        return self.query_embedder_for(collection_name).embedder
+
+    async def reembed(
+        self,
+        alias: str,
+        target_collection: str,
+        embedding_service: Any,
+        **job_options: Any,
+    ) -> ReembedProgress:
+        """
+        Re-embeds the collection an alias points to with another embedding model (or size) into a
+        new collection, in the background while searches keep being served, then swaps the alias
+        to it. Interrupted runs resume where they stopped. See `vector.reembed`.
+
+            await database.reembed("docs", "docs_v2", LocalEmbeddingProvider(), max_texts_per_second=200)
+
+        :param alias: Alias searched through; if it doesn't exist yet, pass the collection it should
+                      replace as `source_collection`
+        :param target_collection: Name of the collection to create with the new embeddings
+        :param embedding_service: Provider of the new embeddings, also used for the queries of the new collection
+        :param job_options: Extra options for `ReembedJob` (source_collection, max_texts_per_second, batch_size, ...)
+        :return: The final progress counters.
+        """
+        return await ReembedJob(self, alias, target_collection, embedding_service, **job_options).run()
+
+    @asynccontextmanager
+    async def bulk_load(self, collection_name: str) -> AsyncIterator[None]:
+        """
+        Defers index building in a collection for a large initial load, and rebuilds the indexes
+        once when the block exits. Searches made during the load may miss the points loaded so far.
+
+            async with database.bulk_load("docs"):
+                await database.ingest("docs", data)
+        
+        :param collection_name: The collection being loaded.
+        """
+        collection_name = await self.resolve_collection(collection_name)
+        await self._begin_bulk_load(collection_name)
+        try:
+            yield
+        finally:
+            await self._end_bulk_load(collection_name)
+
+    async def _begin_bulk_load(self, collection_name: str) -> None:
+        """
+        Concrete classes override this to suspend index maintenance during a bulk load.
+        """
+        pass
+
+    async def _end_bulk_load(self, collection_name: str) -> None:
+        """
+        Concrete classes override this to rebuild the indexes suspended by `_begin_bulk_load`.
+        """
+        pass
+
+    async def export_collection(self, collection_name: str, path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> int:
+        """
+        Exports a collection to a snapshot directory: its vectors as one contiguous float32 file,
+        its payloads as one file per field and its configuration. See `vector.snapshot`.
+        
+        :param collection_name: The collection to export.
+        :param path: Directory to write the snapshot to, created if needed.
+        :param batch_size: Number of points read from the database at a time.
+        :return: The number of points exported.
+        """
+        return await export_snapshot(self, await self.resolve_collection(collection_name), path, batch_size)
+
+    async def import_collection(
+        self,
+        path: str,
+        collection_name: Optional[str] = None,
+        batch_size: int = SNAPSHOT_BATCH_SIZE,
+        concurrency: int = INGEST_UPSERT_CONCURRENCY,
+    ) -> int:
+        """
+        Creates a collection from a snapshot directory and loads its points, without calling the
+        embedding service. Snapshots can be imported into any backend.
+        
+        :param path: Directory the snapshot was exported to.
+        :param collection_name: Name of the collection to create, defaults to the exported one.
+        :param batch_size: Number of points per upsert call.
+        :param concurrency: Maximum number of upsert calls in flight.
+        :return: The number of points imported.
+        """
+        return await import_snapshot(self, path, collection_name, batch_size, concurrency)
+
+    async def _collection_config(self, collection_name: str) -> Dict[str, Any]:
+        """
+        Concrete classes implement this to support snapshots: the `create_collection` arguments
+        (vector_size, distance_function, quantization, ...) that recreate the collection.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support snapshots.")
+
+    async def _scroll_points(self, collection_name: str, batch_size: int) -> AsyncIterator[Tuple[List[Any], ndarray, List[Dict[str, Any]]]]:
+        """
+        Concrete classes implement this to support snapshots: yields the ids, full-dimension
+        vectors and payloads of every point of the collection, `batch_size` points at a time.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support snapshots.")
+        yield
+
+    async def iter_embeddings(self, data: TextSource, batch_size: int = BATCH_SIZE, overlap: int = CHUNK_OVERLAP) -> AsyncIterator[VectorEmbeddingsData]:
+        """
+        Chunks the data on paragraph, sentence and token boundaries and yields each chunk with its embedding.
+        Chunks are packed into concurrent embedding requests, results keep the original order.
+        
+        :param data: A raw string, a file-like object or an iterable of strings
+        :param batch_size: Maximum number of characters per chunk
+        :param overlap: Number of characters shared between consecutive chunks
+        """
+        chunks = iter_chunks(data, batch_size, overlap)
+        async for chunk, embeddings in self.embedder.embed_stream(chunks):
+            yield VectorEmbeddingsData(text=chunk, embeddings=embeddings)
+
+    async def generate_embeddings(self, data: TextSource, batch_size: int = BATCH_SIZE, overlap: int = CHUNK_OVERLAP) -> List[VectorEmbeddingsData]:
+        return [batch async for batch in self.iter_embeddings(data, batch_size, overlap)]